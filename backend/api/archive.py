@@ -0,0 +1,81 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import cache
+from .models import Absence, ArchivedAbsence, ArchivedForgivenessRequest, ArchivedTerm, ForgivenessRequest
+from .signals import muted_signals
+from .terms import shift_term, term_for, term_range, terms_between
+
+ABSENCE_FIELDS = ("id", "student_id", "discipline_id", "date", "reason", "created_at", "updated_at", "is_absent")
+REQUEST_FIELDS = (
+    "id", "absence_id", "justification_file", "stored_file_id", "status", "comments", "created_at", "updated_at",
+)
+
+
+def archivable_terms(keep=None, today=None):
+    """Semestres com faltas na tabela principal, exceto os keep mais recentes"""
+    keep = settings.ARCHIVE_KEEP_TERMS if keep is None else keep
+    first_kept, _ = term_range(shift_term(term_for(today or timezone.localdate()), 1 - keep))
+    first = Absence.objects.filter(date__lt=first_kept).order_by("date").values_list("date", flat=True).first()
+    if first is None:
+        return []
+    return terms_between(first, first_kept - timedelta(days=1))
+
+
+def archive_term(term, batch_size=1000):
+    """Move as faltas do semestre, com as solicitações, para as tabelas de arquivo
+
+    Cada lote é copiado e apagado em uma transação própria, então a
+    operação pode ser interrompida e repetida. Faltas com solicitação
+    pendente ficam na tabela principal até a revisão; a próxima execução as
+    arquiva. Os ids são mantidos e os resumos não mudam, porque as faltas só
+    trocam de tabela.
+    """
+    start, end = term_range(term)
+    candidates = Absence.objects.filter(date__range=(start, end)).exclude(forgivenessrequest__status="PENDING")
+    # Registrado antes de mover: a partir daqui os resumos do semestre também somam o arquivo
+    ArchivedTerm.objects.get_or_create(term=term)
+
+    moved_absences = moved_requests = 0
+    student_ids = set()
+    last_id = 0
+    with muted_signals():
+        while True:
+            with transaction.atomic():
+                # O lock impede que uma solicitação seja criada para a falta enquanto ela é movida
+                ids = list(
+                    candidates.filter(id__gt=last_id).order_by("id").select_for_update()
+                    .values_list("id", flat=True)[:batch_size]
+                )
+                if not ids:
+                    break
+                absences = [
+                    ArchivedAbsence(term=term, **row)
+                    for row in Absence.objects.filter(id__in=ids).values(*ABSENCE_FIELDS)
+                ]
+                requests = [
+                    ArchivedForgivenessRequest(**row)
+                    for row in ForgivenessRequest.objects.filter(absence_id__in=ids).values(*REQUEST_FIELDS)
+                ]
+                ArchivedAbsence.objects.bulk_create(absences)
+                ArchivedForgivenessRequest.objects.bulk_create(requests)
+                ForgivenessRequest.objects.filter(absence_id__in=ids).delete()
+                Absence.objects.filter(id__in=ids).delete()
+                ArchivedTerm.objects.filter(term=term).update(
+                    absences=F("absences") + len(absences),
+                    forgiveness_requests=F("forgiveness_requests") + len(requests),
+                    archived_at=timezone.now(),
+                )
+
+            last_id = ids[-1]
+            moved_absences += len(absences)
+            moved_requests += len(requests)
+            student_ids.update(absence.student_id for absence in absences)
+
+    # Os signals estavam desligados, então a invalidação é explícita
+    cache.invalidate([cache.ABSENCES, cache.REQUESTS], student_ids=student_ids)
+    return moved_absences, moved_requests
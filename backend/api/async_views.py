@@ -0,0 +1,218 @@
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework import status
+from rest_framework.exceptions import (
+    APIException,
+    AuthenticationFailed,
+    NotAuthenticated,
+    NotFound,
+    PermissionDenied,
+    Throttled,
+    ValidationError,
+)
+from rest_framework.request import Request
+
+from . import cache, events, rows
+from .authentication import ClaimsJWTAuthentication
+from .filters import AbsenceFilterBackend, ForgivenessRequestFilterBackend, reads_archive
+from .models import Absence, ArchivedAbsence, ArchivedForgivenessRequest, ForgivenessRequest, User
+from .pagination import KeysetPagination
+from .renderers import FastJSONRenderer
+from .permissions import get_role
+from .routers import areplica_reads
+from .serializers import (
+    AbsencesSerializer,
+    AnnotatedAbsencesSerializer,
+    ForgivenessRequestsSerializer,
+    UserSerializer,
+)
+from .throttles import PollingRateThrottle
+
+
+class AsyncAPIView(View):
+    """Base das views assíncronas: autenticação só pelas claims do JWT, sem consulta"""
+
+    allowed_roles = None  # None libera qualquer usuário autenticado
+    authentication_class = ClaimsJWTAuthentication
+    throttle_classes = ()
+
+    def get_credentials(self, request):
+        return self.authentication_class().authenticate(request)
+
+    def authenticate(self, request):
+        result = self.get_credentials(request)
+        if result is None:
+            raise NotAuthenticated()
+        request.user, request.auth = result
+        if self.allowed_roles is not None and get_role(request) not in self.allowed_roles:
+            raise PermissionDenied()
+
+    def check_throttles(self, request):
+        # Como no APIView do DRF: todos os limites são consultados e vale a maior espera
+        waits = []
+        for throttle in (throttle_class() for throttle_class in self.throttle_classes):
+            if not throttle.allow_request(request, self):
+                waits.append(throttle.wait())
+        if waits:
+            raise Throttled(max(waits))
+
+    def render(self, data, status_code=status.HTTP_200_OK):
+        response = HttpResponse(FastJSONRenderer().render(data), content_type="application/json", status=status_code)
+        if status_code == status.HTTP_401_UNAUTHORIZED:
+            response["WWW-Authenticate"] = 'Bearer realm="api"'
+        return response
+
+    def render_exception(self, exc):
+        response = self.render(exc.detail if isinstance(exc.detail, dict) else {"detail": exc.detail}, exc.status_code)
+        if getattr(exc, "wait", None):
+            response["Retry-After"] = str(exc.wait)
+        return response
+
+
+class AsyncListView(AsyncAPIView):
+    """Listagem somente leitura atendida pelo ORM assíncrono
+
+    Enquanto o banco responde a requisição fica suspensa no event loop do
+    servidor ASGI em vez de prender uma thread do worker. Filtros,
+    carregamento e paginação são os mesmos das views síncronas, então o
+    JSON é idêntico. As respostas não passam pelo cache nem pelos GETs
+    condicionais.
+    """
+
+    serializer_class = None
+    filter_backends = []
+    pagination_class = None
+
+    async def get(self, request, *args, **kwargs):
+        drf_request = Request(request)
+        try:
+            self.authenticate(drf_request)
+            # Os baldes ficam no cache, cujo backend é síncrono
+            await sync_to_async(self.check_throttles)(drf_request)
+            queryset = self.filter_queryset(drf_request, self.get_queryset(drf_request))
+            serializer_class = self.get_serializer_class(drf_request)
+            queryset = serializer_class.shape_queryset(queryset)
+            serializer_class = rows.row_serializer_for(serializer_class) or serializer_class
+            async with areplica_reads(cache.user_scope(drf_request.user)):
+                data = await self.list(drf_request, queryset, serializer_class)
+        except APIException as exc:
+            return self.render_exception(exc)
+        return self.render(data)
+
+    def get_queryset(self, request):
+        raise NotImplementedError
+
+    def get_serializer_class(self, request):
+        return self.serializer_class
+
+    def filter_queryset(self, request, queryset):
+        for backend in self.filter_backends:
+            queryset = backend().filter_queryset(request, queryset, self)
+        return queryset
+
+    def paginate_queryset(self, request, queryset):
+        return queryset
+
+    async def list(self, request, queryset, serializer_class):
+        context = {"request": request}
+        queryset = self.paginate_queryset(request, queryset)
+        if issubclass(serializer_class, rows.RowSerializer):
+            queryset = serializer_class.values(queryset)
+        if self.pagination_class is None:
+            page = [row async for row in queryset]
+            return serializer_class(page, many=True, context=context).data
+
+        paginator = self.pagination_class()
+        page = await paginator.apaginate_queryset(queryset, request)
+        return paginator.get_paginated_data(serializer_class(page, many=True, context=context).data)
+
+
+class AsyncStudentListView(AsyncListView):
+    serializer_class = UserSerializer
+    allowed_roles = ("admin", "professor")
+
+    def get_queryset(self, request):
+        return User.objects.filter(role="student")
+
+
+class AsyncAbsenceListView(AsyncListView):
+    serializer_class = AbsencesSerializer
+    pagination_class = KeysetPagination
+    filter_backends = [AbsenceFilterBackend]
+    throttle_classes = [PollingRateThrottle]
+
+    def includes_requests(self, request):
+        return request.query_params.get("include_requests") in ("true", "1")
+
+    def get_queryset(self, request):
+        model = ArchivedAbsence if reads_archive(request) else Absence
+        return model.objects.visible_to(request.user)
+
+    def get_serializer_class(self, request):
+        if self.includes_requests(request):
+            return AnnotatedAbsencesSerializer
+        return AbsencesSerializer
+
+    def paginate_queryset(self, request, queryset):
+        if self.includes_requests(request):
+            return AnnotatedAbsencesSerializer.annotate(queryset)
+        return queryset
+
+
+class AsyncForgivenessRequestListView(AsyncListView):
+    serializer_class = ForgivenessRequestsSerializer
+    pagination_class = KeysetPagination
+    filter_backends = [ForgivenessRequestFilterBackend]
+    throttle_classes = [PollingRateThrottle]
+
+    def get_queryset(self, request):
+        model = ArchivedForgivenessRequest if reads_archive(request) else ForgivenessRequest
+        return model.objects.visible_to(request.user)
+
+
+class EventStreamView(AsyncAPIView):
+    """Stream Server-Sent Events com as notificações do aluno
+
+    O EventSource do navegador não envia cabeçalhos, então o stream é aberto
+    com o ticket de uso único de /api/events/ticket/ em ?ticket=. Sem
+    Last-Event-ID (ou ?last_event_id=) o stream começa a partir do evento
+    mais recente, sem reenviar o histórico.
+    """
+
+    allowed_roles = ("student",)
+
+    async def get_recipient(self, request):
+        ticket = request.query_params.get("ticket")
+        if not ticket:
+            self.authenticate(request)
+            return request.user.pk
+        recipient_id = await events.redeem_ticket(ticket)
+        if recipient_id is None:
+            raise AuthenticationFailed("Ticket inválido ou expirado.")
+        return recipient_id
+
+    def get_last_event_id(self, request):
+        value = request.headers.get("Last-Event-ID") or request.query_params.get("last_event_id")
+        if not value:
+            return None
+        if not value.isdigit():
+            raise ValidationError({"last_event_id": "Identificador de evento inválido."})
+        return int(value)
+
+    async def get(self, request, *args, **kwargs):
+        drf_request = Request(request)
+        try:
+            if not events.stream_available(request):
+                raise NotFound("Notificações em tempo real desativadas.")
+            recipient_id = await self.get_recipient(drf_request)
+            last_id = self.get_last_event_id(drf_request)
+        except APIException as exc:
+            return self.render_exception(exc)
+
+        if last_id is None:
+            last_id = await events.latest_id(recipient_id)
+        response = StreamingHttpResponse(events.stream(recipient_id, last_id), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"  # nginx não deve acumular o stream
+        return response
@@ -0,0 +1,20 @@
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from .models import User
+
+ROLES = {role for role, _ in User.ROLE_CHOICES}
+
+
+class ClaimsJWTAuthentication(JWTStatelessUserAuthentication):
+    """Usuário montado a partir das claims do JWT, sem consultar o banco
+
+    As permissões e os filtros dependem da claim role; tokens emitidos sem
+    ela (antes de as claims existirem) são recusados, e o cliente precisa
+    fazer login de novo.
+    """
+
+    def get_user(self, validated_token):
+        if validated_token.get("role") not in ROLES:
+            raise InvalidToken("Token sem o papel do usuário, faça login novamente.")
+        return super().get_user(validated_token)
@@ -0,0 +1,132 @@
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.utils.connection import ConnectionProxy
+from rest_framework.response import Response
+
+KEY_PREFIX = "api"
+STAFF_SCOPE = "staff"
+STATS_KEYS = {"hits": f"{KEY_PREFIX}:stats:hits", "misses": f"{KEY_PREFIX}:stats:misses"}
+
+# Versões, pinos do banco principal, baldes dos throttles, tickets e métricas
+# ficam num cache à parte: o descarte aleatório das respostas, que são muitas,
+# não pode apagar esse estado
+state_cache = ConnectionProxy(caches, "state")
+
+# Recursos cacheados, invalidados separadamente em api/signals.py
+ABSENCES = "absences"
+REQUESTS = "requests"
+STUDENTS = "students"
+
+
+def get_timeout():
+    return getattr(settings, "API_CACHE_TIMEOUT", 300)
+
+
+def user_scope(user):
+    """Professores e admins veem os mesmos dados, cada aluno vê apenas os seus"""
+    if user.role in ("professor", "admin"):
+        return STAFF_SCOPE
+    return f"user:{user.pk}"
+
+
+def primary_key(scope):
+    return f"{KEY_PREFIX}:primary:{scope}"
+
+
+def reads_primary(scope):
+    """O escopo teve escrita recente e a réplica de leitura pode ainda não tê-la recebido"""
+    return bool(state_cache.get(primary_key(scope)))
+
+
+async def areads_primary(scope):
+    return bool(await state_cache.aget(primary_key(scope)))
+
+
+def generation_key(resource, scope):
+    return f"{KEY_PREFIX}:gen:{resource}:{scope}"
+
+
+def get_generations(resources, scope):
+    """Versão atual de cada recurso no escopo, criando as que não existem
+
+    As versões são aleatórias: se uma chave for despejada do cache, a nova
+    versão nunca coincide com a de respostas antigas ainda armazenadas.
+    """
+    keys = [generation_key(resource, scope) for resource in resources]
+    generations = state_cache.get_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in generations}
+    if missing:
+        for key, value in missing.items():
+            state_cache.add(key, value, timeout=None)
+        generations.update(state_cache.get_many(list(missing)))
+    return [generations[key] for key in keys]
+
+
+def build_key(request, view_name, resources):
+    scope = user_scope(request.user)
+    generations = get_generations(resources, scope)
+    # A role entra na chave porque professores e admins compartilham o escopo,
+    # mas não veem exatamente as mesmas linhas
+    raw = "|".join([str(request.user.role), request.build_absolute_uri(), *generations])
+    digest = hashlib.sha1(raw.encode()).hexdigest()
+    return f"{KEY_PREFIX}:response:{view_name}:{scope}:{digest}"
+
+
+def record(outcome):
+    key = STATS_KEYS[outcome]
+    state_cache.add(key, 0, timeout=None)
+    try:
+        state_cache.incr(key)
+    except ValueError:  # chave despejada entre o add e o incr
+        state_cache.set(key, 1, timeout=None)
+
+
+def get_stats():
+    values = state_cache.get_many(list(STATS_KEYS.values()))
+    return {name: values.get(key, 0) for name, key in STATS_KEYS.items()}
+
+
+def _bump(pairs):
+    state_cache.set_many({generation_key(resource, scope): uuid.uuid4().hex for resource, scope in pairs}, timeout=None)
+    lag = settings.DATABASE_REPLICA_LAG
+    if lag:
+        # Sem isso uma listagem lida da réplica atrasada seria cacheada já com a versão nova
+        state_cache.set_many({primary_key(scope): True for _, scope in pairs}, timeout=lag)
+
+
+def invalidate(resources, student_ids=()):
+    """Invalida os recursos para a equipe e para os alunos informados
+
+    A invalidação roda na hora e de novo após o commit, para que uma
+    leitura concorrente não guarde dados anteriores à transação.
+    """
+    scopes = [STAFF_SCOPE] + [f"user:{pk}" for pk in set(student_ids)]
+    pairs = [(resource, scope) for resource in resources for scope in scopes]
+    _bump(pairs)
+    transaction.on_commit(lambda: _bump(pairs))
+
+
+class CachedListMixin:
+    """Cacheia a resposta de listagem por role/usuário e parâmetros da requisição"""
+
+    cache_resources = ()
+
+    def get_cache_resources(self):
+        return self.cache_resources
+
+    def list(self, request, *args, **kwargs):
+        key = build_key(request, type(self).__name__, self.get_cache_resources())
+        data = cache.get(key)
+        if data is not None:
+            record("hits")
+            return Response(data)
+
+        record("misses")
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, timeout=get_timeout())
+        return response
@@ -0,0 +1,141 @@
+import hashlib
+
+from django.core.cache import cache as django_cache
+from django.db.models import Count, Max, Model
+from django.db.models.signals import post_save
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_etags
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
+
+from . import cache
+
+UPDATE_ATTEMPTS = 3
+
+
+class ConditionalListMixin:
+    """Responde GETs condicionais (If-None-Match / If-Modified-Since) das listagens
+
+    Os validadores vêm de uma única consulta agregada (contagem e maiores
+    datas do queryset filtrado) somada às versões do cache da view, e ficam
+    guardados no cache até a próxima invalidação. Quando o cliente já tem a
+    versão atual a resposta é um 304, sem rodar os serializers.
+    """
+
+    fingerprint_fields = ("created_at",)
+
+    def get_fingerprint_fields(self):
+        return self.fingerprint_fields
+
+    def list(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+            if timestamp is not None:
+                response["Last-Modified"] = http_date(timestamp)
+            # O navegador sempre revalida e nunca compartilha a resposta entre usuários
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ["Authorization"])
+        return response
+
+    def get_validators(self, request):
+        key = cache.build_key(request, f"{type(self).__name__}:validators", self.get_cache_resources())
+        validators = django_cache.get(key)
+        if validators is None:
+            validators = self.compute_validators(request, key)
+            django_cache.set(key, validators, timeout=cache.get_timeout())
+        return validators
+
+    def compute_validators(self, request, key):
+        queryset = self.filter_queryset(self.get_queryset())
+        fields = self.get_fingerprint_fields()
+        # distinct porque campos de relações reversas duplicam as linhas no JOIN
+        aggregates = {"count": Count("pk", distinct=True)}
+        aggregates.update({field: Max(field) for field in fields})
+        values = queryset.aggregate(**aggregates)
+
+        timestamps = [values[field] for field in fields if values[field]]
+        last_modified = max(timestamps) if timestamps else None
+
+        # A chave do cache já inclui role, URL e versões dos recursos
+        raw = "|".join([key] + [str(values[name]) for name in sorted(values)])
+        etag = '"%s"' % hashlib.sha1(raw.encode()).hexdigest()
+        return etag, last_modified
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = "O registro foi alterado por outra pessoa; recarregue e tente de novo."
+    default_code = "precondition_failed"
+
+
+def version_etag(instance):
+    """ETag da linha: o updated_at exatamente como aparece no JSON, entre aspas"""
+    return '"%s"' % serializers.DateTimeField().to_representation(instance.updated_at)
+
+
+def check_if_match(request, instance):
+    """412 se o If-Match enviado não corresponde à versão atual da linha"""
+    header = request.headers.get("If-Match")
+    if header is None:
+        return
+    etags = parse_etags(header)
+    if etags != ["*"] and version_etag(instance) not in etags:
+        raise PreconditionFailed()
+
+
+def save_changed(instance, changes):
+    """Grava só as colunas que mudaram, em um UPDATE condicionado ao updated_at lido
+
+    Devolve os campos gravados ([] quando nada mudou, sem escrita nenhuma) ou
+    None se outra escrita alterou a linha depois da leitura. O post_save é
+    enviado como em um save(update_fields=...), então os receivers de
+    api/signals.py cuidam de cache, resumos e avisos.
+    """
+    meta = type(instance)._meta
+    fields = []
+    for name, value in changes.items():
+        current = getattr(instance, meta.get_field(name).attname)
+        if current != (value.pk if isinstance(value, Model) else value):
+            fields.append(name)
+    if not fields:
+        return []
+
+    updated_at = timezone.now()
+    updated = type(instance)._base_manager.filter(pk=instance.pk, updated_at=instance.updated_at).update(
+        updated_at=updated_at, **{name: changes[name] for name in fields}
+    )
+    if not updated:
+        return None
+
+    for name in fields:
+        setattr(instance, name, changes[name])
+    instance.updated_at = updated_at
+    post_save.send(
+        sender=type(instance), instance=instance, created=False, raw=False,
+        using=instance._state.db, update_fields=frozenset(fields + ["updated_at"]),
+    )
+    return fields
+
+
+def update_row(request, queryset, pk, changes):
+    """Lê a linha pela chave primária, confere o If-Match e grava só o que mudou
+
+    Sem lock entre a leitura e a escrita: se outra escrita acontecer no meio,
+    a linha é lida de novo, e com If-Match a nova versão dá 412.
+    """
+    for _ in range(UPDATE_ATTEMPTS):
+        instance = get_object_or_404(queryset, pk=pk)
+        check_if_match(request, instance)
+        fields = save_changed(instance, changes)
+        if fields is not None:
+            return instance, fields
+    raise PreconditionFailed()
@@ -0,0 +1,130 @@
+import asyncio
+import json
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import KEY_PREFIX, state_cache
+from .models import Event
+
+ABSENCE_CREATED = "absence.created"
+REQUEST_STATUS = "forgiveness_request.status"
+
+BATCH_SIZE = 100
+
+
+def absence_payload(absence):
+    # bulk_create no MySQL não devolve os ids, então o cliente não pode depender dele
+    return {
+        "id": absence.pk,
+        "discipline": absence.discipline.name,
+        "date": absence.date,
+        "is_absent": absence.is_absent,
+    }
+
+
+def request_payload(forgiveness_request):
+    return {
+        "id": forgiveness_request.pk,
+        "absence": forgiveness_request.absence_id,
+        "status": forgiveness_request.status,
+        "comments": forgiveness_request.comments,
+    }
+
+
+def publish_many(events):
+    """Grava os eventos (destinatário, tipo, payload) depois do commit
+
+    Assim o stream nunca entrega a notificação de uma alteração desfeita.
+    """
+    rows = [
+        Event(recipient_id=recipient_id, kind=kind, payload=json.loads(json.dumps(payload, cls=DjangoJSONEncoder)))
+        for recipient_id, kind, payload in events
+    ]
+    if rows:
+        transaction.on_commit(lambda: Event.objects.bulk_create(rows, batch_size=BATCH_SIZE))
+
+
+def publish(recipient_id, kind, payload):
+    publish_many([(recipient_id, kind, payload)])
+
+
+def purge(older_than=None):
+    """Remove eventos antigos; quem ficou desconectado além disso recarrega as listas"""
+    older_than = older_than or timedelta(days=settings.EVENTS_RETENTION_DAYS)
+    return Event.objects.filter(created_at__lt=timezone.now() - older_than).delete()[0]
+
+
+def stream_available(request):
+    """O stream só é servido no ASGI: no WSGI a resposta seria acumulada e prenderia uma thread até o timeout"""
+    return settings.EVENTS_STREAM_ENABLED and isinstance(request, ASGIRequest)
+
+
+def ticket_key(ticket):
+    return f"{KEY_PREFIX}:events:ticket:{ticket}"
+
+
+def issue_ticket(recipient_id):
+    """Ticket de uso único para abrir o stream
+
+    O EventSource não envia cabeçalhos; o ticket vai na URL no lugar do
+    token de acesso, que ficaria registrado nos logs do servidor e dos proxies.
+    """
+    ticket = secrets.token_urlsafe(32)
+    state_cache.set(ticket_key(ticket), recipient_id, timeout=settings.EVENTS_TICKET_TTL)
+    return ticket
+
+
+async def redeem_ticket(ticket):
+    """Destinatário do ticket, que deixa de valer; None se é inválido ou expirou"""
+    key = ticket_key(ticket)
+    recipient_id = await state_cache.aget(key)
+    if recipient_id is not None:
+        await state_cache.adelete(key)
+    return recipient_id
+
+
+def format_event(event):
+    data = json.dumps({"kind": event.kind, **event.payload})
+    return f"id: {event.pk}\nevent: {event.kind}\ndata: {data}\n\n"
+
+
+async def latest_id(recipient_id):
+    event = await Event.objects.filter(recipient_id=recipient_id).order_by("-id").only("id").afirst()
+    return event.pk if event else 0
+
+
+async def stream(recipient_id, last_id):
+    """Envia no formato Server-Sent Events os eventos com id maior que last_id
+
+    Consulta o log a cada EVENTS_POLL_INTERVAL segundos (uma consulta pelo
+    índice recipient+id), manda um comentário de keep-alive quando fica
+    ocioso e encerra após EVENTS_STREAM_TIMEOUT; o EventSource do navegador
+    reconecta sozinho enviando o Last-Event-ID.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.EVENTS_STREAM_TIMEOUT
+    last_sent = loop.time()
+    yield f"retry: {int(settings.EVENTS_POLL_INTERVAL * 1000)}\n\n"
+
+    while True:
+        queryset = Event.objects.filter(recipient_id=recipient_id, id__gt=last_id).order_by("id")[:BATCH_SIZE]
+        events = [event async for event in queryset]
+        for event in events:
+            yield format_event(event)
+            last_id = event.pk
+        if events:
+            last_sent = loop.time()
+            if len(events) == BATCH_SIZE:
+                continue
+        if loop.time() >= deadline:
+            return
+        if loop.time() - last_sent >= settings.EVENTS_KEEPALIVE:
+            yield ": keep-alive\n\n"
+            last_sent = loop.time()
+        await asyncio.sleep(settings.EVENTS_POLL_INTERVAL)
@@ -0,0 +1,95 @@
+import csv
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+ABSENCE_COLUMNS = (
+    "id", "student_id", "student__username", "student__name", "discipline__name",
+    "date", "is_absent", "reason", "created_at", "updated_at",
+)
+
+FORGIVENESS_REQUEST_COLUMNS = (
+    "id", "absence_id", "absence__student_id", "absence__student__username",
+    "absence__discipline__name", "absence__date", "status", "comments",
+    "justification_file", "created_at", "updated_at",
+)
+
+
+def fetch_batch(queryset, last_pk, chunk_size):
+    """Lê um lote limitado por keyset (id > último id lido)"""
+    if last_pk is not None:
+        queryset = queryset.filter(pk__gt=last_pk)
+    return list(queryset[:chunk_size])
+
+
+def iter_rows(queryset, columns, chunk_size=2000):
+    """Percorre o queryset em lotes ordenados por id
+
+    Cada lote é uma consulta limitada por keyset (id > último id lido). O
+    mysqlclient carrega o resultado inteiro de uma consulta na memória, então
+    só lotes limitados mantêm o uso de memória constante.
+    """
+    queryset = queryset.order_by("pk").values_list(*columns)
+    last_pk = None
+    while True:
+        batch = fetch_batch(queryset, last_pk, chunk_size)
+        yield from batch
+        if len(batch) < chunk_size:
+            return
+        last_pk = batch[-1][0]
+
+
+async def aiter_batches(queryset, columns, chunk_size=2000):
+    """Versão assíncrona de iter_rows, que entrega um lote por vez
+
+    Sob ASGI o Django consome iteradores síncronos com sync_to_async(list),
+    o que carregaria a exportação inteira na memória. Aqui cada lote é lido
+    numa thread e devolvido ao event loop antes do próximo.
+    """
+    queryset = queryset.order_by("pk").values_list(*columns)
+    last_pk = None
+    while True:
+        batch = await sync_to_async(fetch_batch)(queryset, last_pk, chunk_size)
+        if batch:
+            yield batch
+        if len(batch) < chunk_size:
+            return
+        last_pk = batch[-1][0]
+
+
+class Echo:
+    """Buffer que devolve o que foi escrito, para o csv.writer gerar strings"""
+
+    def write(self, value):
+        return value
+
+
+def row_encoder(columns, export_format):
+    """Função que converte uma linha no texto do formato pedido"""
+    if export_format == "csv":
+        return csv.writer(Echo()).writerow
+    encoder = DjangoJSONEncoder()
+    return lambda row: encoder.encode(dict(zip(columns, row))) + "\n"
+
+
+def render(rows, columns, export_format):
+    encode = row_encoder(columns, export_format)
+    if export_format == "csv":
+        yield encode(columns)
+    for row in rows:
+        yield encode(row)
+
+
+async def arender(batches, columns, export_format):
+    """Como render, mas a partir de aiter_batches, gerando um pedaço por lote"""
+    encode = row_encoder(columns, export_format)
+    if export_format == "csv":
+        yield encode(columns)
+    async for batch in batches:
+        yield "".join(encode(row) for row in batch)
@@ -0,0 +1,162 @@
+import re
+
+from django.db.models import Subquery
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from .models import ClassGroup, Enrolment
+from .terms import term_range, term_range_expressions
+
+
+def parse_date_param(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValidationError({name: "Data inválida, use o formato AAAA-MM-DD."})
+    return parsed
+
+
+def parse_bool_param(params, name):
+    value = params.get(name)
+    if value is None or value == "":
+        return None
+    if value.lower() in ("true", "1"):
+        return True
+    if value.lower() in ("false", "0"):
+        return False
+    raise ValidationError({name: "Valor inválido, use true ou false."})
+
+
+def parse_term_param(params, name="term"):
+    value = params.get(name)
+    if not value:
+        return None
+    if not re.fullmatch(r"\d{4}-[12]", value):
+        raise ValidationError({name: "Semestre inválido, use o formato AAAA-1 ou AAAA-2."})
+    return value
+
+
+def discipline_filter(value):
+    """Filtro pelo id ou pelo nome da disciplina; o nome passa pelo índice único de Discipline"""
+    if value.isdigit():
+        return {"discipline_id": int(value)}
+    return {"discipline__name": value}
+
+
+def reads_archive(request):
+    """?archived=true lê os semestres arquivados (api/archive.py) em vez das tabelas principais"""
+    return parse_bool_param(request.query_params, "archived") is True
+
+
+class AbsenceFilterBackend(BaseFilterBackend):
+    """Filtros de /api/absences/
+
+    Todo filtro seletivo tem um índice composto que começa por ele:
+    student+date, discipline+date e date (term vira um intervalo de datas).
+    O filtro is_absent é aplicado como predicado residual sobre as linhas
+    encontradas por esses índices. class_group restringe aos alunos
+    matriculados, na disciplina e no semestre da turma.
+    """
+
+    lookup_prefix = ""
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        filters = self.get_filters(params)
+        return queryset.filter(**{self.lookup_prefix + lookup: value for lookup, value in filters.items()})
+
+    def get_filters(self, params):
+        filters = {}
+
+        student = params.get("student")
+        if student:
+            if not student.isdigit():
+                raise ValidationError({"student": "Identificador de aluno inválido."})
+            filters["student_id"] = int(student)
+
+        discipline = params.get("discipline")
+        if discipline:
+            filters.update(discipline_filter(discipline))
+
+        date = parse_date_param(params, "date")
+        if date:
+            filters["date"] = date
+
+        date_from = parse_date_param(params, "date_from")
+        if date_from:
+            filters["date__gte"] = date_from
+
+        date_to = parse_date_param(params, "date_to")
+        if date_to:
+            filters["date__lte"] = date_to
+
+        term = parse_term_param(params)
+        if term:
+            filters["date__range"] = term_range(term)
+
+        class_group = params.get("class_group")
+        if class_group:
+            if not class_group.isdigit():
+                raise ValidationError({"class_group": "Identificador de turma inválido."})
+            # Só subconsultas: o filtro não consulta o banco, então também serve às views assíncronas.
+            # Uma turma inexistente não casa com nenhuma falta
+            start, end = term_range_expressions("term")
+            group = ClassGroup.objects.filter(pk=int(class_group)).annotate(start=start, end=end)
+            # Subconsulta servida pelo índice único turma+aluno das matrículas
+            filters["student_id__in"] = Enrolment.objects.filter(class_group_id=int(class_group)).values("student_id")
+            filters["discipline_id"] = Subquery(group.values("discipline_id")[:1])
+            filters["date__range"] = (Subquery(group.values("start")[:1]), Subquery(group.values("end")[:1]))
+
+        is_absent = parse_bool_param(params, "is_absent")
+        if is_absent is not None:
+            filters["is_absent"] = is_absent
+
+        return filters
+
+
+class RequestAbsenceFilterBackend(AbsenceFilterBackend):
+    """Os mesmos filtros de falta aplicados às solicitações, através da falta associada"""
+
+    lookup_prefix = "absence__"
+
+
+class ForgivenessRequestFilterBackend(BaseFilterBackend):
+    """Filtro por status de /api/forgiveness-requests/, servido pelo índice status+created_at"""
+
+    def filter_queryset(self, request, queryset, view):
+        status = request.query_params.get("status")
+        if status:
+            valid = {choice for choice, _ in queryset.model.STATUS_CHOICES}
+            if status not in valid:
+                raise ValidationError({"status": "Status inválido."})
+            queryset = queryset.filter(status=status)
+        return queryset
+
+
+class AbsenceSummaryFilterBackend(BaseFilterBackend):
+    """Filtros de /api/absence-summaries/ por aluno, disciplina e semestre"""
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+
+        student = params.get("student")
+        if student:
+            if not student.isdigit():
+                raise ValidationError({"student": "Identificador de aluno inválido."})
+            queryset = queryset.filter(student_id=int(student))
+
+        discipline = params.get("discipline")
+        if discipline:
+            queryset = queryset.filter(**discipline_filter(discipline))
+
+        term = parse_term_param(params)
+        if term:
+            queryset = queryset.filter(term=term)
+
+        return queryset
@@ -0,0 +1,223 @@
+import csv
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+
+import django
+from django.conf import settings
+from django.contrib.auth.base_user import BaseUserManager
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from rest_framework.exceptions import ValidationError
+
+from . import cache
+from .models import User
+
+COLUMNS = ("username", "email", "password", "role", "name")
+REQUIRED_COLUMNS = {"username", "email", "password", "name"}
+ROLES = {role for role, _ in User.ROLE_CHOICES}
+
+
+class ImportReport:
+    """Resultado da importação: linhas lidas, usuários criados e erros por linha"""
+
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.errors = []
+        # Usernames e emails já aceitos (em minúsculas), para detectar repetições entre lotes do mesmo arquivo
+        self.usernames = set()
+        self.emails = set()
+
+    def add_error(self, line, username, errors):
+        self.errors.append({"line": line, "username": username, "errors": errors})
+
+    def as_dict(self):
+        return {"rows": self.rows, "created": self.created, "errors": self.errors}
+
+
+def read_rows(text):
+    """Lê o CSV em streaming, devolvendo (número da linha, linha)"""
+    reader = csv.DictReader(text)
+    missing = REQUIRED_COLUMNS - set(reader.fieldnames or ())
+    if missing:
+        raise ValidationError({"file": f"Colunas obrigatórias ausentes: {', '.join(sorted(missing))}."})
+    for row in reader:
+        yield reader.line_num, {column: (row.get(column) or "").strip() for column in COLUMNS}
+
+
+def count_rows(text, limit):
+    """Linhas de dados do CSV, contando no máximo até limit + 1"""
+    return sum(1 for _ in islice(csv.reader(text), 1, limit + 2))
+
+
+def _hash(algorithm, password):
+    return make_password(password, hasher=algorithm)
+
+
+@contextmanager
+def password_hasher(workers):
+    """Função que calcula os hashes de uma lista de senhas, em um pool de processos se workers > 1
+
+    O algoritmo é escolhido aqui, então os processos não dependem das
+    configurações (nem de override_settings) do processo principal. O pool
+    é só do comando import_users: a API calcula os hashes no próprio processo.
+    """
+    algorithm = get_hasher().algorithm
+    if workers <= 1:
+        yield lambda passwords: [_hash(algorithm, password) for password in passwords]
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+        yield lambda passwords: list(pool.map(_hash, [algorithm] * len(passwords), passwords, chunksize=32))
+
+
+def validate_row(row):
+    errors = {}
+    row["username"] = User.normalize_username(row["username"])
+    row["email"] = BaseUserManager.normalize_email(row["email"])
+    row["role"] = row["role"] or "student"
+
+    try:
+        User.username_validator(row["username"])
+    except DjangoValidationError as exc:
+        errors["username"] = exc.messages[0]
+    if not row["username"]:
+        errors["username"] = "Campo obrigatório."
+    try:
+        validate_email(row["email"])
+    except DjangoValidationError:
+        errors["email"] = "Email inválido."
+    if not row["password"]:
+        errors["password"] = "Campo obrigatório."
+    if row["role"] not in ROLES:
+        errors["role"] = f"Papel inválido, use um de: {', '.join(sorted(ROLES))}."
+    if not row["name"]:
+        errors["name"] = "Campo obrigatório."
+    elif len(row["name"]) > User._meta.get_field("name").max_length:
+        errors["name"] = "Nome muito longo."
+    return errors
+
+
+def validate_batch(batch, report):
+    """Valida um lote de linhas, conferindo a unicidade com duas consultas para o lote inteiro
+
+    As repetições são comparadas sem diferenciar maiúsculas, como na
+    collation do MySQL: "Ana" e "ana" seriam o mesmo usuário.
+    """
+    candidates = []
+    for line, row in batch:
+        errors = validate_row(row)
+        if errors:
+            report.add_error(line, row["username"], errors)
+        else:
+            candidates.append((line, row))
+
+    taken_usernames = {
+        username.lower()
+        for username in User.objects.filter(
+            username__in=[row["username"] for _, row in candidates]
+        ).values_list("username", flat=True)
+    }
+    taken_emails = {
+        email.lower()
+        for email in User.objects.filter(email__in=[row["email"] for _, row in candidates]).values_list("email", flat=True)
+    }
+
+    valid = []
+    for line, row in candidates:
+        errors = {}
+        username, email = row["username"].lower(), row["email"].lower()
+        if username in taken_usernames:
+            errors["username"] = "Já existe um usuário com este username."
+        elif username in report.usernames:
+            errors["username"] = "Username repetido no arquivo."
+        if email in taken_emails:
+            errors["email"] = "Já existe um usuário com este email."
+        elif email in report.emails:
+            errors["email"] = "Email repetido no arquivo."
+        if errors:
+            report.add_error(line, row["username"], errors)
+            continue
+        report.usernames.add(username)
+        report.emails.add(email)
+        valid.append((line, row))
+    return valid
+
+
+def build_users(rows, hash_passwords):
+    passwords = hash_passwords([row["password"] for _, row in rows])
+    return [
+        User(username=row["username"], email=row["email"], role=row["role"], name=row["name"], password=password)
+        for (_, row), password in zip(rows, passwords)
+    ]
+
+
+def insert_batch(batch, report, hash_passwords):
+    rows = validate_batch(batch, report)
+    if not rows:
+        return []
+    users = build_users(rows, hash_passwords)
+    with transaction.atomic():
+        return User.objects.bulk_create(users)
+
+
+def insert_rows(batch, report, hash_passwords):
+    """Insere as linhas válidas uma a uma; a que ainda colidir com outro usuário vira erro da linha"""
+    rows = validate_batch(batch, report)
+    created = []
+    for (line, row), user in zip(rows, build_users(rows, hash_passwords)):
+        try:
+            with transaction.atomic():
+                user.save()
+        except IntegrityError:
+            report.add_error(line, row["username"], {"username": "Já existe um usuário com este username ou email."})
+        else:
+            created.append(user)
+    return created
+
+
+def import_users(text, batch_size=None, workers=None, progress=None):
+    """Cria usuários a partir de um CSV (username, email, password, role, name)
+
+    As linhas são lidas, validadas e inseridas em lotes de batch_size, cada
+    lote em uma transação; linhas inválidas não impedem a importação das
+    demais e ficam no relatório. progress(report) é chamado após cada lote.
+    """
+    batch_size = batch_size or settings.USER_IMPORT_BATCH_SIZE
+    workers = settings.USER_IMPORT_WORKERS if workers is None else workers
+    report = ImportReport()
+    rows = read_rows(text)
+
+    with password_hasher(workers) as hash_passwords:
+        while True:
+            try:
+                batch = list(islice(rows, batch_size))
+            except (csv.Error, UnicodeDecodeError) as exc:
+                # Os lotes anteriores já foram gravados; o relatório diz até onde o arquivo foi lido
+                report.add_error(None, None, {"file": f"Arquivo inválido após a linha {report.rows + 1}: {exc}"})
+                break
+            if not batch:
+                break
+            errors_before = len(report.errors)
+            try:
+                created = insert_batch(batch, report, hash_passwords)
+            except IntegrityError:
+                # Outro usuário foi criado com o mesmo username/email entre a validação e o
+                # INSERT: o lote é validado de novo, agora enxergando esse usuário, e inserido
+                # linha a linha para que uma nova colisão não derrube o lote inteiro
+                del report.errors[errors_before:]
+                for _, row in batch:
+                    report.usernames.discard(row["username"].lower())
+                    report.emails.discard(row["email"].lower())
+                created = insert_rows(batch, report, hash_passwords)
+            report.rows += len(batch)
+            report.created += len(created)
+            if progress:
+                progress(report)
+
+    if report.created:
+        # bulk_create não dispara post_save, então a invalidação é explícita
+        cache.invalidate([cache.STUDENTS])
+    return report
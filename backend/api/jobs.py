@@ -0,0 +1,94 @@
+import logging
+import traceback
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+LOCK_TIMEOUT = timedelta(minutes=10)  # Jobs RUNNING há mais tempo que isso são de um worker que caiu
+
+HANDLERS = {}
+
+
+def register(kind):
+    """Registra a função que executa os jobs do tipo informado"""
+
+    def decorator(func):
+        HANDLERS[kind] = func
+        return func
+
+    return decorator
+
+
+def enqueue(kind, **payload):
+    """Enfileira o job somente depois do commit, para o worker ver os dados gravados"""
+    transaction.on_commit(lambda: Job.objects.create(kind=kind, payload=payload))
+
+
+def claim_next():
+    """Trava e marca como RUNNING o próximo job disponível
+
+    O skip_locked permite vários workers em paralelo sem que dois peguem o
+    mesmo job.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status="PENDING", run_after__lte=now)
+            .order_by("run_after", "id")
+            .first()
+        )
+        if job is None:
+            job = (
+                Job.objects.select_for_update(skip_locked=True)
+                .filter(status="RUNNING", locked_at__lt=now - LOCK_TIMEOUT)
+                .order_by("locked_at", "id")
+                .first()
+            )
+        if job is None:
+            return None
+        job.status = "RUNNING"
+        job.locked_at = now
+        job.attempts += 1
+        job.save(update_fields=["status", "locked_at", "attempts", "updated_at"])
+    return job
+
+
+def run(job):
+    handler = HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise LookupError(f"Nenhum handler registrado para '{job.kind}'")
+        handler(**job.payload)
+    except Exception:
+        logger.exception("Job %s falhou", job)
+        job.last_error = traceback.format_exc()
+        if job.attempts >= MAX_ATTEMPTS or handler is None:
+            job.status = "FAILED"
+        else:
+            job.status = "PENDING"
+            job.run_after = timezone.now() + timedelta(seconds=30 * 2 ** job.attempts)
+    else:
+        job.status = "DONE"
+    job.locked_at = None
+    job.save(update_fields=["status", "last_error", "run_after", "locked_at", "updated_at"])
+    return job
+
+
+def run_next():
+    """Executa um job; retorna False quando a fila está vazia"""
+    job = claim_next()
+    if job is None:
+        return False
+    run(job)
+    return True
+
+
+def purge_finished(older_than=timedelta(days=7)):
+    return Job.objects.filter(status="DONE", updated_at__lt=timezone.now() - older_than).delete()[0]
@@ -0,0 +1,43 @@
+import time
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+# Usuários criados pelo generate_dataset
+SYNTHETIC_PREFIX = "sint-"
+SYNTHETIC_PASSWORD = "senha-sintetica-123"
+
+
+class Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back():
+    """Roda o benchmark em uma transação desfeita ao final, sem sujar o banco"""
+    try:
+        with transaction.atomic():
+            yield
+            raise Rollback
+    except Rollback:
+        pass
+
+
+def measure(run):
+    """Executa run() e devolve (segundos, número de consultas SQL)"""
+    with CaptureQueriesContext(connection) as context:
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+    return elapsed, len(context.captured_queries)
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from api import archive
+from api.filters import parse_term_param
+
+
+class Command(BaseCommand):
+    help = (
+        "Move as faltas e solicitações dos semestres encerrados para as tabelas de arquivo, "
+        "mantendo nas tabelas principais apenas os semestres recentes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--keep", type=int, help="Semestres mais recentes mantidos (padrão: ARCHIVE_KEEP_TERMS)")
+        parser.add_argument("--term", nargs="+", help="Semestres a arquivar, no formato AAAA-1 ou AAAA-2")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options["keep"] is not None and options["keep"] < 1:
+            raise CommandError("--keep precisa manter ao menos o semestre corrente.")
+        if options["term"]:
+            terms = [self.parse_term(term) for term in options["term"]]
+        else:
+            terms = archive.archivable_terms(keep=options["keep"])
+        if not terms:
+            self.stdout.write("Nenhum semestre a arquivar")
+            return
+
+        for term in terms:
+            absences, requests = archive.archive_term(term, batch_size=options["batch_size"])
+            self.stdout.write(f"{term}: {absences} faltas e {requests} solicitações arquivadas")
+
+    def parse_term(self, term):
+        try:
+            return parse_term_param({"term": term})
+        except ValidationError:
+            raise CommandError(f"Semestre inválido: {term}. Use o formato AAAA-1 ou AAAA-2.")
@@ -0,0 +1,60 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connections
+from django.db.backends.signals import connection_created
+from django.test import Client
+
+from api.management.benchmark import median, percentile
+from api.models import User
+from api.routers import replica_configured
+from api.serializers import CustomTokenObtainPairSerializer
+
+
+class Command(BaseCommand):
+    help = "Compara a latência de uma listagem abrindo uma conexão por requisição e com conexões persistentes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--username", required=True, help="Usuário em nome de quem as requisições são feitas")
+        parser.add_argument("--path", default="/api/absences/")
+        parser.add_argument("--requests", type=int, default=200)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"Usuário '{options['username']}' não encontrado.")
+        token = CustomTokenObtainPairSerializer.get_token(user).access_token
+        client = Client(headers={"Authorization": f"Bearer {token}"})
+
+        if replica_configured():
+            self.stdout.write("Listagens lidas da réplica (DB_REPLICA_HOST)")
+
+        opened = []
+        connection_created.connect(lambda sender, connection, **kwargs: opened.append(connection.alias), weak=False)
+        for name, max_age in [("conexão por requisição", 0), ("conexões persistentes", 600)]:
+            self.configure(max_age)
+            opened.clear()
+            latencies = []
+            for index in range(options["requests"]):
+                start = time.perf_counter()
+                # O parâmetro extra muda a chave do cache, então toda requisição consulta o banco
+                response = client.get(options["path"], {"bench": f"{max_age}-{index}"})
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    raise CommandError(f"{options['path']} respondeu {response.status_code}")
+                # O cliente de testes não fecha as conexões; o handler real faz isto ao fim de cada requisição
+                close_old_connections()
+            self.report(name, latencies, len(opened))
+
+    def configure(self, max_age):
+        for connection in connections.all():
+            connection.close()
+            connection.settings_dict["CONN_MAX_AGE"] = max_age
+            connection.settings_dict["CONN_HEALTH_CHECKS"] = bool(max_age)
+
+    def report(self, name, latencies, opened):
+        self.stdout.write(
+            f"{name:>24}: p50 {median(latencies) * 1000:7.2f} ms, p95 {percentile(latencies, 0.95) * 1000:7.2f} ms, "
+            f"{opened} conexões abertas em {len(latencies)} requisições"
+        )
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication, JWTStatelessUserAuthentication
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+
+from api.management.benchmark import measure, rolled_back
+from api.models import User
+from api.serializers import CustomTokenObtainPairSerializer
+
+PASSWORD = "senha-do-benchmark-123"
+
+
+class Command(BaseCommand):
+    help = "Mede a vazão do login e o custo de autenticar uma requisição com JWT"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--logins", type=int, default=20)
+        parser.add_argument("--requests", type=int, default=500)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            user = User.objects.create_user(
+                username="bench-login", email="bench-login@example.com",
+                password=PASSWORD, role="professor", name="Bench",
+            )
+            credentials = {"username": user.username, "password": PASSWORD}
+            logins = options["logins"]
+
+            self.report("login (validação dupla, antigo)", logins, *measure(
+                lambda: [self.legacy_login(credentials) for _ in range(logins)]
+            ))
+            client = APIClient()
+            self.report("login (validação única)", logins, *measure(
+                lambda: [client.post("/api/auth/login/", credentials, format="json") for _ in range(logins)]
+            ))
+
+            token = CustomTokenObtainPairSerializer.get_token(user).access_token
+            request = APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+            total = options["requests"]
+            for name, backend in [("auth com banco", JWTAuthentication()), ("auth por claims", JWTStatelessUserAuthentication())]:
+                self.report(name, total, *measure(
+                    lambda: [backend.authenticate(request)[0].role for _ in range(total)]
+                ))
+
+    def legacy_login(self, credentials):
+        # Reproduz o fluxo anterior: a view validava as credenciais e depois validava de novo
+        for _ in range(2):
+            serializer = TokenObtainPairSerializer(data=credentials)
+            serializer.is_valid(raise_exception=True)
+
+    def report(self, name, count, seconds, queries):
+        self.stdout.write(
+            f"{name:>32}: {count / seconds:10.1f} op/s, {queries / count:.1f} consultas por operação"
+        )
@@ -0,0 +1,63 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIClient
+
+from api.management.benchmark import measure, median, rolled_back
+from api.models import User
+from api.serializers import CustomTokenObtainPairSerializer
+
+
+class Command(BaseCommand):
+    help = "Compara a chamada em lote com o registro de uma falta por requisição"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, default=60)
+        parser.add_argument("--rounds", type=int, default=5)
+
+    def handle(self, *args, **options):
+        results = {"por linha": [], "em lote": []}
+        for _ in range(options["rounds"]):
+            with rolled_back():
+                client, students = self.setup_class(options["students"])
+                results["por linha"].append(self.per_row(client, students))
+                results["em lote"].append(self.bulk(client, students))
+
+        for name, runs in results.items():
+            seconds = median(run[0] for run in runs)
+            queries = runs[0][1]
+            self.stdout.write(f"{name:>10}: {seconds * 1000:8.1f} ms (mediana), {queries} consultas")
+
+    def setup_class(self, size):
+        professor = User.objects.create_user(
+            username="bench-professor", email="bench-professor@example.com",
+            password="bench", role="professor", name="Bench",
+        )
+        students = User.objects.bulk_create(
+            User(username=f"bench-aluno-{i}", email=f"bench-aluno-{i}@example.com", role="student", name=f"Aluno {i}")
+            for i in range(size)
+        )
+        if students[0].pk is None:
+            students = list(User.objects.filter(username__startswith="bench-aluno-"))
+
+        client = APIClient()
+        token = CustomTokenObtainPairSerializer.get_token(professor).access_token
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        return client, students
+
+    def per_row(self, client, students):
+        def run():
+            for student in students:
+                client.post("/api/absences/create/", {
+                    "student": student.pk, "discipline": "Benchmark", "date": date(2025, 1, 1), "is_absent": True,
+                }, format="json")
+        return measure(run)
+
+    def bulk(self, client, students):
+        def run():
+            client.post("/api/absences/bulk-create/", {
+                "discipline": "Benchmark",
+                "date": date(2025, 1, 2),
+                "entries": [{"student": student.pk, "is_absent": True} for student in students],
+            }, format="json")
+        return measure(run)
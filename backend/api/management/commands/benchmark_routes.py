@@ -0,0 +1,352 @@
+import json
+import platform
+import tracemalloc
+import uuid
+from datetime import date, timedelta
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from api import urls as api_urls
+from api.management.benchmark import SYNTHETIC_PASSWORD, SYNTHETIC_PREFIX, measure, median, percentile, rolled_back
+from api.management.commands.generate_dataset import DUMMY_FILES
+from api.models import Absence, ClassGroup, ForgivenessRequest, JustificationUpload, User
+from api.pagination import RankedPagination
+from api.serializers import CustomTokenObtainPairSerializer
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / "benchmarks" / "baseline.json"
+
+
+class Scenario:
+    """Uma requisição medida: rota, papel do usuário e como montar path e corpo
+
+    path, data e params podem ser funções de (contexto, iteração). Escritas
+    rodam em uma transação desfeita ao final de cada iteração; prepare
+    roda dentro dela, antes da medição.
+    """
+
+    def __init__(self, route, method, path, role, name=None, data=None, params=None,
+                 format="json", headers=None, prepare=None, write=False, iterations=None, settings=None):
+        self.route = route
+        self.name = name or route
+        self.method = method
+        self.path = path
+        self.role = role
+        self.data = data
+        self.params = params
+        self.format = format
+        self.headers = headers or {}
+        self.prepare = prepare
+        self.write = write
+        self.iterations = iterations
+        self.settings = settings or {}
+
+
+def resolve(value, context, iteration):
+    return value(context, iteration) if callable(value) else value
+
+
+async def consume(response):
+    return b"".join([chunk async for chunk in response.streaming_content])
+
+
+def last_month():
+    return {"date_from": str(date.today() - timedelta(days=30)), "date_to": str(date.today())}
+
+
+def new_upload(context):
+    content_type, content = DUMMY_FILES[0]
+    upload = JustificationUpload.objects.create(
+        owner=context["student"], filename="atestado.pdf", content_type=content_type, size=len(content),
+    )
+    return {"upload": upload, "content": content}
+
+
+# Os mesmos cenários com os serializers e o renderer do DRF, para comparar com api/rows.py
+DRF_SERIALIZATION = {"API_FAST_SERIALIZATION": False}
+
+# Os baldes de api/throttles.py continuam sendo consultados, mas com folga para as repetições
+UNTHROTTLED = {"API_THROTTLE_RATES": {scope: "1000000/s" for scope in settings.API_THROTTLE_RATES}}
+
+SCENARIOS = [
+    Scenario("get_token", "post", "/api/token/", None, name="token",
+             data=lambda c, i: {"username": c["student"].username, "password": SYNTHETIC_PASSWORD}),
+    Scenario("login", "post", "/api/auth/login/", None,
+             data=lambda c, i: {"username": c["professor"].username, "password": SYNTHETIC_PASSWORD}),
+    Scenario("refresh", "post", "/api/token/refresh/", None, data=lambda c, i: {"refresh": c["refresh"]}),
+    Scenario("register", "post", "/api/auth/register/", "admin", write=True, data=lambda c, i: {
+        "username": f"bench-novo-{i}", "email": f"bench-novo-{i}@example.com",
+        "password": SYNTHETIC_PASSWORD, "role": "student", "name": "Novo",
+    }),
+    Scenario("user-list", "get", "/api/user/", "admin"),
+    Scenario("student-list", "get", "/api/students/", "professor"),
+    Scenario("student-list", "get", "/api/students/", "professor", name="student-list (DRF)", settings=DRF_SERIALIZATION),
+    Scenario("cache-stats", "get", "/api/cache/stats/", "admin"),
+    Scenario("metrics", "get", "/api/metrics/", "admin"),
+    Scenario("discipline-list", "get", "/api/disciplines/", "student"),
+    Scenario("class-group-list", "get", "/api/class-groups/", "professor"),
+    Scenario("class-group-students", "get", lambda c, i: f"/api/class-groups/{c['class_group'].pk}/students/",
+             "professor"),
+    Scenario("class-group-students", "post", lambda c, i: f"/api/class-groups/{c['class_group'].pk}/students/",
+             "admin", name="class-group-students (matrícula)", write=True,
+             data=lambda c, i: {"students": c["class_ids"]}),
+    Scenario("absence-list", "get", "/api/absences/", "professor"),
+    Scenario("absence-list", "get", "/api/absences/", "professor", name="absence-list (DRF)", settings=DRF_SERIALIZATION,
+             params={"page_size": 200}),
+    Scenario("absence-list", "get", "/api/absences/", "professor", name="absence-list (200 linhas)",
+             params={"page_size": 200}),
+    Scenario("absence-list", "get", "/api/absences/", "professor", name="absence-list (filtros)",
+             params=lambda c, i: {"discipline": "Matemática", **last_month()}),
+    Scenario("absence-list", "get", "/api/absences/", "student", name="absence-list (aluno, include_requests)",
+             params={"include_requests": "true"}),
+    Scenario("absence-list", "get", "/api/absences/", "professor", name="absence-list (turma)",
+             params=lambda c, i: {"class_group": c["class_group"].pk}),
+    Scenario("absence-list", "get", "/api/absences/", "professor", name="absence-list (página profunda)",
+             params=lambda c, i: {"cursor": c["deep_cursor"], "page_size": 200}),
+    Scenario("absence-search", "get", "/api/absences/search/", "professor", params={"q": "consulta"}),
+    Scenario("absence-search", "get", "/api/absences/search/", "professor", name="absence-search (prefixos)",
+             params={"q": "greve oni"}),
+    Scenario("absence-search", "get", "/api/absences/search/", "professor", name="absence-search (nome e motivo)",
+             params=lambda c, i: {"q": f"{c['student'].name} médico"}),
+    Scenario("absence-search", "get", "/api/absences/search/", "student", name="absence-search (aluno)",
+             params={"q": "consulta"}),
+    Scenario("absence-search", "get", "/api/absences/search/", "professor", name="absence-search (página 10)",
+             params=lambda c, i: {"q": "consulta", "cursor": RankedPagination().encode_cursor(180)}),
+    Scenario("absence-create", "post", "/api/absences/create/", "professor", write=True,
+             data=lambda c, i: {"student": c["student"].pk, "discipline": "Física", "date": str(date.today())}),
+    Scenario("absence-bulk-create", "post", "/api/absences/bulk-create/", "professor", write=True,
+             data=lambda c, i: {
+                 "discipline": "Química", "date": str(date.today()),
+                 "entries": [{"student": pk, "is_absent": pk % 5 == 0} for pk in c["class_ids"]],
+             }),
+    Scenario("absence-check", "get", "/api/absences/check/", "professor", iterations=3),
+    Scenario("absence-check", "get", "/api/absences/check/", "professor", name="absence-check (DRF)", iterations=3,
+             settings=DRF_SERIALIZATION),
+    Scenario("absence-summary-list", "get", "/api/absence-summaries/", "student"),
+    Scenario("absence-update", "patch", lambda c, i: f"/api/absences/update/{c['absence'].pk}/", "professor",
+             write=True, data={"reason": "Atualizada pelo benchmark"}),
+    Scenario("forgiveness-request-list", "get", "/api/forgiveness-requests/", "professor"),
+    Scenario("forgiveness-request-list", "get", "/api/forgiveness-requests/", "professor",
+             name="forgiveness-request-list (DRF)", settings=DRF_SERIALIZATION),
+    Scenario("forgiveness-request-list", "get", "/api/forgiveness-requests/", "student",
+             name="forgiveness-request-list (aluno)"),
+    Scenario("forgiveness-request-create", "post", "/api/forgiveness-requests/create/", "student", write=True,
+             format="multipart", data=lambda c, i: {
+                 "absence": c["absence_without_request"].pk,
+                 "justification_file": SimpleUploadedFile("atestado.pdf", DUMMY_FILES[0][1]),
+             }),
+    Scenario("justification-upload-create", "post", "/api/justification-uploads/", "student", write=True,
+             data={"filename": "atestado.pdf", "content_type": DUMMY_FILES[0][0], "size": len(DUMMY_FILES[0][1])}),
+    Scenario("justification-upload-detail", "put", lambda c, i: f"/api/justification-uploads/{c['upload'].pk}/",
+             "student", write=True, prepare=new_upload, format=None,
+             data=lambda c, i: c["content"],
+             headers=lambda c, i: {
+                 "Content-Type": "application/octet-stream",
+                 "Content-Range": f"bytes 0-{len(c['content']) - 1}/{len(c['content'])}",
+             }),
+    Scenario("forgiveness-request-update", "patch", lambda c, i: f"/api/forgiveness-requests/{c['pending'][0]}/update/",
+             "professor", write=True, data={"status": "APPROVED"}),
+    Scenario("forgiveness-request-batch-review", "post", "/api/forgiveness-requests/batch-review/", "professor",
+             write=True, data=lambda c, i: {"decisions": [{"id": pk, "status": "APPROVED"} for pk in c["pending"]]}),
+    Scenario("async-student-list", "get", "/api/async/students/", "professor"),
+    Scenario("async-absence-list", "get", "/api/async/absences/", "professor"),
+    Scenario("async-forgiveness-request-list", "get", "/api/async/forgiveness-requests/", "professor"),
+    Scenario("event-stream", "get", "/api/events/stream/", "student", settings={"EVENTS_STREAM_TIMEOUT": 0},
+             params={"last_event_id": "0"}),
+    Scenario("absence-export", "get", "/api/exports/absences.csv", "admin", iterations=3,
+             params=lambda c, i: last_month()),
+    Scenario("forgiveness-request-export", "get", "/api/exports/forgiveness-requests.ndjson", "admin", iterations=3,
+             params=lambda c, i: last_month()),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede todas as rotas da API sobre a base do generate_dataset (p50/p95, consultas, memória) "
+        "e falha quando alguma piora em relação ao baseline salvo"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--only", nargs="+", help="Nomes dos cenários a rodar")
+        parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+        parser.add_argument("--save-baseline", action="store_true", help="Grava os resultados como novo baseline")
+        parser.add_argument("--tolerance", type=float, default=0.3, help="Piora aceita em latência e memória (0.3 = 30%%)")
+        parser.add_argument("--cached", action="store_true", help="Permite respostas vindas do cache das listagens")
+
+    def handle(self, *args, **options):
+        self.run_id = uuid.uuid4().hex[:8]
+        context = self.build_context()
+        scenarios = [s for s in SCENARIOS if not options["only"] or s.name in options["only"]]
+        self.check_coverage()
+
+        results = {}
+        for scenario in scenarios:
+            results[scenario.name] = self.run(scenario, context, options)
+            self.report(scenario.name, results[scenario.name])
+
+        baseline_path = Path(options["baseline"])
+        if options["save_baseline"]:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(
+                {"environment": self.environment(), "results": results}, indent=2, ensure_ascii=False,
+            ) + "\n")
+            self.stdout.write(f"Baseline gravado em {baseline_path}")
+        elif baseline_path.exists():
+            self.compare(json.loads(baseline_path.read_text()), results, options["tolerance"])
+        else:
+            self.stdout.write(f"Sem baseline em {baseline_path}; use --save-baseline para criar")
+
+    def build_context(self):
+        synthetic = User.objects.filter(username__startswith=SYNTHETIC_PREFIX)
+        try:
+            admin = synthetic.get(username=f"{SYNTHETIC_PREFIX}admin-0")
+            professor = synthetic.get(username=f"{SYNTHETIC_PREFIX}professor-0")
+            student = synthetic.get(username=f"{SYNTHETIC_PREFIX}student-0")
+        except User.DoesNotExist:
+            raise CommandError("Base sintética não encontrada, rode antes: python manage.py generate_dataset")
+
+        class_group = ClassGroup.objects.filter(name__startswith=SYNTHETIC_PREFIX, professor=professor).first()
+        if class_group is None:
+            raise CommandError("Base sintética sem turmas, rode de novo: python manage.py generate_dataset")
+
+        absences = Absence.objects.filter(student=student, is_absent=True)
+        tokens = {role: CustomTokenObtainPairSerializer.get_token(user) for role, user in
+                  [("admin", admin), ("professor", professor), ("student", student)]}
+        clients = {None: APIClient()}
+        for role, token in tokens.items():
+            clients[role] = APIClient()
+            clients[role].credentials(HTTP_AUTHORIZATION=f"Bearer {token.access_token}")
+
+        # Cursor da décima página de 200, para medir a paginação longe do início
+        next_url = clients["professor"].get("/api/absences/", {"page_size": 200}).data["next"]
+        for _ in range(8):
+            if next_url is None:
+                break
+            next_url = clients["professor"].get(next_url).data["next"]
+
+        return {
+            "clients": clients,
+            "student": student,
+            "professor": professor,
+            "refresh": str(tokens["student"]),
+            "absence": absences.first(),
+            "absence_without_request": absences.filter(forgivenessrequest__isnull=True).first(),
+            "pending": list(ForgivenessRequest.objects.filter(status="PENDING").values_list("id", flat=True)[:50]),
+            "class_group": class_group,
+            "class_ids": list(synthetic.filter(role="student").values_list("id", flat=True)[:40]),
+            "deep_cursor": parse_qs(urlsplit(next_url).query)["cursor"] if next_url else [],
+        }
+
+    def check_coverage(self):
+        measured = {scenario.route for scenario in SCENARIOS}
+        missing = sorted({pattern.name for pattern in api_urls.urlpatterns} - measured)
+        if missing:
+            self.stdout.write(self.style.WARNING(f"Rotas sem cenário de benchmark: {', '.join(missing)}"))
+
+    def request(self, scenario, context, iteration, options):
+        client = context["clients"][scenario.role]
+        path = resolve(scenario.path, context, iteration)
+        headers = resolve(scenario.headers, context, iteration)
+        if scenario.method == "get":
+            params = dict(resolve(scenario.params, context, iteration) or {})
+            if not options["cached"]:
+                # Muda a chave do cache: cada iteração, de cada cenário e execução, percorre o caminho até o banco
+                params["bench"] = f"{self.run_id}-{scenario.name}-{iteration}"
+            response = client.get(path, params, headers=headers)
+        else:
+            data = resolve(scenario.data, context, iteration)
+            if scenario.format is None:
+                response = getattr(client, scenario.method)(path, data, headers=headers, content_type=headers.pop("Content-Type"))
+            else:
+                response = getattr(client, scenario.method)(path, data, format=scenario.format, headers=headers)
+        if getattr(response, "is_async", False):
+            async_to_sync(consume)(response)
+        elif response.streaming:
+            b"".join(response.streaming_content)
+        if response.status_code >= 400:
+            raise CommandError(f"{scenario.name}: {path} respondeu {response.status_code}: {response.content[:200]!r}")
+
+    def run(self, scenario, context, options):
+        iterations = min(options["iterations"], scenario.iterations or options["iterations"])
+        timings, queries = [], []
+
+        def once(iteration, track_memory=False):
+            with rolled_back() if scenario.write else _noop():
+                iteration_context = dict(context)
+                if scenario.prepare:
+                    iteration_context.update(scenario.prepare(context))
+                if track_memory:
+                    tracemalloc.start()
+                    self.request(scenario, iteration_context, iteration, options)
+                    peak = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                    return peak
+                return measure(lambda: self.request(scenario, iteration_context, iteration, options))
+
+        with override_settings(**{**UNTHROTTLED, **scenario.settings}):
+            once(-1)  # aquecimento
+            for iteration in range(iterations):
+                seconds, count = once(iteration)
+                timings.append(seconds)
+                queries.append(count)
+            # A memória é medida à parte: o tracemalloc deixa as requisições bem mais lentas
+            peak = once(iterations, track_memory=True)
+
+        return {
+            "p50_ms": round(median(timings) * 1000, 2),
+            "p95_ms": round(percentile(timings, 0.95) * 1000, 2),
+            "queries": median(queries),
+            "peak_kb": round(peak / 1024, 1),
+        }
+
+    def report(self, name, result):
+        self.stdout.write(
+            f"{name:>44}: p50 {result['p50_ms']:8.2f} ms, p95 {result['p95_ms']:8.2f} ms, "
+            f"{result['queries']:3} consultas, pico {result['peak_kb']:9.1f} KB"
+        )
+
+    def environment(self):
+        return {
+            "database": settings.DATABASES["default"]["ENGINE"].rsplit(".", 1)[-1],
+            "python": platform.python_version(),
+            "users": User.objects.filter(username__startswith=SYNTHETIC_PREFIX).count(),
+            "absences": Absence.objects.count(),
+            "forgiveness_requests": ForgivenessRequest.objects.count(),
+        }
+
+    def compare(self, baseline, results, tolerance):
+        if baseline.get("environment") != self.environment():
+            self.stdout.write(self.style.WARNING(
+                "A base ou o ambiente diferem do baseline; latência e memória podem não ser comparáveis"
+            ))
+
+        regressions = []
+        for name, result in results.items():
+            previous = baseline["results"].get(name)
+            if previous is None:
+                continue
+            # Consultas são determinísticas: qualquer aumento é um N+1 novo
+            if result["queries"] > previous["queries"]:
+                regressions.append(f"{name}: {previous['queries']} -> {result['queries']} consultas")
+            for metric in ("p95_ms", "peak_kb"):
+                if result[metric] > previous[metric] * (1 + tolerance):
+                    regressions.append(f"{name}: {metric} {previous[metric]} -> {result[metric]}")
+
+        if regressions:
+            raise CommandError("Regressões em relação ao baseline:\n  " + "\n  ".join(regressions))
+        self.stdout.write(self.style.SUCCESS("Nenhuma regressão em relação ao baseline"))
+
+
+class _noop:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
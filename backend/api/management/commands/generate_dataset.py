@@ -0,0 +1,195 @@
+import random
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api import cache, search, summaries, uploads
+from api.management.benchmark import SYNTHETIC_PASSWORD, SYNTHETIC_PREFIX
+from api.models import Absence, ClassGroup, Discipline, Enrolment, ForgivenessRequest, User
+from api.signals import muted_signals
+from api.terms import term_for
+
+DISCIPLINES = [
+    "Matemática", "Português", "História", "Geografia", "Física", "Química",
+    "Biologia", "Inglês", "Filosofia", "Sociologia", "Artes", "Educação Física",
+]
+
+# Textos para a busca (api/search.py): motivos das faltas e comentários das revisões
+REASONS = [
+    "Consulta médica", "Atestado médico de dois dias", "Consulta odontológica", "Problema de transporte",
+    "Greve dos ônibus", "Falecimento na família", "Competição esportiva", "Doença", "Exame de sangue",
+    "Internação hospitalar", "Viagem com a família", "Audiência judicial", "Alistamento militar",
+]
+COMMENTS = [
+    "Atestado conferido", "Documento ilegível, enviar novamente", "Sem assinatura do médico",
+    "Justificativa aceita pela coordenação", "Fora do prazo de entrega", "Declaração da empresa de ônibus",
+]
+
+# Arquivos de justificativa compartilhados, como acontece com a deduplicação por conteúdo
+DUMMY_FILES = [
+    ("application/pdf", b"%PDF-1.4\n% atestado sintetico 1\n"),
+    ("application/pdf", b"%PDF-1.4\n% atestado sintetico 2\n"),
+    ("image/png", b"\x89PNG\r\n\x1a\n" + b"\x00" * 64),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera uma base sintética do tamanho de uma instituição (usuários, faltas e solicitações) "
+        "com inserções em lote, para os benchmarks"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, default=3000)
+        parser.add_argument("--professors", type=int, default=120)
+        parser.add_argument("--admins", type=int, default=5)
+        parser.add_argument("--absences", type=int, default=300_000, help="Registros de chamada (presenças e faltas)")
+        parser.add_argument("--absent-ratio", type=float, default=0.15, help="Fração dos registros que são faltas")
+        parser.add_argument("--request-ratio", type=float, default=0.3, help="Fração das faltas com solicitação")
+        parser.add_argument("--days", type=int, default=730, help="Período coberto, terminando hoje")
+        parser.add_argument("--class-size", type=int, default=40, help="Alunos por turma do semestre atual")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--clear", action="store_true", help="Apenas remove a base sintética anterior")
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options["seed"])
+        # Gerador separado para os textos, para não mudar as faltas geradas com a mesma semente
+        self.text_random = random.Random(options["seed"] + 1)
+        self.batch_size = options["batch_size"]
+
+        self.clear()
+        if options["clear"]:
+            self.finish()
+            return
+
+        start = time.perf_counter()
+        student_ids = self.create_users(options)
+        absence_count = self.create_absences(student_ids, options)
+        request_count = self.create_requests(options)
+        self.create_class_groups(student_ids, options)
+        self.finish(student_ids)
+        self.stdout.write(
+            f"{len(student_ids)} alunos, {absence_count} registros de chamada e {request_count} solicitações "
+            f"gerados em {time.perf_counter() - start:.1f}s (senha de todos: {SYNTHETIC_PASSWORD})"
+        )
+
+    def clear(self):
+        synthetic = User.objects.filter(username__startswith=SYNTHETIC_PREFIX)
+        user_ids = list(synthetic.values_list("id", flat=True))
+        with muted_signals(), transaction.atomic():
+            ClassGroup.objects.filter(name__startswith=SYNTHETIC_PREFIX).delete()
+            # Em blocos de alunos, para o coletor de exclusão não carregar todas as faltas de uma vez
+            for offset in range(0, len(user_ids), 200):
+                chunk = user_ids[offset:offset + 200]
+                ForgivenessRequest.objects.filter(absence__student_id__in=chunk).delete()
+                Absence.objects.filter(student_id__in=chunk).delete()
+            synthetic.delete()
+        if user_ids:
+            self.stdout.write(f"{len(user_ids)} usuários sintéticos anteriores removidos")
+
+    def create_users(self, options):
+        # Um único hash para todos: o custo do PBKDF2 dominaria a geração
+        password = make_password(SYNTHETIC_PASSWORD)
+        users = []
+        for role, count in [("admin", options["admins"]), ("professor", options["professors"]), ("student", options["students"])]:
+            for index in range(count):
+                username = f"{SYNTHETIC_PREFIX}{role}-{index}"
+                users.append(User(
+                    username=username, email=f"{username}@example.com", password=password,
+                    role=role, name=f"{role.title()} Sintético {index}",
+                ))
+        with muted_signals():
+            User.objects.bulk_create(users, batch_size=self.batch_size)
+        return list(
+            User.objects.filter(username__startswith=f"{SYNTHETIC_PREFIX}student-").values_list("id", flat=True)
+        )
+
+    def create_absences(self, student_ids, options):
+        first_day = date.today() - timedelta(days=options["days"])
+        weekdays = [first_day + timedelta(days=offset) for offset in range(options["days"] + 1)]
+        weekdays = [day for day in weekdays if day.weekday() < 5]
+        discipline_ids = [Discipline.objects.get_or_create(name=name)[0].pk for name in DISCIPLINES]
+
+        total = options["absences"]
+        for offset in range(0, total, self.batch_size):
+            batch = [
+                Absence(
+                    student_id=self.random.choice(student_ids),
+                    discipline_id=self.random.choice(discipline_ids),
+                    date=self.random.choice(weekdays),
+                    is_absent=self.random.random() < options["absent_ratio"],
+                )
+                for _ in range(min(self.batch_size, total - offset))
+            ]
+            for absence in batch:
+                if absence.is_absent and self.text_random.random() < 0.5:
+                    absence.reason = self.text_random.choice(REASONS)
+            Absence.objects.bulk_create(batch)
+        return total
+
+    def create_requests(self, options):
+        stored_files = []
+        for content_type, content in DUMMY_FILES:
+            hasher = uploads.ContentHasher()
+            hasher.update(content)
+            stored_files.append(uploads.store(ContentFile(content), content_type, hasher.hexdigest()))
+
+        # bulk_create no MySQL não devolve os ids, então as faltas são lidas de volta
+        absent = Absence.objects.filter(student__username__startswith=SYNTHETIC_PREFIX, is_absent=True)
+        statuses = ["PENDING"] * 5 + ["APPROVED"] * 3 + ["REJECTED"] * 2
+        batch, created = [], 0
+        for absence_id in absent.values_list("id", flat=True).iterator(chunk_size=self.batch_size):
+            if self.random.random() >= options["request_ratio"]:
+                continue
+            stored_file = self.random.choice(stored_files)
+            status = self.random.choice(statuses)
+            batch.append(ForgivenessRequest(
+                absence_id=absence_id,
+                stored_file=stored_file,
+                justification_file=stored_file.file.name,
+                status=status,
+                comments=None if status == "PENDING" else self.text_random.choice(COMMENTS),
+            ))
+            if len(batch) == self.batch_size:
+                created += len(ForgivenessRequest.objects.bulk_create(batch))
+                batch = []
+        created += len(ForgivenessRequest.objects.bulk_create(batch))
+        return created
+
+    def create_class_groups(self, student_ids, options):
+        # Uma turma por disciplina no semestre atual, com os professores sintéticos em rodízio
+        professor_ids = list(
+            User.objects.filter(username__startswith=f"{SYNTHETIC_PREFIX}professor-").order_by("id")
+            .values_list("id", flat=True)
+        )
+        term = term_for(date.today())
+        groups = ClassGroup.objects.bulk_create([
+            ClassGroup(
+                discipline=discipline, term=term, name=f"{SYNTHETIC_PREFIX}A",
+                professor_id=professor_ids[index % len(professor_ids)] if professor_ids else None,
+            )
+            for index, discipline in enumerate(Discipline.objects.filter(name__in=DISCIPLINES).order_by("id"))
+        ])
+        # bulk_create no MySQL não devolve os ids, então as turmas são lidas de volta
+        group_ids = ClassGroup.objects.filter(name__startswith=SYNTHETIC_PREFIX).values_list("id", flat=True)
+        size = min(options["class_size"], len(student_ids))
+        Enrolment.objects.bulk_create(
+            [
+                Enrolment(class_group_id=group_id, student_id=student_id)
+                for group_id in group_ids
+                for student_id in self.random.sample(student_ids, size)
+            ],
+            batch_size=self.batch_size,
+        )
+        return len(groups)
+
+    def finish(self, student_ids=()):
+        # As inserções em lote não disparam os signals
+        self.stdout.write(f"{summaries.rebuild()} resumos de faltas recalculados")
+        self.stdout.write(f"{search.rebuild()} documentos da busca textual indexados")
+        cache.invalidate([cache.ABSENCES, cache.REQUESTS, cache.STUDENTS], student_ids=student_ids)
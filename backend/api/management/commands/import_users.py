@@ -0,0 +1,50 @@
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from api import imports
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa usuários de um CSV (username, email, password, role, name) em lotes, "
+        "calculando os hashes das senhas em vários processos"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Arquivo CSV, ou - para ler da entrada padrão")
+        parser.add_argument("--batch-size", type=int, default=settings.USER_IMPORT_BATCH_SIZE)
+        parser.add_argument("--workers", type=int, default=settings.USER_IMPORT_WORKERS,
+                            help="Processos que calculam os hashes das senhas")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            if options["path"] == "-":
+                report = self.run(sys.stdin, options)
+            else:
+                with open(options["path"], encoding="utf-8-sig", newline="") as file:
+                    report = self.run(file, options)
+        except OSError as exc:
+            raise CommandError(f"Não foi possível ler o arquivo: {exc}")
+        except ValidationError as exc:
+            raise CommandError(exc.detail["file"])
+
+        for error in report.errors:
+            details = "; ".join(f"{field}: {message}" for field, message in error["errors"].items())
+            self.stderr.write(f"linha {error['line'] or '-'} ({error['username'] or '-'}): {details}")
+        self.stdout.write(
+            f"{report.created} usuários criados de {report.rows} linhas, {len(report.errors)} com erro, "
+            f"em {time.perf_counter() - start:.1f}s"
+        )
+
+    def run(self, file, options):
+        return imports.import_users(
+            file, batch_size=options["batch_size"], workers=options["workers"], progress=self.progress,
+        )
+
+    def progress(self, report):
+        self.stdout.write(f"{report.rows} linhas lidas, {report.created} usuários criados")
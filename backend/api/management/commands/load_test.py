@@ -0,0 +1,67 @@
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.management.benchmark import median, percentile
+from api.models import User
+from api.serializers import CustomTokenObtainPairSerializer
+
+ENDPOINTS = ("absences", "forgiveness-requests", "students")
+
+
+class Command(BaseCommand):
+    help = (
+        "Dispara requisições concorrentes contra um servidor em execução e compara "
+        "a vazão das listagens síncronas (/api/...) com as assíncronas (/api/async/...)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000", help="Endereço do servidor")
+        parser.add_argument("--username", required=True, help="Usuário em nome de quem as requisições são feitas")
+        parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=list(ENDPOINTS))
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument("--requests", type=int, default=500, help="Requisições por endpoint")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"Usuário '{options['username']}' não encontrado.")
+        token = CustomTokenObtainPairSerializer.get_token(user).access_token
+        headers = {"Authorization": f"Bearer {token}"}
+
+        base = options["url"].rstrip("/")
+        for endpoint in options["endpoints"]:
+            for label, path in [("sync", f"/api/{endpoint}/"), ("async", f"/api/async/{endpoint}/")]:
+                self.report(f"{label} {endpoint}", *self.run(base + path, headers, options["concurrency"], options["requests"]))
+
+    def run(self, url, headers, concurrency, total):
+        def fetch(_):
+            request = urllib.request.Request(url, headers=headers)
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    response.read()
+                    ok = response.status == 200
+            except (urllib.error.URLError, OSError):
+                ok = False
+            return time.perf_counter() - start, ok
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(fetch, range(total)))
+        elapsed = time.perf_counter() - start
+
+        latencies = sorted(latency for latency, _ in results)
+        errors = sum(1 for _, ok in results if not ok)
+        return total, elapsed, latencies, errors
+
+    def report(self, name, total, elapsed, latencies, errors):
+        p50 = median(latencies) * 1000
+        p95 = percentile(latencies, 0.95) * 1000
+        self.stdout.write(
+            f"{name:>28}: {total / elapsed:8.1f} req/s, p50 {p50:7.1f} ms, p95 {p95:7.1f} ms, {errors} erros"
+        )
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from api import metrics
+
+
+class Command(BaseCommand):
+    help = "Resumo por rota das métricas coletadas pelo MetricsMiddleware (latência, consultas, serializers)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sort", choices=["p95", "queries", "requests"], default="p95")
+        parser.add_argument("--reset", action="store_true", help="Zera os contadores depois de mostrar")
+
+    def handle(self, *args, **options):
+        rows = []
+        for route, values in metrics.snapshot().items():
+            count = values["requests"]
+            if not count:
+                continue
+            rows.append({
+                "route": route,
+                "requests": count,
+                "p50": metrics.quantile(values, 0.5),
+                "p95": metrics.quantile(values, 0.95),
+                "queries": values["queries"] / count,
+                "db": values["query_time_us"] / count / 1000,
+                "serializer": values["serializer_time_us"] / count / 1000,
+                "bytes": values["response_bytes"] / count,
+            })
+
+        rows.sort(key=lambda row: row[options["sort"]], reverse=True)
+        self.stdout.write(
+            f"{'rota':<36} {'amostras':>8} {'p50 ≤':>7} {'p95 ≤':>7} {'consultas':>9} {'db ms':>8} {'serial. ms':>10} {'bytes':>9}"
+        )
+        for row in rows:
+            self.stdout.write(
+                f"{row['route']:<36} {row['requests']:>8} {row['p50']:>7} {row['p95']:>7} {row['queries']:>9.1f} "
+                f"{row['db']:>8.2f} {row['serializer']:>10.2f} {row['bytes']:>9.0f}"
+            )
+
+        if options["reset"]:
+            metrics.reset()
+            self.stdout.write("Contadores zerados")
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api import events, jobs, uploads
+
+
+class Command(BaseCommand):
+    help = "Worker da fila de jobs em segundo plano (prévias de justificativas, etc.)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Esvazia a fila e encerra")
+        parser.add_argument("--sleep", type=float, default=2.0, help="Espera em segundos quando a fila está vazia")
+        parser.add_argument("--max-jobs", type=int, default=0, help="Encerra após N jobs (0 = sem limite)")
+
+    def handle(self, *args, **options):
+        purged = jobs.purge_finished()
+        if purged:
+            self.stdout.write(f"{purged} jobs concluídos antigos removidos")
+        purged = events.purge()
+        if purged:
+            self.stdout.write(f"{purged} eventos antigos removidos")
+        purged = uploads.purge_abandoned()
+        if purged:
+            self.stdout.write(f"{purged} envios de justificativa abandonados removidos")
+
+        processed = 0
+        while not options["max_jobs"] or processed < options["max_jobs"]:
+            if jobs.run_next():
+                processed += 1
+                continue
+            if options["once"]:
+                break
+            time.sleep(options["sleep"])
+        self.stdout.write(f"{processed} jobs processados")
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api import summaries
+
+
+class Command(BaseCommand):
+    help = "Recalcula do zero a tabela de resumos de faltas por aluno, disciplina e semestre"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            created = summaries.rebuild()
+        self.stdout.write(f"{created} resumos recalculados")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api import search
+
+
+class Command(BaseCommand):
+    help = "Recria do zero os documentos da busca textual das faltas (api/search.py)"
+
+    def handle(self, *args, **options):
+        # Em uma transação, para a busca não ficar vazia enquanto os documentos são recriados
+        with transaction.atomic():
+            indexed = search.rebuild()
+        self.stdout.write(f"{indexed} documentos indexados")
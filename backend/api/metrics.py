@@ -0,0 +1,277 @@
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .cache import KEY_PREFIX, state_cache
+
+ROUTES_KEY = f"{KEY_PREFIX}:metrics:routes"
+
+# Limites do histograma de latência, em milissegundos
+BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+COUNTERS = (
+    ("requests", "api_sampled_requests_total", "Requisições amostradas", 1),
+    ("queries", "api_db_queries_total", "Consultas SQL executadas", 1),
+    ("query_time_us", "api_db_query_seconds_total", "Tempo gasto nas consultas SQL", 1e-6),
+    ("serializer_time_us", "api_serializer_seconds_total", "Tempo gasto nos serializers", 1e-6),
+    ("response_bytes", "api_response_bytes_total", "Bytes enviados nas respostas", 1),
+)
+
+_current = ContextVar("metrics_sample", default=None)
+
+
+class Sample:
+    """Medições de uma requisição amostrada"""
+
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False
+
+
+def measure_query(execute, sql, params, many, context):
+    """execute_wrapper instalado em toda conexão; só mede nas requisições amostradas"""
+    sample = _current.get()
+    if sample is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        sample.queries += 1
+        sample.query_time += time.perf_counter() - start
+
+
+@receiver(connection_created)
+def install_query_wrapper(sender, connection, **kwargs):
+    # As conexões são por thread: no caminho assíncrono as consultas rodam em
+    # outra thread, que enxerga a amostra pelo contextvar
+    if measure_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(measure_query)
+
+
+def timed_serialization(represent, instance):
+    """Executa represent(instance) somando o tempo ao serializer da requisição amostrada
+
+    Serializers aninhados não são contados duas vezes.
+    """
+    sample = _current.get()
+    if sample is None or sample.serializing:
+        return represent(instance)
+    sample.serializing = True
+    start = time.perf_counter()
+    try:
+        return represent(instance)
+    finally:
+        sample.serializer_time += time.perf_counter() - start
+        sample.serializing = False
+
+
+@contextmanager
+def sampling(sample):
+    token = _current.set(sample)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def field_key(route, field):
+    return f"{KEY_PREFIX}:metrics:{route}:{field}"
+
+
+def bucket_field(duration_ms):
+    for bound in BUCKETS:
+        if duration_ms <= bound:
+            return f"bucket_{bound}"
+    return "bucket_inf"
+
+
+class Registry:
+    """Acumula as medições do processo e as soma no cache a cada METRICS_FLUSH_INTERVAL
+
+    O cache é compartilhado entre os processos do servidor (como as
+    estatísticas do cache das listagens), então o endpoint mostra o total.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = defaultdict(int)
+        self.last_flush = time.monotonic()
+
+    def add(self, route, values):
+        """Soma as medições no processo; devolve True quando já é hora de chamar flush()"""
+        with self.lock:
+            for field, value in values.items():
+                self.pending[route, field] += value
+            return time.monotonic() - self.last_flush >= settings.METRICS_FLUSH_INTERVAL
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, defaultdict(int)
+            self.last_flush = time.monotonic()
+        if not pending:
+            return
+
+        routes = set(state_cache.get(ROUTES_KEY) or ())
+        if {route for route, _ in pending} - routes:
+            state_cache.set(ROUTES_KEY, sorted(routes | {route for route, _ in pending}), timeout=None)
+        for (route, field), value in pending.items():
+            key = field_key(route, field)
+            state_cache.add(key, 0, timeout=None)
+            try:
+                state_cache.incr(key, value)
+            except ValueError:  # chave despejada entre o add e o incr
+                state_cache.set(key, value, timeout=None)
+
+
+registry = Registry()
+
+
+def record(route, duration, sample, response_bytes):
+    return registry.add(route, {
+        "requests": 1,
+        bucket_field(duration * 1000): 1,
+        "duration_us": int(duration * 1e6),
+        "queries": sample.queries,
+        "query_time_us": int(sample.query_time * 1e6),
+        "serializer_time_us": int(sample.serializer_time * 1e6),
+        "response_bytes": response_bytes,
+    })
+
+
+def fields():
+    return [f"bucket_{bound}" for bound in BUCKETS] + ["bucket_inf", "duration_us"] + [field for field, *_ in COUNTERS]
+
+
+def snapshot():
+    """Totais acumulados de cada rota: {rota: {campo: valor}}"""
+    registry.flush()
+    routes = state_cache.get(ROUTES_KEY) or []
+    keys = {field_key(route, field): (route, field) for route in routes for field in fields()}
+    values = state_cache.get_many(list(keys))
+    totals = {route: dict.fromkeys(fields(), 0) for route in routes}
+    for key, value in values.items():
+        route, field = keys[key]
+        totals[route][field] = value
+    return totals
+
+
+def reset():
+    registry.flush()
+    routes = state_cache.get(ROUTES_KEY) or []
+    state_cache.delete_many([field_key(route, field) for route in routes for field in fields()] + [ROUTES_KEY])
+
+
+def render_prometheus(totals):
+    """Formato texto de exposição do Prometheus"""
+    lines = [
+        "# HELP api_request_duration_seconds Latência das requisições amostradas por rota",
+        "# TYPE api_request_duration_seconds histogram",
+    ]
+    for route, values in totals.items():
+        cumulative = 0
+        for bound in BUCKETS:
+            cumulative += values[f"bucket_{bound}"]
+            lines.append(f'api_request_duration_seconds_bucket{{route="{route}",le="{bound / 1000}"}} {cumulative}')
+        cumulative += values["bucket_inf"]
+        lines.append(f'api_request_duration_seconds_bucket{{route="{route}",le="+Inf"}} {cumulative}')
+        lines.append(f'api_request_duration_seconds_sum{{route="{route}"}} {values["duration_us"] / 1e6}')
+        lines.append(f'api_request_duration_seconds_count{{route="{route}"}} {cumulative}')
+
+    for field, name, description, scale in COUNTERS:
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} counter")
+        for route, values in totals.items():
+            lines.append(f'{name}{{route="{route}"}} {values[field] * scale}')
+    return "\n".join(lines) + "\n"
+
+
+def quantile(values, q):
+    """Limite superior (ms) do bucket que contém o quantil q"""
+    total = sum(values[f"bucket_{bound}"] for bound in BUCKETS) + values["bucket_inf"]
+    if not total:
+        return None
+    cumulative = 0
+    for bound in BUCKETS:
+        cumulative += values[f"bucket_{bound}"]
+        if cumulative >= q * total:
+            return bound
+    return float("inf")
+
+
+def route_name(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    return match.url_name or match.route
+
+
+class MetricsMiddleware:
+    """Mede latência, consultas SQL, tempo dos serializers e tamanho da resposta por rota
+
+    Só uma fração METRICS_SAMPLE_RATE das requisições é instrumentada; as
+    demais recebem apenas a duração total no cabeçalho Server-Timing.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        sample = self.start_sample()
+        if sample is None:
+            response = self.get_response(request)
+        else:
+            with sampling(sample):
+                response = self.get_response(request)
+        if self.finish(request, response, sample, start):
+            registry.flush()
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        sample = self.start_sample()
+        if sample is None:
+            response = await self.get_response(request)
+        else:
+            with sampling(sample):
+                response = await self.get_response(request)
+        if self.finish(request, response, sample, start):
+            # As chamadas ao cache bloqueiam, então não rodam no event loop
+            await sync_to_async(registry.flush)()
+        return response
+
+    def start_sample(self):
+        if random.random() < settings.METRICS_SAMPLE_RATE:
+            return Sample()
+        return None
+
+    def finish(self, request, response, sample, start):
+        """Preenche o Server-Timing; devolve True quando as medições devem ser gravadas no cache"""
+        due = False
+        duration = time.perf_counter() - start
+        timings = [f"app;dur={duration * 1000:.1f}"]
+        if sample is not None:
+            timings.append(f'db;dur={sample.query_time * 1000:.1f};desc="{sample.queries} consultas"')
+            timings.append(f"serializer;dur={sample.serializer_time * 1000:.1f}")
+            response_bytes = 0 if response.streaming else len(response.content)
+            due = record(route_name(request), duration, sample, response_bytes)
+        response["Server-Timing"] = ", ".join(timings)
+        return due
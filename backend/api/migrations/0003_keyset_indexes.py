@@ -0,0 +1,21 @@
+# Generated by Django 5.1.5 on 2026-10-18 08:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_absence_is_absent'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='absence',
+            index=models.Index(fields=['created_at', 'id'], name='absence_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='forgivenessrequest',
+            index=models.Index(fields=['created_at', 'id'], name='request_created_id_idx'),
+        ),
+    ]
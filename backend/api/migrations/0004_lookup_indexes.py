@@ -0,0 +1,33 @@
+# Generated by Django 5.1.5 on 2026-10-18 08:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='absence',
+            index=models.Index(fields=['student', 'date'], name='absence_student_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='absence',
+            index=models.Index(fields=['discipline', 'date'], name='absence_discipline_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='absence',
+            index=models.Index(fields=['date'], name='absence_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='forgivenessrequest',
+            index=models.Index(fields=['absence', 'status'], name='request_absence_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='forgivenessrequest',
+            index=models.Index(fields=['status', 'created_at'], name='request_status_created_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-18 08:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='absence',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
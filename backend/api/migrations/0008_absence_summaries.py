@@ -0,0 +1,33 @@
+# Generated by Django 5.1.5 on 2026-10-18 09:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_background_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AbsenceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('discipline', models.CharField(max_length=100)),
+                ('term', models.CharField(max_length=6)),
+                ('total_classes', models.PositiveIntegerField(default=0)),
+                ('absences', models.PositiveIntegerField(default=0)),
+                ('forgiven', models.PositiveIntegerField(default=0)),
+                ('pending', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['discipline', 'term'], name='summary_discipline_term_idx')],
+                'constraints': [models.UniqueConstraint(fields=('student', 'discipline', 'term'), name='summary_student_discipline_term')],
+            },
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.1.5 on 2026-10-18 09:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_events'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=6, unique=True)),
+                ('absences', models.PositiveIntegerField(default=0)),
+                ('forgiveness_requests', models.PositiveIntegerField(default=0)),
+                ('archived_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedAbsence',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('discipline', models.CharField(max_length=100)),
+                ('date', models.DateField()),
+                ('reason', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('is_absent', models.BooleanField(default=False)),
+                ('term', models.CharField(max_length=6)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_absences', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedForgivenessRequest',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('justification_file', models.FileField(upload_to='justifications/')),
+                ('status', models.CharField(choices=[('PENDING', 'Pendente'), ('APPROVED', 'Aprovado'), ('REJECTED', 'Rejeitado')], max_length=20)),
+                ('comments', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('absence', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_query_name='forgivenessrequest', to='api.archivedabsence')),
+                ('stored_file', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='api.justificationfile')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedabsence',
+            index=models.Index(fields=['created_at', 'id'], name='archived_absence_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedabsence',
+            index=models.Index(fields=['student', 'date'], name='archived_absence_student_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedabsence',
+            index=models.Index(fields=['term', 'discipline'], name='archived_absence_term_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedforgivenessrequest',
+            index=models.Index(fields=['created_at', 'id'], name='archived_request_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedforgivenessrequest',
+            index=models.Index(fields=['absence', 'status'], name='archived_request_absence_idx'),
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.1.5 on 2026-10-18 09:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_archive'),
+    ]
+
+    operations = [
+        # Os índices e a restrição sobre o nome da disciplina são recriados sobre a chave estrangeira
+        # na 0013; removidos aqui, antes da migração de dados, para que a volta os recrie já com os nomes
+        migrations.RemoveIndex(model_name="absence", name="absence_discipline_date_idx"),
+        migrations.RemoveConstraint(model_name="absencesummary", name="summary_student_discipline_term"),
+        migrations.RemoveIndex(model_name="absencesummary", name="summary_discipline_term_idx"),
+        migrations.RemoveIndex(model_name="archivedabsence", name="archived_absence_term_idx"),
+        migrations.CreateModel(
+            name='Discipline',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ClassGroup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=6)),
+                ('name', models.CharField(max_length=50)),
+                ('professor', models.ForeignKey(blank=True, limit_choices_to={'role': 'professor'}, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='taught_class_groups', to=settings.AUTH_USER_MODEL)),
+                ('discipline', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='class_groups', to='api.discipline')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='absence',
+            name='discipline_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='api.discipline'),
+        ),
+        migrations.AddField(
+            model_name='absencesummary',
+            name='discipline_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='api.discipline'),
+        ),
+        migrations.AddField(
+            model_name='archivedabsence',
+            name='discipline_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='api.discipline'),
+        ),
+        migrations.CreateModel(
+            name='Enrolment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('class_group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enrolments', to='api.classgroup')),
+                ('student', models.ForeignKey(limit_choices_to={'role': 'student'}, on_delete=django.db.models.deletion.CASCADE, related_name='enrolments', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='classgroup',
+            name='students',
+            field=models.ManyToManyField(related_name='class_groups', through='api.Enrolment', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='enrolment',
+            constraint=models.UniqueConstraint(fields=('class_group', 'student'), name='enrolment_class_group_student'),
+        ),
+        migrations.AddIndex(
+            model_name='classgroup',
+            index=models.Index(fields=['professor', 'term'], name='class_group_professor_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='classgroup',
+            constraint=models.UniqueConstraint(fields=('discipline', 'term', 'name'), name='class_group_discipline_term_name'),
+        ),
+    ]
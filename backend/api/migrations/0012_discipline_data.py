@@ -0,0 +1,38 @@
+from django.db import migrations
+
+MODELS = ("Absence", "AbsenceSummary", "ArchivedAbsence")
+
+
+def strings_to_disciplines(apps, schema_editor):
+    """Cria uma disciplina para cada nome distinto e aponta as linhas para ela
+
+    Um UPDATE por disciplina e tabela, servido pelos índices que começam pela
+    disciplina.
+    """
+    Discipline = apps.get_model("api", "Discipline")
+    names = set()
+    for model_name in MODELS:
+        names.update(apps.get_model("api", model_name).objects.values_list("discipline", flat=True).distinct())
+    Discipline.objects.bulk_create([Discipline(name=name) for name in sorted(names)], ignore_conflicts=True)
+
+    for discipline_id, name in Discipline.objects.values_list("id", "name"):
+        for model_name in MODELS:
+            apps.get_model("api", model_name).objects.filter(discipline=name).update(discipline_ref_id=discipline_id)
+
+
+def disciplines_to_strings(apps, schema_editor):
+    Discipline = apps.get_model("api", "Discipline")
+    for discipline_id, name in Discipline.objects.values_list("id", "name"):
+        for model_name in MODELS:
+            apps.get_model("api", model_name).objects.filter(discipline_ref_id=discipline_id).update(discipline=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0011_disciplines"),
+    ]
+
+    operations = [
+        migrations.RunPython(strings_to_disciplines, disciplines_to_strings),
+    ]
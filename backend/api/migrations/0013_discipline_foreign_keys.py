@@ -0,0 +1,66 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0012_discipline_data"),
+    ]
+
+    operations = [
+        # Com default, a volta da migração consegue recriar as colunas de texto em tabelas com linhas
+        migrations.AlterField(model_name="absence", name="discipline", field=models.CharField(default="", max_length=100)),
+        migrations.AlterField(
+            model_name="absencesummary", name="discipline", field=models.CharField(default="", max_length=100),
+        ),
+        migrations.AlterField(
+            model_name="archivedabsence", name="discipline", field=models.CharField(default="", max_length=100),
+        ),
+        migrations.RemoveField(model_name="absence", name="discipline"),
+        migrations.RemoveField(model_name="absencesummary", name="discipline"),
+        migrations.RemoveField(model_name="archivedabsence", name="discipline"),
+        migrations.RenameField(model_name="absence", old_name="discipline_ref", new_name="discipline"),
+        migrations.RenameField(model_name="absencesummary", old_name="discipline_ref", new_name="discipline"),
+        migrations.RenameField(model_name="archivedabsence", old_name="discipline_ref", new_name="discipline"),
+        migrations.AlterField(
+            model_name="absence",
+            name="discipline",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.PROTECT, related_name="absences", to="api.discipline"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="absencesummary",
+            name="discipline",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.PROTECT, related_name="summaries", to="api.discipline"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="archivedabsence",
+            name="discipline",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.PROTECT, related_name="archived_absences", to="api.discipline"
+            ),
+        ),
+        # Índices e restrição removidos na 0011, agora sobre a chave estrangeira
+        migrations.AddIndex(
+            model_name="absence",
+            index=models.Index(fields=["discipline", "date"], name="absence_discipline_date_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="absencesummary",
+            constraint=models.UniqueConstraint(
+                fields=("student", "discipline", "term"), name="summary_student_discipline_term"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="absencesummary",
+            index=models.Index(fields=["discipline", "term"], name="summary_discipline_term_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="archivedabsence",
+            index=models.Index(fields=["term", "discipline"], name="archived_absence_term_idx"),
+        ),
+    ]
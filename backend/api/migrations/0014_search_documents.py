@@ -0,0 +1,87 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+FTS_TABLE = "api_searchdocument_fts"
+
+SQLITE_INDEX = [
+    # Tabela de conteúdo externo: o texto fica só em api_searchdocument e os triggers mantêm o índice
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        body, content='api_searchdocument', content_rowid='absence_id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER api_searchdocument_ai AFTER INSERT ON api_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, body) VALUES (new.absence_id, new.body);
+    END""",
+    f"""CREATE TRIGGER api_searchdocument_ad AFTER DELETE ON api_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, body) VALUES ('delete', old.absence_id, old.body);
+    END""",
+    f"""CREATE TRIGGER api_searchdocument_au AFTER UPDATE ON api_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, body) VALUES ('delete', old.absence_id, old.body);
+        INSERT INTO {FTS_TABLE}(rowid, body) VALUES (new.absence_id, new.body);
+    END""",
+]
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS api_searchdocument_au",
+    "DROP TRIGGER IF EXISTS api_searchdocument_ad",
+    "DROP TRIGGER IF EXISTS api_searchdocument_ai",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+MYSQL_INDEX = ["ALTER TABLE api_searchdocument ADD FULLTEXT INDEX search_document_body_ft (body)"]
+MYSQL_DROP = ["ALTER TABLE api_searchdocument DROP INDEX search_document_body_ft"]
+
+
+def run(statements_by_vendor):
+    def operation(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return operation
+
+
+def index_absences(apps, schema_editor):
+    """Documentos das faltas existentes, como api/search.py monta, em lotes de ids"""
+    Absence = apps.get_model("api", "Absence")
+    ForgivenessRequest = apps.get_model("api", "ForgivenessRequest")
+    SearchDocument = apps.get_model("api", "SearchDocument")
+    last_id = 0
+    while True:
+        rows = list(
+            Absence.objects.filter(id__gt=last_id).order_by("id")
+            .values_list("id", "student_id", "student__name", "student__username", "discipline__name", "reason")[:1000]
+        )
+        if not rows:
+            return
+        comments = {}
+        requests = ForgivenessRequest.objects.filter(absence_id__in=[row[0] for row in rows]).exclude(comments=None)
+        for absence_id, text in requests.order_by("id").values_list("absence_id", "comments"):
+            comments.setdefault(absence_id, []).append(text)
+        SearchDocument.objects.bulk_create([
+            SearchDocument(
+                absence_id=absence_id, student_id=student_id,
+                body="\n".join(part for part in (name, username, discipline, reason, *comments.get(absence_id, [])) if part),
+            )
+            for absence_id, student_id, name, username, discipline, reason in rows
+        ])
+        last_id = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_discipline_foreign_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('absence', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='api.absence')),
+                ('body', models.TextField()),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(
+            run({"sqlite": SQLITE_INDEX, "mysql": MYSQL_INDEX}), run({"sqlite": SQLITE_DROP, "mysql": MYSQL_DROP}),
+        ),
+        migrations.RunPython(index_absences, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,8 @@
+import uuid
+
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 
 
 class User(AbstractUser):
@@ -18,20 +21,167 @@ class User(AbstractUser):
         return f"{self.name} ({self.role})"
 
 
+class Discipline(models.Model):
+    """Disciplina; as faltas, os resumos e as turmas apontam para ela em vez de repetir o nome"""
+
+    name = models.CharField(max_length=100, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
+class ClassGroupQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """Admins veem todas as turmas, professores as que lecionam e alunos as que cursam"""
+        if user.role == "admin":
+            return self
+        if user.role == "professor":
+            return self.filter(professor_id=user.pk)
+        if user.role == "student":
+            return self.filter(enrolments__student_id=user.pk)
+        return self.none()
+
+
+class ClassGroup(models.Model):
+    """Turma: os alunos matriculados em uma disciplina em um semestre"""
+
+    discipline = models.ForeignKey(Discipline, on_delete=models.PROTECT, related_name="class_groups")
+    term = models.CharField(max_length=6)
+    name = models.CharField(max_length=50)
+    professor = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name="taught_class_groups", limit_choices_to={'role': 'professor'},
+    )
+    students = models.ManyToManyField(User, through="Enrolment", related_name="class_groups")
+
+    objects = ClassGroupQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["discipline", "term", "name"], name="class_group_discipline_term_name"),
+        ]
+        indexes = [
+            models.Index(fields=["professor", "term"], name="class_group_professor_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.discipline.name} {self.name} ({self.term})"
+
+
+class Enrolment(models.Model):
+    """Matrícula de um aluno em uma turma"""
+
+    class_group = models.ForeignKey(ClassGroup, on_delete=models.CASCADE, related_name="enrolments")
+    student = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="enrolments", limit_choices_to={'role': 'student'},
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            # Também é o índice de "alunos desta turma"
+            models.UniqueConstraint(fields=["class_group", "student"], name="enrolment_class_group_student"),
+        ]
+
+    def __str__(self):
+        return f"{self.student_id} em {self.class_group_id}"
+
+
+class AbsenceQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """Professores e admins veem as faltas de todo mundo, os demais apenas as próprias"""
+        if user.role in ("professor", "admin"):
+            return self
+        return self.filter(student_id=user.pk)
+
+
 class Absence(models.Model):
     """Representa uma falta registrada para um aluno"""
     
     student = models.ForeignKey(User, on_delete=models.CASCADE, limit_choices_to={'role': 'student'})
-    discipline = models.CharField(max_length=100)
+    discipline = models.ForeignKey(Discipline, on_delete=models.PROTECT, related_name="absences")
     date = models.DateField()
     reason = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     is_absent = models.BooleanField(default=False)
 
+    objects = AbsenceQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="absence_created_id_idx"),
+            models.Index(fields=["student", "date"], name="absence_student_date_idx"),
+            models.Index(fields=["discipline", "date"], name="absence_discipline_date_idx"),
+            models.Index(fields=["date"], name="absence_date_idx"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Guarda os valores lidos do banco para saber o que mudou ao salvar
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
     def __str__(self):
         return f"{self.student.username} - {self.discipline} - {self.date}"
 
 
+class JustificationFile(models.Model):
+    """Arquivo de justificativa armazenado uma única vez por conteúdo
+
+    O mesmo atestado usado em várias solicitações aponta para o mesmo arquivo.
+    """
+
+    content_hash = models.CharField(max_length=64, unique=True)
+    file = models.FileField(upload_to="justifications/")
+    size = models.PositiveBigIntegerField()
+    content_type = models.CharField(max_length=100)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Preenchidos em segundo plano pelo worker (manage.py process_jobs)
+    preview = models.FileField(upload_to="justifications/previews/", blank=True)
+    text_excerpt = models.CharField(max_length=300, blank=True)
+    extracted_text = models.TextField(blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.file.name} ({self.content_hash[:12]})"
+
+
+class JustificationUpload(models.Model):
+    """Envio em partes de um arquivo de justificativa, que pode ser retomado"""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE)
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100)
+    size = models.PositiveBigIntegerField()
+    received_bytes = models.PositiveBigIntegerField(default=0)
+    chunk_hashes = models.TextField(blank=True, default="")  # sha256 hex de cada parte, concatenados
+    stored_file = models.ForeignKey(JustificationFile, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def is_complete(self):
+        return self.stored_file_id is not None
+
+    def __str__(self):
+        return f"{self.filename} - {self.received_bytes}/{self.size}"
+
+
+class ForgivenessRequestQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """Professores veem as pendentes, admins todas e alunos as próprias"""
+        if user.role == "professor":
+            return self.filter(status="PENDING")
+        if user.role == "admin":
+            return self
+        if user.role == "student":
+            return self.filter(absence__student_id=user.pk)
+        return self.none()
+
+
 class ForgivenessRequest(models.Model):
     """Solicitação de perdão de falta associada a uma falta"""
     
@@ -43,10 +193,212 @@ class ForgivenessRequest(models.Model):
     
     absence = models.ForeignKey(Absence, on_delete=models.CASCADE)
     justification_file = models.FileField(upload_to='justifications/')
+    stored_file = models.ForeignKey(JustificationFile, on_delete=models.PROTECT, null=True, blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
     comments = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ForgivenessRequestQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="request_created_id_idx"),
+            models.Index(fields=["absence", "status"], name="request_absence_status_idx"),
+            models.Index(fields=["status", "created_at"], name="request_status_created_idx"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
     def __str__(self):
         return f"Request for {self.absence.student.username} - Status: {self.status}"
+
+
+class Job(models.Model):
+    """Tarefa em segundo plano, guardada no banco e executada pelo worker"""
+
+    STATUS_CHOICES = [
+        ('PENDING', 'Pendente'),
+        ('RUNNING', 'Em execução'),
+        ('DONE', 'Concluída'),
+        ('FAILED', 'Falhou'),
+    ]
+
+    kind = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_after"], name="job_status_run_after_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} - {self.status}"
+
+
+class AbsenceSummary(models.Model):
+    """Contadores de faltas por aluno, disciplina e semestre
+
+    Recalculados depois do commit de cada alteração de falta ou de solicitação (api/summaries.py),
+    para que os painéis leiam uma linha em vez de todas as faltas.
+    """
+
+    student = models.ForeignKey(User, on_delete=models.CASCADE)
+    discipline = models.ForeignKey(Discipline, on_delete=models.PROTECT, related_name="summaries")
+    term = models.CharField(max_length=6)
+    total_classes = models.PositiveIntegerField(default=0)
+    absences = models.PositiveIntegerField(default=0)
+    forgiven = models.PositiveIntegerField(default=0)
+    pending = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["student", "discipline", "term"], name="summary_student_discipline_term"),
+        ]
+        indexes = [
+            models.Index(fields=["discipline", "term"], name="summary_discipline_term_idx"),
+        ]
+
+    @property
+    def unexcused(self):
+        return self.absences - self.forgiven
+
+    @property
+    def attendance_rate(self):
+        """Frequência considerando as faltas abonadas como presença"""
+        if not self.total_classes:
+            return None
+        return round((self.total_classes - self.unexcused) / self.total_classes, 4)
+
+    def __str__(self):
+        return f"{self.student_id} - {self.discipline_id} - {self.term}"
+
+
+class SearchDocument(models.Model):
+    """Texto pesquisável de uma falta: aluno, disciplina, motivo e comentários das solicitações
+
+    Mantido a cada alteração (api/search.py) e indexado pelo índice de texto
+    do banco: FULLTEXT no MySQL e uma tabela FTS5 no SQLite (migração 0014).
+    """
+
+    absence = models.OneToOneField(Absence, on_delete=models.CASCADE, primary_key=True, related_name="search_document")
+    # Copiado da falta para restringir a busca de um aluno sem juntar as tabelas
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    body = models.TextField()
+
+    def __str__(self):
+        return f"Documento da falta {self.absence_id}"
+
+
+class Event(models.Model):
+    """Notificação para um usuário, entregue pelo stream de eventos (api/events.py)
+
+    O id crescente serve de Last-Event-ID: o cliente que reconecta recebe
+    tudo o que foi gravado depois do último evento que viu.
+    """
+
+    KIND_CHOICES = [
+        ('absence.created', 'Falta registrada'),
+        ('forgiveness_request.status', 'Status da solicitação alterado'),
+    ]
+
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name="events")
+    kind = models.CharField(max_length=50, choices=KIND_CHOICES)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["recipient", "id"], name="event_recipient_id_idx"),
+            models.Index(fields=["created_at"], name="event_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} para {self.recipient_id}"
+
+
+# Arquivo dos semestres encerrados (api/archive.py)
+# As linhas saem das tabelas principais mantendo os ids, para que as listagens do
+# semestre corrente percorram só os dados recentes
+
+
+class ArchivedTerm(models.Model):
+    """Semestre cujas faltas já foram movidas para as tabelas de arquivo"""
+
+    term = models.CharField(max_length=6, unique=True)
+    absences = models.PositiveIntegerField(default=0)
+    forgiveness_requests = models.PositiveIntegerField(default=0)
+    archived_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.term} ({self.absences} faltas)"
+
+
+class ArchivedAbsence(models.Model):
+    """Falta de um semestre arquivado, com os mesmos campos de Absence"""
+
+    id = models.BigIntegerField(primary_key=True)
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name="archived_absences")
+    discipline = models.ForeignKey(Discipline, on_delete=models.PROTECT, related_name="archived_absences")
+    date = models.DateField()
+    reason = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    is_absent = models.BooleanField(default=False)
+    term = models.CharField(max_length=6)
+
+    objects = AbsenceQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="archived_absence_created_idx"),
+            models.Index(fields=["student", "date"], name="archived_absence_student_idx"),
+            models.Index(fields=["term", "discipline"], name="archived_absence_term_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.student.username} - {self.discipline} - {self.date} (arquivada)"
+
+
+class ArchivedForgivenessRequest(models.Model):
+    """Solicitação de perdão de uma falta arquivada, com os mesmos campos de ForgivenessRequest"""
+
+    STATUS_CHOICES = ForgivenessRequest.STATUS_CHOICES
+
+    id = models.BigIntegerField(primary_key=True)
+    # O mesmo nome de consulta da tabela principal: os filtros e o ETag valem para as duas
+    absence = models.ForeignKey(ArchivedAbsence, on_delete=models.CASCADE, related_query_name="forgivenessrequest")
+    justification_file = models.FileField(upload_to='justifications/')
+    stored_file = models.ForeignKey(JustificationFile, on_delete=models.PROTECT, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    comments = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    objects = ForgivenessRequestQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="archived_request_created_idx"),
+            models.Index(fields=["absence", "status"], name="archived_request_absence_idx"),
+        ]
+
+    def __str__(self):
+        return f"Request for {self.absence.student.username} - Status: {self.status} (arquivada)"
+
+
+# Tabela de arquivo de cada tabela principal, e o model das solicitações de cada tabela de faltas
+ARCHIVE_MODELS = {Absence: ArchivedAbsence, ForgivenessRequest: ArchivedForgivenessRequest}
+REQUEST_MODELS = {Absence: ForgivenessRequest, ArchivedAbsence: ArchivedForgivenessRequest}
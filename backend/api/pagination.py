@@ -0,0 +1,196 @@
+import base64
+import binascii
+import re
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Paginação por cursor ordenada por (created_at, id), do mais novo ao mais antigo
+
+    O cursor guarda o par (created_at, id) da última linha da página, então a
+    próxima página é um range scan no índice composto em vez de um OFFSET,
+    e páginas profundas custam o mesmo que a primeira.
+    """
+
+    page_size = 50
+    max_page_size = 200
+    page_size_query_param = "page_size"
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Cursor inválido."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request)
+        return self.build_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Mesma paginação, lendo as linhas com o ORM assíncrono"""
+        queryset = self.get_page_queryset(queryset, request)
+        return self.build_page([row async for row in queryset])
+
+    def get_page_queryset(self, queryset, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.next_position = None
+
+        queryset = queryset.order_by("-created_at", "-id")
+        position = self.decode_cursor(request)
+        if position is not None:
+            created_at, pk = position
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+            )
+
+        # Busca uma linha a mais só para saber se existe próxima página
+        return queryset[: self.page_size + 1]
+
+    def build_page(self, rows):
+        if len(rows) > self.page_size:
+            rows = rows[: self.page_size]
+            last = rows[-1]
+            # Linhas de .values() (api/rows.py) chegam como dicts
+            if isinstance(last, dict):
+                self.next_position = (last["created_at"], last["id"])
+            else:
+                self.next_position = (last.created_at, last.pk)
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_data(self, data):
+        return {"next": self.get_next_link(), "results": data}
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def encode_cursor(self, position):
+        created_at, pk = position
+        raw = f"{created_at.isoformat()}|{pk}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded.encode()).decode()
+            created_at, pk = raw.rsplit("|", 1)
+            created_at = parse_datetime(created_at)
+            pk = int(pk)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        return created_at, pk
+
+
+class SummaryPagination(KeysetPagination):
+    """Paginação dos resumos por (semestre, id), do semestre mais antigo ao mais recente
+
+    Os resumos não têm created_at; o cursor guarda o par (term, id) da
+    última linha da página.
+    """
+
+    page_size = 100
+    max_page_size = 500
+
+    def get_page_queryset(self, queryset, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.next_position = None
+
+        queryset = queryset.order_by("term", "id")
+        position = self.decode_cursor(request)
+        if position is not None:
+            term, pk = position
+            queryset = queryset.filter(Q(term__gt=term) | Q(term=term, id__gt=pk))
+        return queryset[: self.page_size + 1]
+
+    def build_page(self, rows):
+        if len(rows) > self.page_size:
+            rows = rows[: self.page_size]
+            self.next_position = (rows[-1].term, rows[-1].pk)
+        return rows
+
+    def encode_cursor(self, position):
+        term, pk = position
+        return base64.urlsafe_b64encode(f"{term}|{pk}".encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded.encode()).decode()
+            term, pk = raw.rsplit("|", 1)
+            pk = int(pk)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not re.fullmatch(r"\d{4}-[12]", term):
+            raise NotFound(self.invalid_cursor_message)
+        return term, pk
+
+
+class RankedPagination(KeysetPagination):
+    """Paginação dos resultados da busca textual, ordenados por relevância
+
+    A relevância não identifica uma posição estável, então o cursor guarda
+    o deslocamento. A busca vai até max_results; além disso a resposta pede
+    uma busca mais específica em vez de percorrer o índice inteiro.
+    """
+
+    page_size = 20
+    max_page_size = 100
+    max_results = 1000
+
+    def paginate_queryset(self, results, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        offset = self.decode_cursor(request) or 0
+        rows = list(results[offset: offset + self.page_size + 1])
+        end = offset + self.page_size
+        self.next_position = end if len(rows) > self.page_size and end < self.max_results else None
+        return rows[: self.page_size]
+
+    def encode_cursor(self, offset):
+        return base64.urlsafe_b64encode(str(offset).encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            offset = int(base64.urlsafe_b64decode(encoded.encode()).decode())
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not 0 <= offset < self.max_results:
+            raise NotFound(self.invalid_cursor_message)
+        return offset
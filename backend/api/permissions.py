@@ -1,14 +1,36 @@
+import hmac
+
+from django.conf import settings
 from rest_framework.permissions import BasePermission
 
+
+def get_role(request):
+    """Papel do usuário, lido das claims do token JWT quando disponíveis"""
+    token = request.auth
+    if token is not None and hasattr(token, "get"):
+        role = token.get("role")
+        if role:
+            return role
+    return getattr(request.user, "role", None)
+
+
 class IsAdmin(BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.role == "admin"
+        return request.user.is_authenticated and get_role(request) == "admin"
 
 
 class IsProfessor(BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.role == "professor"
+        return request.user.is_authenticated and get_role(request) == "professor"
 
 class IsStudent(BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.role == "student"
+        return request.user.is_authenticated and get_role(request) == "student"
+
+
+class HasMetricsToken(BasePermission):
+    """Coletor de métricas autenticado pelo cabeçalho X-Metrics-Token"""
+
+    def has_permission(self, request, view):
+        token = request.headers.get("X-Metrics-Token", "")
+        return bool(settings.METRICS_TOKEN) and hmac.compare_digest(token, settings.METRICS_TOKEN)
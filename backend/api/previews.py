@@ -0,0 +1,73 @@
+import io
+import logging
+
+from django.core.files.base import ContentFile
+from django.utils import timezone
+
+from . import jobs
+from .models import JustificationFile
+
+logger = logging.getLogger(__name__)
+
+# Dependências opcionais: sem elas o job conclui sem miniatura/texto
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover
+    Image = None
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:  # pragma: no cover
+    fitz = None
+
+THUMBNAIL_WIDTH = 320
+EXCERPT_LENGTH = 300
+MAX_TEXT_PAGES = 20
+
+
+@jobs.register("justification_preview")
+def build_preview(file_id):
+    """Gera a miniatura e extrai o texto de um arquivo de justificativa"""
+    stored = JustificationFile.objects.filter(pk=file_id).first()
+    if stored is None:
+        return  # Removido antes do processamento
+
+    if stored.content_type == "application/pdf":
+        thumbnail, text = render_pdf(stored)
+    else:
+        thumbnail, text = render_image(stored), ""
+
+    if thumbnail is not None:
+        data, extension = thumbnail
+        stored.preview.save(f"{stored.content_hash}{extension}", ContentFile(data), save=False)
+    stored.extracted_text = text
+    stored.text_excerpt = " ".join(text.split())[:EXCERPT_LENGTH]
+    stored.processed_at = timezone.now()
+    stored.save(update_fields=["preview", "extracted_text", "text_excerpt", "processed_at"])
+
+
+def render_image(stored):
+    if Image is None:
+        logger.warning("Pillow não instalado, miniatura de %s não gerada", stored)
+        return None
+    with stored.file.open("rb") as source:
+        image = Image.open(source)
+        image.draft("RGB", (THUMBNAIL_WIDTH, THUMBNAIL_WIDTH))  # Decodifica JPEGs já reduzidos
+        image.thumbnail((THUMBNAIL_WIDTH, THUMBNAIL_WIDTH))
+        output = io.BytesIO()
+        image.convert("RGB").save(output, "JPEG", quality=80)
+    return output.getvalue(), ".jpg"
+
+
+def render_pdf(stored):
+    if fitz is None:
+        logger.warning("PyMuPDF não instalado, prévia de %s não gerada", stored)
+        return None, ""
+    with fitz.open(stored.file.path) as document:
+        if document.page_count == 0:
+            return None, ""
+        first_page = document[0]
+        zoom = THUMBNAIL_WIDTH / first_page.rect.width
+        pixmap = first_page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+        text = "".join(document[i].get_text() for i in range(min(document.page_count, MAX_TEXT_PAGES)))
+    return (pixmap.tobytes("png"), ".png"), text
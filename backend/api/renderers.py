@@ -0,0 +1,37 @@
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+
+# Dependência opcional: sem ela as respostas saem pelo json da biblioteca padrão
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+# Datas e dataclasses vão para o encoder do DRF, que define o formato das respostas
+ORJSON_OPTIONS = (
+    orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS if orjson else 0
+)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer que gera o JSON com o orjson quando ele está instalado
+
+    A saída é a mesma do renderer compacto do DRF: datas passam pelo encoder
+    do DRF e U+2028/U+2029 continuam escapados. Respostas indentadas (API
+    navegável, ?indent=) e API_FAST_SERIALIZATION desligado usam o renderer
+    do DRF.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or not settings.API_FAST_SERIALIZATION
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        content = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        return content.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
@@ -0,0 +1,70 @@
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+
+from . import cache
+
+REPLICA = "replica"
+
+_replica_reads = ContextVar("replica_reads", default=False)
+
+
+def replica_configured():
+    return REPLICA in connections.settings
+
+
+@contextmanager
+def replica_reads(scope):
+    """Direciona para a réplica as leituras feitas dentro do bloco
+
+    Se o escopo do usuário teve uma escrita há menos de DATABASE_REPLICA_LAG
+    segundos as leituras continuam no banco principal.
+    """
+    token = _replica_reads.set(replica_configured() and not cache.reads_primary(scope))
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+@asynccontextmanager
+async def areplica_reads(scope):
+    """Versão de replica_reads para views assíncronas, sem bloquear o event loop no cache"""
+    token = _replica_reads.set(replica_configured() and not await cache.areads_primary(scope))
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class ReplicaRouter:
+    """Leituras das listagens na réplica (quando configurada), todo o resto no banco principal"""
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get():
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # A réplica tem os mesmos dados do principal
+        if {obj1._state.db, obj2._state.db} <= {"default", REPLICA}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # A réplica recebe o schema pela replicação
+        if db == REPLICA:
+            return False
+        return None
+
+
+class ReplicaReadMixin:
+    """Atende a listagem, inclusive cache e ETag, a partir da réplica de leitura"""
+
+    def list(self, request, *args, **kwargs):
+        with replica_reads(cache.user_scope(request.user)):
+            return super().list(request, *args, **kwargs)
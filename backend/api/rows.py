@@ -0,0 +1,210 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from . import metrics
+from .serializers import (
+    AbsencesSerializer,
+    AnnotatedAbsencesSerializer,
+    ForgivenessRequestsSerializer,
+    UserSerializer,
+)
+
+# Conversores: recebem o contexto do serializer e devolvem a função aplicada a cada valor,
+# com o mesmo resultado do to_representation do campo equivalente do DRF
+
+
+def iso_date(context):
+    return lambda value: value.isoformat() if value else None
+
+
+def iso_datetime(context):
+    # Como o DateTimeField do DRF: no fuso atual e com Z no lugar de +00:00
+    current = timezone.get_current_timezone() if settings.USE_TZ else None
+
+    def convert(value):
+        if not value:
+            return None
+        if current is not None:
+            value = value.astimezone(current)
+        value = value.isoformat()
+        return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+    return convert
+
+
+def file_url(context):
+    # Como o FileField do DRF: URL absoluta quando há requisição no contexto
+    request = context.get("request")
+
+    def convert(name):
+        if not name:
+            return None
+        url = default_storage.url(name)
+        return request.build_absolute_uri(url) if request is not None else url
+
+    return convert
+
+
+def is_set(context):
+    return lambda value: value is not None
+
+
+class RowSerializer:
+    """Serializer somente leitura que monta as linhas direto dos dicts do .values()
+
+    fields lista (campo da resposta, lookup do .values()) na ordem da
+    resposta, com um conversor opcional como terceiro item. Um RowSerializer
+    no lugar do conversor aninha a relação; o lookup é a chave estrangeira e
+    a relação vazia vira None. Sem instâncias de model nem campos do DRF, cada
+    linha é um único dict; o JSON tem de ser igual ao do serializer do DRF
+    correspondente (ROW_SERIALIZERS), o que os testes de paridade conferem.
+    """
+
+    fields = ()
+
+    def __init__(self, instance=None, many=True, context=None):
+        self.instance = instance
+        self.context = context or {}
+
+    @classmethod
+    def lookups(cls, prefix=""):
+        lookups = []
+        for name, lookup, *convert in cls.fields:
+            lookups.append(prefix + lookup)
+            if convert and isinstance(convert[0], type) and issubclass(convert[0], RowSerializer):
+                lookups.extend(convert[0].lookups(f"{prefix}{lookup}__"))
+        return list(dict.fromkeys(lookups))
+
+    @classmethod
+    def values(cls, queryset):
+        return queryset.prefetch_related(None).values(*cls.lookups())
+
+    @classmethod
+    def compile(cls, context, prefix=""):
+        """Função que converte um dict do .values() na linha da resposta"""
+        mapping, converters, nested = [], [], []
+        for name, lookup, *convert in cls.fields:
+            key = prefix + lookup
+            mapping.append((name, key))
+            if not convert:
+                continue
+            if isinstance(convert[0], type) and issubclass(convert[0], RowSerializer):
+                nested.append((name, key, convert[0].compile(context, f"{key}__")))
+            else:
+                converters.append((name, convert[0](context)))
+
+        def represent(row):
+            item = {name: row[key] for name, key in mapping}
+            for name, convert in converters:
+                item[name] = convert(item[name])
+            for name, key, represent_nested in nested:
+                item[name] = None if row[key] is None else represent_nested(row)
+            return item
+
+        return represent
+
+    @property
+    def data(self):
+        rows = self.instance
+        if isinstance(rows, QuerySet):
+            rows = list(self.values(rows))
+        represent = self.compile(self.context)
+        return metrics.timed_serialization(lambda rows: [represent(row) for row in rows], rows)
+
+
+class AbsenceRows(RowSerializer):
+    fields = (
+        ("id", "id"),
+        ("student", "student"),
+        ("student_username", "student__username"),
+        ("discipline", "discipline__name"),
+        ("discipline_id", "discipline"),
+        ("date", "date", iso_date),
+        ("reason", "reason"),
+        ("is_absent", "is_absent"),
+        ("created_at", "created_at", iso_datetime),
+        ("updated_at", "updated_at", iso_datetime),
+    )
+
+
+class AnnotatedAbsenceRows(AbsenceRows):
+    # Anotações de AnnotatedAbsencesSerializer.annotate
+    fields = AbsenceRows.fields + (
+        ("forgiveness_request_id", "forgiveness_request_id"),
+        ("forgiveness_request_status", "forgiveness_request_status"),
+        ("has_forgiveness_request", "forgiveness_request_id", is_set),
+        ("has_pending_request", "has_pending_request"),
+    )
+
+
+class JustificationPreviewRows(RowSerializer):
+    fields = (
+        ("content_type", "content_type"),
+        ("size", "size"),
+        ("preview", "preview", file_url),
+        ("text_excerpt", "text_excerpt"),
+        ("processed_at", "processed_at", iso_datetime),
+    )
+
+
+class ForgivenessRequestRows(RowSerializer):
+    fields = (
+        ("id", "id"),
+        ("absence", "absence"),
+        ("absence_details", "absence", AbsenceRows),
+        ("justification_file", "justification_file", file_url),
+        ("justification_preview", "stored_file", JustificationPreviewRows),
+        ("status", "status"),
+        ("comments", "comments"),
+        ("created_at", "created_at", iso_datetime),
+        ("updated_at", "updated_at", iso_datetime),
+    )
+
+
+class UserRows(RowSerializer):
+    fields = (
+        ("id", "id"),
+        ("username", "username"),
+        ("email", "email"),
+        ("role", "role"),
+        ("name", "name"),
+        ("date_joined", "date_joined", iso_datetime),
+    )
+
+
+# Serializer do DRF de cada listagem e a versão lida do .values() com a mesma saída
+ROW_SERIALIZERS = {
+    AbsencesSerializer: AbsenceRows,
+    AnnotatedAbsencesSerializer: AnnotatedAbsenceRows,
+    ForgivenessRequestsSerializer: ForgivenessRequestRows,
+    UserSerializer: UserRows,
+}
+
+
+def row_serializer_for(serializer_class):
+    """RowSerializer equivalente ao serializer, ou None se não houver ou se estiver desligado"""
+    if not settings.API_FAST_SERIALIZATION:
+        return None
+    return ROW_SERIALIZERS.get(serializer_class)
+
+
+class RowListMixin:
+    """Serializa a listagem com o RowSerializer equivalente, quando existe
+
+    Só troca a leitura da página: filtros, ETag e cache continuam usando o
+    queryset de models.
+    """
+
+    def paginate_queryset(self, queryset):
+        row_serializer_class = row_serializer_for(self.get_serializer_class())
+        if row_serializer_class is not None:
+            queryset = row_serializer_class.values(queryset)
+        return super().paginate_queryset(queryset)
+
+    def get_serializer(self, *args, **kwargs):
+        row_serializer_class = row_serializer_for(self.get_serializer_class())
+        if row_serializer_class is None or not kwargs.get("many"):
+            return super().get_serializer(*args, **kwargs)
+        return row_serializer_class(*args, context=self.get_serializer_context())
@@ -0,0 +1,122 @@
+import re
+from collections import defaultdict
+
+from django.db import connections, router, transaction
+
+from .models import Absence, ForgivenessRequest, SearchDocument
+
+TERM = re.compile(r"\w+")
+MIN_TERM_LENGTH = 2  # um prefixo de uma letra casaria com quase todos os documentos
+MAX_TERMS = 8
+BATCH_SIZE = 1000
+
+# Tabela FTS5 do SQLite, mantida por triggers sobre a dos documentos (migração 0014)
+FTS_TABLE = "api_searchdocument_fts"
+
+
+def parse_terms(text):
+    """Palavras da busca, sem repetições e sem a sintaxe dos índices de texto"""
+    terms = []
+    for term in TERM.findall(text.lower()):
+        if len(term) >= MIN_TERM_LENGTH and term not in terms:
+            terms.append(term)
+    return terms[:MAX_TERMS]
+
+
+def document_text(*parts):
+    return "\n".join(part for part in parts if part)
+
+
+def index_batch(ids):
+    """Recria os documentos das faltas informadas com três consultas"""
+    comments = defaultdict(list)
+    requests = ForgivenessRequest.objects.filter(absence_id__in=ids).exclude(comments__isnull=True).exclude(comments="")
+    for absence_id, text in requests.order_by("id").values_list("absence_id", "comments"):
+        comments[absence_id].append(text)
+
+    rows = Absence.objects.filter(id__in=ids).values_list(
+        "id", "student_id", "student__name", "student__username", "discipline__name", "reason",
+    )
+    documents = [
+        SearchDocument(
+            absence_id=absence_id, student_id=student_id,
+            body=document_text(name, username, discipline, reason, *comments[absence_id]),
+        )
+        for absence_id, student_id, name, username, discipline, reason in rows
+    ]
+    with transaction.atomic():
+        SearchDocument.objects.filter(absence_id__in=ids).delete()
+        SearchDocument.objects.bulk_create(documents)
+    return len(documents)
+
+
+def index_absences(queryset):
+    """Recria os documentos das faltas do queryset; faltas apagadas já perderam o documento em cascata"""
+    ids = list(queryset.order_by().values_list("id", flat=True))
+    return sum(index_batch(ids[offset:offset + BATCH_SIZE]) for offset in range(0, len(ids), BATCH_SIZE))
+
+
+def schedule(queryset):
+    """Reindexa as faltas do queryset depois do commit, junto com a transação que as alterou"""
+    transaction.on_commit(lambda: index_absences(queryset))
+
+
+def rebuild():
+    """Recria todos os documentos, em lotes de ids crescentes"""
+    SearchDocument.objects.all().delete()
+    indexed = last_id = 0
+    while True:
+        ids = list(Absence.objects.filter(id__gt=last_id).order_by("id").values_list("id", flat=True)[:BATCH_SIZE])
+        if not ids:
+            return indexed
+        indexed += index_batch(ids)
+        last_id = ids[-1]
+
+
+class SearchResults:
+    """Faltas cujo documento contém todas as palavras (como prefixo), da mais relevante à menos
+
+    Fatiar executa a busca só para a fatia pedida e devolve pares (id da
+    falta, relevância); o índice de texto do banco encontra os documentos e
+    calcula a relevância: MATCH ... AGAINST no MySQL e bm25 no SQLite.
+    """
+
+    def __init__(self, terms, student_id=None):
+        self.terms = terms
+        self.student_id = student_id
+
+    def __getitem__(self, page):
+        if not isinstance(page, slice) or page.step is not None:
+            raise TypeError("SearchResults aceita apenas fatias simples")
+        offset = page.start or 0
+        connection = connections[router.db_for_read(SearchDocument)]
+        sql, params = self.build_sql(connection.vendor)
+        with connection.cursor() as cursor:
+            cursor.execute(f"{sql} LIMIT %s OFFSET %s", [*params, page.stop - offset, offset])
+            return cursor.fetchall()
+
+    def build_sql(self, vendor):
+        table = SearchDocument._meta.db_table
+        scope, scope_params = ("", []) if self.student_id is None else (" AND d.student_id = %s", [self.student_id])
+        if vendor == "mysql":
+            query = " ".join(f"+{term}*" for term in self.terms)
+            sql = (
+                f"SELECT d.absence_id, MATCH(d.body) AGAINST (%s IN BOOLEAN MODE) AS score FROM {table} d "
+                f"WHERE MATCH(d.body) AGAINST (%s IN BOOLEAN MODE){scope} ORDER BY score DESC, d.absence_id DESC"
+            )
+            return sql, [query, query, *scope_params]
+        if vendor == "sqlite":
+            query = " ".join(f'"{term}"*' for term in self.terms)
+            # O bm25 do FTS5 é menor para os documentos mais relevantes
+            sql = (
+                f"SELECT d.absence_id, -bm25({FTS_TABLE}) AS score FROM {FTS_TABLE} "
+                f"JOIN {table} d ON d.absence_id = {FTS_TABLE}.rowid "
+                f"WHERE {FTS_TABLE} MATCH %s{scope} ORDER BY score DESC, d.absence_id DESC"
+            )
+            return sql, [query, *scope_params]
+        raise NotImplementedError(f"Busca textual não disponível no banco {vendor}")
+
+
+def search_absences(terms, user):
+    """Busca restrita como Absence.objects.visible_to: só professores e admins veem as faltas de todos"""
+    return SearchResults(terms, student_id=None if user.role in ("professor", "admin") else user.pk)
@@ -1,7 +1,100 @@
+import csv
+import io
+import re
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Subquery
+from django.utils import timezone
 from rest_framework import serializers
-from .models import User, Absence, ForgivenessRequest
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from .models import (
+    REQUEST_MODELS,
+    User,
+    Absence,
+    AbsenceSummary,
+    ClassGroup,
+    Discipline,
+    Enrolment,
+    ForgivenessRequest,
+    JustificationFile,
+    JustificationUpload,
+)
+from . import cache, events, imports, metrics, search, summaries, uploads
+
+
+class QueryShapingMixin:
+    """Declara como o queryset do serializer deve ser carregado
+
+    As views de listagem aplicam essas declarações para buscar todas as
+    relações serializadas em uma única consulta, evitando o problema N+1.
+    """
+
+    select_related_fields = ()
+    prefetch_related_fields = ()
+    only_fields = ()
+
+    @classmethod
+    def shape_queryset(cls, queryset):
+        if cls.select_related_fields:
+            queryset = queryset.select_related(*cls.select_related_fields)
+        if cls.prefetch_related_fields:
+            queryset = queryset.prefetch_related(*cls.prefetch_related_fields)
+        if cls.only_fields:
+            queryset = queryset.only(*cls.only_fields)
+        return queryset
+
+    def to_representation(self, instance):
+        return metrics.timed_serialization(super().to_representation, instance)
+
+
+class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Valida as credenciais uma única vez e embute os dados do usuário no token
+
+    As claims permitem que as permissões autorizem as requisições sem
+    carregar o usuário do banco.
+    """
+
+    USER_CLAIMS = ("username", "email", "role")
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        for claim in cls.USER_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        data["user_id"] = self.user.id
+        data.update({claim: getattr(self.user, claim) for claim in self.USER_CLAIMS})
+        return data
+
+
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    """Renova o token de acesso com as claims relidas do banco
+
+    O TokenRefreshSerializer copia as claims do refresh token, então um papel
+    alterado continuaria valendo até o refresh expirar (REFRESH_TOKEN_LIFETIME).
+    """
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        refresh = self.token_class(attrs["refresh"])
+        user = User.objects.only(*CustomTokenObtainPairSerializer.USER_CLAIMS).get(
+            pk=refresh[jwt_settings.USER_ID_CLAIM],
+        )
+        access = refresh.access_token
+        for claim in CustomTokenObtainPairSerializer.USER_CLAIMS:
+            access[claim] = getattr(user, claim)
+        data["access"] = str(access)
+        return data
+
+
+class UserSerializer(QueryShapingMixin, serializers.ModelSerializer):
+    only_fields = ("id", "username", "email", "role", "name", "date_joined")
 
-class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ["id", "username", "password", "email", "role","name", "date_joined"]
@@ -11,25 +104,113 @@ class UserSerializer(serializers.ModelSerializer):
         }
 
     def create(self, validated_data):
-        role = validated_data.pop('role', None)
-        name = validated_data.pop('name', None)
-        user = User.objects.create_user(**validated_data)
-        if role:
-            user.role = role
-        if name:
-            user.name = name
-        user.save()
-        return user
-
-
-class AbsencesSerializer(serializers.ModelSerializer):
+        # role e name vão no próprio INSERT do create_user
+        return User.objects.create_user(**validated_data)
+
+
+class UserImportSerializer(serializers.Serializer):
+    """Arquivo CSV com as colunas username, email, password, role e name (api/imports.py)"""
+
+    file = serializers.FileField()
+
+    def validate_file(self, upload):
+        # Cada senha custa centenas de milissegundos de hash dentro da requisição
+        too_large = "Arquivo grande demais para a API; use o comando import_users."
+        if upload.size > settings.USER_IMPORT_API_MAX_SIZE:
+            raise serializers.ValidationError(too_large)
+        text = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+        try:
+            rows = imports.count_rows(text, settings.USER_IMPORT_API_MAX_ROWS)
+        except (csv.Error, UnicodeDecodeError):
+            rows = 0  # O erro aparece no relatório da importação
+        finally:
+            text.detach()
+            upload.seek(0)
+        if rows > settings.USER_IMPORT_API_MAX_ROWS:
+            raise serializers.ValidationError(
+                f"A API importa no máximo {settings.USER_IMPORT_API_MAX_ROWS} linhas; use o comando import_users."
+            )
+        return upload
+
+
+class DisciplineField(serializers.RelatedField):
+    """Disciplina pelo nome, como era o texto livre; também aceita o id
+
+    Só disciplinas já cadastradas são aceitas: um nome digitado errado não
+    cria outra disciplina. O cadastro é feito pelos admins em /api/disciplines/.
+    """
+
+    default_error_messages = {
+        "does_not_exist": "Disciplina {pk} não encontrada.",
+        "unknown_name": "Disciplina \"{name}\" não cadastrada.",
+        "invalid": "Informe o nome ou o id da disciplina.",
+        "max_length": "O nome da disciplina deve ter no máximo 100 caracteres.",
+    }
+
+    def __init__(self, **kwargs):
+        if not kwargs.get("read_only"):
+            kwargs.setdefault("queryset", Discipline.objects.all())
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return value.name
+
+    def to_internal_value(self, data):
+        if isinstance(data, int) and not isinstance(data, bool):
+            try:
+                return Discipline.objects.get(pk=data)
+            except Discipline.DoesNotExist:
+                self.fail("does_not_exist", pk=data)
+        if not isinstance(data, str) or not data.strip():
+            self.fail("invalid")
+        name = data.strip()
+        if len(name) > Discipline._meta.get_field("name").max_length:
+            self.fail("max_length")
+        try:
+            return Discipline.objects.get(name=name)
+        except Discipline.DoesNotExist:
+            self.fail("unknown_name", name=name)
+
+
+class OwnUploadField(serializers.PrimaryKeyRelatedField):
+    """Envio em partes já concluído pelo próprio usuário
+
+    O filtro fica no queryset porque o pk do usuário do JWT é texto e o
+    owner_id do envio é inteiro: o banco converte, a comparação em Python não.
+    """
+
+    default_error_messages = {
+        "does_not_exist": "Envio não encontrado.",
+    }
+
+    def get_queryset(self):
+        queryset = JustificationUpload.objects.filter(stored_file__isnull=False)
+        request = self.context.get("request")
+        if request is not None:
+            queryset = queryset.filter(owner_id=request.user.pk)
+        return queryset
+
+
+class AbsencesSerializer(QueryShapingMixin, serializers.ModelSerializer):
     student_username = serializers.CharField(source="student.username", read_only=True)
+    discipline = DisciplineField()
+    discipline_id = serializers.IntegerField(read_only=True)
+
+    select_related_fields = ("student", "discipline")
+    only_fields = (
+        "id", "student", "student__username", "discipline", "discipline__name", "date",
+        "reason", "is_absent", "created_at", "updated_at",
+    )
 
     class Meta:
         model = Absence
-        fields = ["id", "student", "student_username", "discipline", "date", "reason","is_absent", "created_at"]
+        fields = [
+            "id", "student", "student_username", "discipline", "discipline_id",
+            "date", "reason", "is_absent", "created_at", "updated_at",
+        ]
         extra_kwargs = {
             "created_at": {"read_only": True},
+            "updated_at": {"read_only": True},
             "reason": {"allow_blank": True},
         }
     
@@ -42,13 +223,314 @@ class AbsencesSerializer(serializers.ModelSerializer):
         return absence
 
 
-class ForgivenessRequestsSerializer(serializers.ModelSerializer):
+class AbsenceUpdateSerializer(serializers.Serializer):
+    """Campos editáveis de uma falta; os que não vierem no corpo ficam como estão"""
+
+    discipline = DisciplineField(required=False)
+    is_absent = serializers.BooleanField(required=False)
+    reason = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+
+class DisciplineSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Discipline
+        fields = ["id", "name"]
+
+
+class ClassGroupSerializer(QueryShapingMixin, serializers.ModelSerializer):
+    discipline = DisciplineField()
+    professor_username = serializers.CharField(source="professor.username", read_only=True, allow_null=True)
+
+    select_related_fields = ("discipline", "professor")
+
+    class Meta:
+        model = ClassGroup
+        fields = ["id", "discipline", "term", "name", "professor", "professor_username"]
+
+    def validate_term(self, term):
+        if not re.fullmatch(r"\d{4}-[12]", term):
+            raise serializers.ValidationError("Semestre inválido, use o formato AAAA-1 ou AAAA-2.")
+        return term
+
+    def validate_professor(self, professor):
+        if professor is not None and professor.role != "professor":
+            raise serializers.ValidationError("O responsável pela turma precisa ser um professor.")
+        return professor
+
+
+class EnrolmentSerializer(serializers.Serializer):
+    """Matrícula de vários alunos em uma turma; os já matriculados são ignorados"""
+
+    MAX_STUDENTS = 1000
+
+    students = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=MAX_STUDENTS)
+
+    def validate_students(self, student_ids):
+        # Confere o papel de todos os alunos com uma única consulta
+        found = set(User.objects.filter(id__in=student_ids, role="student").values_list("id", flat=True))
+        missing = sorted(set(student_ids) - found)
+        if missing:
+            raise serializers.ValidationError(f"Alunos não encontrados: {', '.join(map(str, missing))}.")
+        return sorted(found)
+
+    def create(self, validated_data):
+        class_group = self.context["class_group"]
+        with transaction.atomic():
+            Enrolment.objects.bulk_create(
+                [Enrolment(class_group=class_group, student_id=student_id) for student_id in validated_data["students"]],
+                ignore_conflicts=True,
+            )
+            # A listagem de faltas por turma depende das matrículas
+            cache.invalidate([cache.ABSENCES, cache.REQUESTS], student_ids=validated_data["students"])
+        return class_group
+
+
+class AnnotatedAbsencesSerializer(AbsencesSerializer):
+    """Falta com a situação da solicitação de perdão mais recente, anotada na própria consulta"""
+
+    forgiveness_request_id = serializers.IntegerField(read_only=True, allow_null=True)
+    forgiveness_request_status = serializers.CharField(read_only=True, allow_null=True)
+    has_forgiveness_request = serializers.SerializerMethodField()
+    has_pending_request = serializers.BooleanField(read_only=True)
+
+    class Meta(AbsencesSerializer.Meta):
+        fields = AbsencesSerializer.Meta.fields + [
+            "forgiveness_request_id",
+            "forgiveness_request_status",
+            "has_forgiveness_request",
+            "has_pending_request",
+        ]
+
+    @staticmethod
+    def annotate(queryset):
+        # Faltas arquivadas são anotadas com as solicitações arquivadas
+        requests = REQUEST_MODELS[queryset.model]
+        latest = requests.objects.filter(absence=OuterRef("pk")).order_by("-created_at", "-id")
+        return queryset.annotate(
+            forgiveness_request_id=Subquery(latest.values("id")[:1]),
+            forgiveness_request_status=Subquery(latest.values("status")[:1]),
+            has_pending_request=Exists(
+                requests.objects.filter(absence=OuterRef("pk"), status="PENDING")
+            ),
+        )
+
+    def get_has_forgiveness_request(self, obj):
+        return obj.forgiveness_request_id is not None
+
+
+class AbsenceSummarySerializer(QueryShapingMixin, serializers.ModelSerializer):
+    student_username = serializers.CharField(source="student.username", read_only=True)
+    discipline = DisciplineField(read_only=True)
+    unexcused = serializers.IntegerField(read_only=True)
+    attendance_rate = serializers.FloatField(read_only=True, allow_null=True)
+
+    select_related_fields = ("student", "discipline")
+    only_fields = (
+        "id", "student", "student__username", "discipline", "discipline__name", "term",
+        "total_classes", "absences", "forgiven", "pending", "updated_at",
+    )
+
+    class Meta:
+        model = AbsenceSummary
+        fields = [
+            "student", "student_username", "discipline", "term", "total_classes",
+            "absences", "forgiven", "pending", "unexcused", "attendance_rate", "updated_at",
+        ]
+        read_only_fields = fields
+
+
+class RollCallEntrySerializer(serializers.Serializer):
+    student = serializers.IntegerField()
+    is_absent = serializers.BooleanField(default=True)
+    reason = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+
+class AbsenceBulkCreateSerializer(serializers.Serializer):
+    """Chamada de uma turma inteira: uma disciplina, uma data e a lista de alunos"""
+
+    MAX_ENTRIES = 500
+
+    discipline = DisciplineField()
+    date = serializers.DateField()
+    entries = RollCallEntrySerializer(many=True, allow_empty=False, max_length=MAX_ENTRIES)
+
+    def validate(self, attrs):
+        # Confere o papel de todos os alunos da chamada com uma única consulta
+        student_ids = {entry["student"] for entry in attrs["entries"]}
+        roles = dict(User.objects.filter(id__in=student_ids).values_list("id", "role"))
+
+        valid_entries, errors, seen = [], [], set()
+        for index, entry in enumerate(attrs["entries"]):
+            student_id = entry["student"]
+            if student_id in seen:
+                error = "Aluno repetido na chamada."
+            elif student_id not in roles:
+                error = "Aluno não encontrado."
+            elif roles[student_id] != "student":
+                error = "A falta só pode ser atribuída a um estudante."
+            else:
+                error = None
+            seen.add(student_id)
+
+            if error:
+                errors.append({"index": index, "student": student_id, "error": error})
+            else:
+                valid_entries.append(entry)
+
+        if not valid_entries:
+            raise serializers.ValidationError({"entries": errors})
+
+        attrs["entries"] = valid_entries
+        attrs["errors"] = errors
+        return attrs
+
+    def create(self, validated_data):
+        absences = [
+            Absence(
+                student_id=entry["student"],
+                discipline=validated_data["discipline"],
+                date=validated_data["date"],
+                is_absent=entry["is_absent"],
+                reason=entry.get("reason"),
+            )
+            for entry in validated_data["entries"]
+        ]
+        with transaction.atomic():
+            absences = Absence.objects.bulk_create(absences, batch_size=self.MAX_ENTRIES)
+            # bulk_create não dispara post_save, então a invalidação é explícita
+            cache.invalidate(
+                [cache.ABSENCES, cache.REQUESTS],
+                student_ids=[entry["student"] for entry in validated_data["entries"]],
+            )
+            summaries.schedule(summaries.cell_for(absence) for absence in absences)
+            # bulk_create no MySQL não devolve os ids: as faltas são achadas pela chamada
+            search.schedule(Absence.objects.filter(
+                student_id__in=[entry["student"] for entry in validated_data["entries"]],
+                discipline=validated_data["discipline"], date=validated_data["date"],
+            ))
+            events.publish_many(
+                (absence.student_id, events.ABSENCE_CREATED, events.absence_payload(absence)) for absence in absences
+            )
+        return absences
+
+
+class ReviewDecisionSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    status = serializers.ChoiceField(choices=["APPROVED", "REJECTED"])
+    comments = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+
+class ForgivenessRequestBatchReviewSerializer(serializers.Serializer):
+    """Decisão de várias solicitações pendentes de uma vez, com o resultado de cada id"""
+
+    MAX_DECISIONS = 500
+
+    decisions = ReviewDecisionSerializer(many=True, allow_empty=False, max_length=MAX_DECISIONS)
+
+    def create(self, validated_data):
+        decisions = validated_data["decisions"]
+        results, updated = [], []
+        with transaction.atomic():
+            # As linhas ficam travadas até o commit: duas revisões simultâneas
+            # da mesma solicitação não decidem as duas
+            locked = ForgivenessRequest.objects.select_for_update().only("id", "absence_id", "status", "comments")
+            requests = locked.in_bulk([decision["id"] for decision in decisions])
+            absences = Absence.objects.only("student_id", "discipline", "date").in_bulk(
+                {request.absence_id for request in requests.values()}
+            )
+
+            seen = set()
+            for decision in decisions:
+                request = requests.get(decision["id"])
+                if decision["id"] in seen:
+                    results.append({"id": decision["id"], "outcome": "duplicate", "error": "Solicitação repetida no lote."})
+                elif request is None:
+                    results.append({"id": decision["id"], "outcome": "not_found", "error": "Solicitação não encontrada."})
+                elif request.status != "PENDING":
+                    results.append({
+                        "id": request.pk, "outcome": "conflict", "status": request.status,
+                        "error": "A solicitação já foi decidida.",
+                    })
+                else:
+                    request.status = decision["status"]
+                    if "comments" in decision:
+                        request.comments = decision["comments"]
+                    request.updated_at = timezone.now()
+                    updated.append(request)
+                    results.append({"id": request.pk, "outcome": "updated", "status": request.status})
+                seen.add(decision["id"])
+
+            # Uma única instrução UPDATE ... WHERE id IN (...) para o lote inteiro
+            ForgivenessRequest.objects.bulk_update(
+                updated, ["status", "comments", "updated_at"], batch_size=self.MAX_DECISIONS,
+            )
+            # bulk_update não dispara post_save, então invalidação, contadores e avisos são explícitos
+            student_ids = {absences[request.absence_id].student_id for request in updated}
+            cache.invalidate([cache.REQUESTS], student_ids=student_ids)
+            summaries.schedule(summaries.cell_for(absences[request.absence_id]) for request in updated)
+            commented = {decision["id"] for decision in decisions if "comments" in decision}
+            search.schedule(Absence.objects.filter(
+                id__in=[request.absence_id for request in updated if request.pk in commented],
+            ))
+            events.publish_many(
+                (absences[request.absence_id].student_id, events.REQUEST_STATUS, events.request_payload(request))
+                for request in updated
+            )
+        return results
+
+
+class JustificationUploadSerializer(serializers.ModelSerializer):
+    """Início e estado de um envio em partes
+
+    O cliente declara nome, tipo e tamanho; tipos e tamanhos fora dos limites
+    são recusados antes de qualquer byte do arquivo ser enviado.
+    """
+
+    chunk_size = serializers.SerializerMethodField()
+    complete = serializers.BooleanField(source="is_complete", read_only=True)
+
+    class Meta:
+        model = JustificationUpload
+        fields = ["id", "filename", "content_type", "size", "received_bytes", "chunk_size", "complete", "created_at"]
+        read_only_fields = ["id", "received_bytes", "created_at"]
+
+    def get_chunk_size(self, obj):
+        return settings.JUSTIFICATION_CHUNK_SIZE
+
+    def validate(self, attrs):
+        uploads.validate_declared(attrs["content_type"], attrs["size"])
+        return attrs
+
+
+class JustificationPreviewSerializer(serializers.ModelSerializer):
+    """Resumo leve do arquivo para as listagens, sem baixar o arquivo inteiro"""
+
+    class Meta:
+        model = JustificationFile
+        fields = ["content_type", "size", "preview", "text_excerpt", "processed_at"]
+        read_only_fields = fields
+
+
+class ForgivenessRequestsSerializer(QueryShapingMixin, serializers.ModelSerializer):
     absence = serializers.PrimaryKeyRelatedField(
         queryset=Absence.objects.all(), 
         required=False  # Campo não obrigatório em atualizações
     )
     justification_file = serializers.FileField(required=False)
+    upload = OwnUploadField(
+        required=False,
+        write_only=True,  # Envio em partes já concluído, alternativa ao justification_file
+    )
     absence_details = AbsencesSerializer(source="absence", read_only=True)
+    justification_preview = JustificationPreviewSerializer(source="stored_file", read_only=True)
+
+    select_related_fields = ("absence__student", "absence__discipline", "stored_file")
+    only_fields = (
+        "id", "absence", "justification_file", "status", "comments",
+        "created_at", "updated_at", "stored_file",
+    ) + tuple(f"absence__{field}" for field in AbsencesSerializer.only_fields) + tuple(
+        f"stored_file__{field}" for field in JustificationPreviewSerializer.Meta.fields
+    )
 
     class Meta:
         model = ForgivenessRequest
@@ -57,6 +539,8 @@ class ForgivenessRequestsSerializer(serializers.ModelSerializer):
             "absence",
             "absence_details",
             "justification_file",
+            "upload",
+            "justification_preview",
             "status",
             "comments",
             "created_at",
@@ -68,11 +552,31 @@ class ForgivenessRequestsSerializer(serializers.ModelSerializer):
             "status": {"read_only": False},
         }
         
+    def attach_file(self, validated_data):
+        """Troca o arquivo recebido pelo arquivo deduplicado por conteúdo"""
+        upload = validated_data.pop("upload", None)
+        uploaded_file = validated_data.pop("justification_file", None)
+        if upload is not None:
+            stored_file = upload.stored_file
+        elif uploaded_file is not None:
+            stored_file = uploads.store_uploaded_file(uploaded_file)
+        else:
+            return validated_data
+        validated_data["stored_file"] = stored_file
+        validated_data["justification_file"] = stored_file.file.name
+        return validated_data
+
     def create(self, validated_data):
         absence = validated_data.get("absence")
         
         if ForgivenessRequest.objects.filter(absence=absence, status="PENDING").exists():
             raise serializers.ValidationError("Já existe um pedido pendente para esta ausência.")
 
-        request = ForgivenessRequest.objects.create(**validated_data)
-        return request
\ No newline at end of file
+        if "upload" not in validated_data and "justification_file" not in validated_data:
+            raise serializers.ValidationError({"justification_file": "Envie o arquivo de justificativa."})
+
+        request = ForgivenessRequest.objects.create(**self.attach_file(validated_data))
+        return request
+
+    def update(self, instance, validated_data):
+        return super().update(instance, self.attach_file(validated_data))
\ No newline at end of file
@@ -0,0 +1,110 @@
+from contextlib import contextmanager
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import cache, events, jobs, search, summaries
+from .models import User, Absence, ForgivenessRequest, JustificationFile
+from .terms import term_for
+
+
+# Campos de Absence que entram nos contadores; mudar só o motivo não recalcula os resumos
+SUMMARY_FIELDS = {"student", "student_id", "discipline", "discipline_id", "date", "is_absent"}
+# Campos que entram no documento da busca textual (api/search.py)
+SEARCH_FIELDS = {"student", "student_id", "discipline", "discipline_id", "reason"}
+
+
+def remember_saved_values(instance, fields):
+    """Atualiza os valores de referência do from_db após salvar, para o próximo save"""
+    loaded = getattr(instance, "_loaded_values", {})
+    loaded.update({field: getattr(instance, field) for field in fields})
+    instance._loaded_values = loaded
+
+
+@receiver([post_save, post_delete], sender=Absence)
+def absence_changed(sender, instance, created=False, **kwargs):
+    # A listagem de solicitações embute os dados da falta
+    cache.invalidate([cache.ABSENCES, cache.REQUESTS], student_ids=[instance.student_id])
+    if created:
+        events.publish(instance.student_id, events.ABSENCE_CREATED, events.absence_payload(instance))
+
+    update_fields = kwargs.get("update_fields")
+    if update_fields is None or update_fields & SUMMARY_FIELDS:
+        cells = {summaries.cell_for(instance)}
+        loaded = getattr(instance, "_loaded_values", {})
+        if {"student_id", "discipline_id", "date"} <= loaded.keys():
+            # A falta pode ter mudado de disciplina ou de data: a célula antiga também muda
+            cells.add((loaded["student_id"], loaded["discipline_id"], term_for(loaded["date"])))
+        summaries.schedule(cells)
+    # Apagada, a falta leva o documento da busca em cascata
+    if kwargs.get("signal") is post_save and (update_fields is None or update_fields & SEARCH_FIELDS):
+        search.schedule(Absence.objects.filter(pk=instance.pk))
+    remember_saved_values(instance, ["student_id", "discipline_id", "date"])
+
+
+@receiver([post_save, post_delete], sender=ForgivenessRequest)
+def forgiveness_request_changed(sender, instance, created=False, **kwargs):
+    absence = Absence.objects.filter(pk=instance.absence_id).only("student_id", "discipline", "date").first()
+    cache.invalidate([cache.REQUESTS], student_ids=[absence.student_id] if absence else [])
+
+    # Somente novas solicitações, exclusões e mudanças de status alteram os contadores
+    loaded_status = getattr(instance, "_loaded_values", {}).get("status")
+    status_changed = created or kwargs.get("signal") is post_delete or loaded_status != instance.status
+    if absence is not None and status_changed:
+        summaries.schedule([summaries.cell_for(absence)])
+        if not created and kwargs.get("signal") is post_save:
+            # Avisa o aluno que a solicitação foi aprovada ou rejeitada
+            events.publish(absence.student_id, events.REQUEST_STATUS, events.request_payload(instance))
+    # Os comentários da solicitação entram no documento da falta
+    update_fields = kwargs.get("update_fields")
+    if absence is not None and (update_fields is None or "comments" in update_fields):
+        search.schedule(Absence.objects.filter(pk=instance.absence_id))
+    remember_saved_values(instance, ["status"])
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, **kwargs):
+    # O username do aluno aparece nas faltas e nas solicitações
+    cache.invalidate([cache.STUDENTS, cache.ABSENCES, cache.REQUESTS], student_ids=[instance.pk])
+    # O nome e o username do aluno entram nos documentos da busca das suas faltas
+    update_fields = kwargs.get("update_fields")
+    if kwargs.get("signal") is post_save and not kwargs.get("created") and instance.role == "student" and (
+        update_fields is None or update_fields & {"name", "username"}
+    ):
+        search.schedule(Absence.objects.filter(student_id=instance.pk))
+
+
+@receiver(post_save, sender=JustificationFile)
+def justification_file_saved(sender, instance, created, **kwargs):
+    if created:
+        jobs.enqueue("justification_preview", file_id=instance.pk)
+        return
+    # A prévia gerada aparece na listagem das solicitações que usam o arquivo
+    student_ids = ForgivenessRequest.objects.filter(stored_file=instance).values_list("absence__student_id", flat=True)
+    cache.invalidate([cache.REQUESTS], student_ids=list(student_ids))
+
+
+@contextmanager
+def muted_signals():
+    """Desliga os receivers deste módulo durante operações em lote, que cuidam da invalidação
+
+    Sem receivers o Django apaga em cascata com DELETEs diretos, sem carregar
+    as linhas. Os receivers são desligados no processo inteiro, então isto é
+    para comandos de manutenção, não para views.
+    """
+    receivers = [
+        (signal, receiver, sender)
+        for receiver, sender in [
+            (absence_changed, Absence),
+            (forgiveness_request_changed, ForgivenessRequest),
+            (user_changed, User),
+        ]
+        for signal in (post_save, post_delete)
+    ]
+    for signal, receiver, sender in receivers:
+        signal.disconnect(receiver, sender=sender)
+    try:
+        yield
+    finally:
+        for signal, receiver, sender in receivers:
+            signal.connect(receiver, sender=sender)
@@ -0,0 +1,121 @@
+from collections import defaultdict
+
+from django.db import connections, router, transaction
+from django.db.models import Count, Exists, Max, Min, OuterRef, Q
+
+from .models import REQUEST_MODELS, Absence, AbsenceSummary, ArchivedAbsence, ArchivedTerm
+from .terms import term_for, term_range, terms_between
+
+COUNTERS = ("total_classes", "absences", "forgiven", "pending")
+
+
+def cell_for(absence):
+    return (absence.student_id, absence.discipline_id, term_for(absence.date))
+
+
+def count_cells(queryset):
+    """Contadores agrupados por (aluno, id da disciplina) em uma consulta"""
+    requests = REQUEST_MODELS[queryset.model]
+    approved = requests.objects.filter(absence=OuterRef("pk"), status="APPROVED")
+    pending = requests.objects.filter(absence=OuterRef("pk"), status="PENDING")
+    return queryset.values("student_id", "discipline").annotate(
+        total_classes=Count("id"),
+        absences=Count("id", filter=Q(is_absent=True)),
+        forgiven=Count("id", filter=Q(Exists(approved), is_absent=True)),
+        pending=Count("id", filter=Q(Exists(pending), is_absent=True) & ~Q(Exists(approved))),
+    )
+
+
+def count_term(term, **filters):
+    """Contadores do semestre, somando as faltas arquivadas quando o semestre foi arquivado"""
+    querysets = [Absence.objects.filter(date__range=term_range(term), **filters)]
+    if ArchivedTerm.objects.filter(term=term).exists():
+        querysets.append(ArchivedAbsence.objects.filter(term=term, **filters))
+
+    totals = {}
+    for queryset in querysets:
+        for row in count_cells(queryset):
+            key = (row["student_id"], row["discipline"])
+            if key in totals:
+                for counter in COUNTERS:
+                    totals[key][counter] += row[counter]
+            else:
+                totals[key] = row
+    return list(totals.values())
+
+
+def save_rows(term, rows):
+    summaries = [
+        AbsenceSummary(
+            student_id=row["student_id"],
+            discipline_id=row["discipline"],
+            term=term,
+            **{counter: row[counter] for counter in COUNTERS},
+        )
+        for row in rows
+    ]
+    # O MySQL não aceita o alvo do conflito: o ON DUPLICATE KEY UPDATE usa a restrição
+    # única (student, discipline, term), a única da tabela além da chave primária
+    features = connections[router.db_for_write(AbsenceSummary)].features
+    unique_fields = ["student", "discipline", "term"] if features.supports_update_conflicts_with_target else None
+    AbsenceSummary.objects.bulk_create(
+        summaries,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=unique_fields,
+        update_fields=[*COUNTERS, "updated_at"],
+    )
+
+
+def refresh(cells):
+    """Recalcula as células (aluno, disciplina, semestre) informadas
+
+    Cada semestre afetado custa uma consulta de agregação restrita às faltas
+    dessas células, servida pelo índice student+date, e um upsert.
+    """
+    by_term = defaultdict(set)
+    for student_id, discipline, term in cells:
+        by_term[term].add((student_id, discipline))
+
+    for term, pairs in by_term.items():
+        students = {student_id for student_id, _ in pairs}
+        disciplines = {discipline for _, discipline in pairs}
+        rows = count_term(term, student_id__in=students, discipline__in=disciplines)
+        rows = [row for row in rows if (row["student_id"], row["discipline"]) in pairs]
+        save_rows(term, rows)
+
+        # Células que ficaram sem nenhuma falta
+        empty = pairs - {(row["student_id"], row["discipline"]) for row in rows}
+        for student_id, discipline in empty:
+            AbsenceSummary.objects.filter(student_id=student_id, discipline=discipline, term=term).delete()
+
+
+def schedule(cells):
+    """Recalcula as células depois do commit, como search.schedule
+
+    Contadas dentro da transação, duas transações simultâneas contariam cada
+    uma a partir do próprio snapshot e a última a gravar desfaria a outra.
+    """
+    cells = set(cells)
+    if cells:
+        transaction.on_commit(lambda: refresh(cells))
+
+
+def rebuild():
+    """Recria a tabela inteira a partir das faltas, um semestre por vez, incluindo as arquivadas"""
+    AbsenceSummary.objects.all().delete()
+    dates = [
+        date
+        for model in (Absence, ArchivedAbsence)
+        for date in model.objects.aggregate(first=Min("date"), last=Max("date")).values()
+        if date is not None
+    ]
+    if not dates:
+        return 0
+
+    created = 0
+    for term in terms_between(min(dates), max(dates)):
+        rows = count_term(term)
+        save_rows(term, rows)
+        created += len(rows)
+    return created
@@ -0,0 +1,43 @@
+from datetime import date
+
+from django.db.models import Case, DateField, Q, Value, When
+from django.db.models.functions import Cast, Concat, Substr
+
+
+def term_for(day):
+    """Semestre letivo da data, no formato "2025-1" (jan-jun) ou "2025-2" (jul-dez)"""
+    return f"{day.year}-{1 if day.month <= 6 else 2}"
+
+
+def term_range(term):
+    """Primeiro e último dia do semestre"""
+    year, half = (int(part) for part in term.split("-"))
+    if half == 1:
+        return date(year, 1, 1), date(year, 6, 30)
+    return date(year, 7, 1), date(year, 12, 31)
+
+
+def term_range_expressions(field):
+    """term_range calculado pelo banco a partir da coluna field, para consultas que não podem ser avaliadas antes"""
+    year = Substr(field, 1, 4)
+    first_half = Q(**{f"{field}__endswith": "-1"})
+    start = Case(When(first_half, then=Concat(year, Value("-01-01"))), default=Concat(year, Value("-07-01")))
+    end = Case(When(first_half, then=Concat(year, Value("-06-30"))), default=Concat(year, Value("-12-31")))
+    return Cast(start, DateField()), Cast(end, DateField())
+
+
+def terms_between(start, end):
+    """Todos os semestres que cobrem o intervalo de datas, em ordem"""
+    terms = []
+    year, half = start.year, 1 if start.month <= 6 else 2
+    while (year, half) <= (end.year, 1 if end.month <= 6 else 2):
+        terms.append(f"{year}-{half}")
+        year, half = (year, 2) if half == 1 else (year + 1, 1)
+    return terms
+
+
+def shift_term(term, count):
+    """Semestre count semestres depois (ou antes, se negativo) do informado"""
+    year, half = (int(part) for part in term.split("-"))
+    index = year * 2 + half - 1 + count
+    return f"{index // 2}-{index % 2 + 1}"
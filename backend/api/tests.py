@@ -1,3 +1,1786 @@
-from django.test import TestCase
+import asyncio
+import os
+import shutil
+import tempfile
+import csv
+import io
+import json
+from datetime import date, timedelta
+from functools import partial
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+
+from django.core.management import CommandError, call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from . import archive, conditional, exports, imports, jobs, metrics, search, uploads
+from .filters import AbsenceFilterBackend, ForgivenessRequestFilterBackend
+from .models import (
+    User,
+    Absence,
+    AbsenceSummary,
+    ArchivedAbsence,
+    ArchivedForgivenessRequest,
+    ArchivedTerm,
+    ClassGroup,
+    Discipline,
+    Event,
+    ForgivenessRequest,
+    JustificationFile,
+    JustificationUpload,
+    Job,
+    SearchDocument,
+)
+from .routers import ReplicaRouter, replica_reads
+from .serializers import CustomTokenObtainPairSerializer
+from .throttles import LoadSheddingMiddleware
+
+TEST_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def tearDownModule():
+    shutil.rmtree(TEST_MEDIA_ROOT, ignore_errors=True)
+
+
+def create_user(username, role):
+    return User.objects.create_user(
+        username=username,
+        email=f"{username}@example.com",
+        password="senha-segura-123",
+        role=role,
+        name=username.title(),
+    )
+
+
+def discipline(name):
+    return Discipline.objects.get_or_create(name=name)[0]
+
+
+def create_absence(student, **kwargs):
+    kwargs["discipline"] = discipline(kwargs.get("discipline", "Matemática"))
+    kwargs.setdefault("date", date(2025, 3, 10))
+    kwargs.setdefault("is_absent", True)
+    return Absence.objects.create(student=student, **kwargs)
+
+
+def create_forgiveness_request(absence, **kwargs):
+    kwargs.setdefault("justification_file", SimpleUploadedFile("atestado.pdf", b"%PDF-1.4"))
+    return ForgivenessRequest.objects.create(absence=absence, **kwargs)
+
+
+@override_settings(
+    MEDIA_ROOT=TEST_MEDIA_ROOT,
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "state": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "state"},
+    },
+)
+class APITestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches["state"].clear()
+        self.client = APIClient()
+        for name in ("Matemática", "Física", "Química", "História"):
+            discipline(name)
+        self.admin = create_user("admin", "admin")
+        self.professor = create_user("professor", "professor")
+        self.student = create_user("aluno", "student")
+
+    def count_queries(self, user, url, params=None):
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200, response.content)
+        return len(context.captured_queries)
+
+    def assertConstantQueries(self, user, url, add_row, params=None):
+        """Garante que o número de consultas não cresce com o número de linhas"""
+        add_row()
+        baseline = self.count_queries(user, url, params)
+        for _ in range(5):
+            add_row()
+        self.assertEqual(self.count_queries(user, url, params), baseline)
+
+
+class QueryShapingTests(APITestCase):
+    def add_absence(self):
+        student = create_user(f"aluno{User.objects.count()}", "student")
+        create_absence(student)
+
+    def add_forgiveness_request(self):
+        student = create_user(f"aluno{User.objects.count()}", "student")
+        create_forgiveness_request(create_absence(student))
+
+    def test_absence_list(self):
+        self.assertConstantQueries(self.professor, "/api/absences/", self.add_absence)
+
+    def test_absence_check(self):
+        self.assertConstantQueries(self.professor, "/api/absences/check/", self.add_absence)
+
+    def test_forgiveness_request_list(self):
+        self.assertConstantQueries(self.admin, "/api/forgiveness-requests/", self.add_forgiveness_request)
+
+    def test_student_list(self):
+        self.assertConstantQueries(
+            self.professor, "/api/students/", lambda: create_user(f"aluno{User.objects.count()}", "student")
+        )
+
+    def test_shaped_payload_keeps_nested_fields(self):
+        create_forgiveness_request(create_absence(self.student))
+        self.client.force_authenticate(self.student)
+        response = self.client.get("/api/forgiveness-requests/")
+        self.assertEqual(response.data["results"][0]["absence_details"]["student_username"], "aluno")
+
+
+class KeysetPaginationTests(APITestCase):
+    def collect_pages(self, url, page_size):
+        self.client.force_authenticate(self.professor)
+        ids, next_url = [], f"{url}?page_size={page_size}"
+        while next_url:
+            response = self.client.get(next_url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row["id"] for row in response.data["results"])
+            next_url = response.data["next"]
+        return ids
+
+    def test_pages_cover_every_row_once_newest_first(self):
+        absences = [create_absence(self.student) for _ in range(7)]
+        # Empates em created_at são desfeitos pelo id
+        Absence.objects.update(created_at=absences[0].created_at)
+        ids = self.collect_pages("/api/absences/", page_size=3)
+        self.assertEqual(ids, sorted((a.id for a in absences), reverse=True))
+
+    def test_forgiveness_requests_are_paginated(self):
+        for _ in range(4):
+            create_forgiveness_request(create_absence(self.student))
+        self.client.force_authenticate(self.admin)
+        response = self.client.get("/api/forgiveness-requests/", {"page_size": 3})
+        self.assertEqual(len(response.data["results"]), 3)
+        self.assertIsNotNone(response.data["next"])
+        self.assertEqual(len(self.collect_pages("/api/forgiveness-requests/", page_size=3)), 4)
+
+    def test_deep_page_uses_keyset_filter_instead_of_offset(self):
+        for _ in range(3):
+            create_absence(self.student)
+        self.client.force_authenticate(self.professor)
+        next_url = self.client.get("/api/absences/", {"page_size": 1}).data["next"]
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(next_url)
+        sql = context.captured_queries[-1]["sql"]
+        self.assertNotIn("OFFSET", sql.upper())
+        self.assertIn("created_at", sql)
+
+    def test_invalid_cursor(self):
+        self.client.force_authenticate(self.professor)
+        response = self.client.get("/api/absences/", {"cursor": "nao-e-um-cursor"})
+        self.assertEqual(response.status_code, 404)
+
+
+class IndexedFilterTests(APITestCase):
+    def filtered(self, backend, model, params):
+        request = Request(APIRequestFactory().get("/", params))
+        return backend().filter_queryset(request, model.objects.all(), view=None)
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, plan)
+
+    def test_absence_filters_are_index_backed(self):
+        cases = [
+            ({"student": self.student.id, "date_from": "2025-03-01"}, "absence_student_date_idx"),
+            ({"discipline": "Física", "date_from": "2025-03-01", "date_to": "2025-03-31"}, "absence_discipline_date_idx"),
+            ({"date": "2025-03-10", "is_absent": "true"}, "absence_date_idx"),
+            ({"date_from": "2025-03-01", "date_to": "2025-03-31"}, "absence_date_idx"),
+        ]
+        for params, index_name in cases:
+            with self.subTest(params=params):
+                self.assertUsesIndex(self.filtered(AbsenceFilterBackend, Absence, params), index_name)
+
+    def test_pending_lookup_is_index_backed(self):
+        absence = create_absence(self.student)
+        queryset = ForgivenessRequest.objects.filter(absence=absence, status="PENDING")
+        self.assertUsesIndex(queryset, "request_absence_status_idx")
+
+    def test_status_listing_is_index_backed(self):
+        queryset = self.filtered(ForgivenessRequestFilterBackend, ForgivenessRequest, {"status": "PENDING"})
+        self.assertUsesIndex(queryset.order_by("-created_at", "-id"), "request_status_created_idx")
+
+    def test_absence_list_filters(self):
+        create_absence(self.student, discipline="Física", date=date(2025, 3, 5), is_absent=True)
+        create_absence(self.student, discipline="Física", date=date(2025, 4, 5), is_absent=False)
+        create_absence(self.student, discipline="Química", date=date(2025, 3, 6), is_absent=True)
+        self.client.force_authenticate(self.professor)
+        response = self.client.get(
+            "/api/absences/",
+            {"discipline": "Física", "date_from": "2025-03-01", "date_to": "2025-03-31", "is_absent": "true"},
+        )
+        self.assertEqual([row["date"] for row in response.data["results"]], ["2025-03-05"])
+
+    def test_invalid_filter_values(self):
+        self.client.force_authenticate(self.professor)
+        for params in ({"date_from": "ontem"}, {"is_absent": "talvez"}, {"student": "abc"}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get("/api/absences/", params).status_code, 400)
+        response = self.client.get("/api/forgiveness-requests/", {"status": "ARCHIVED"})
+        self.assertEqual(response.status_code, 400)
+
+
+class AbsenceBulkCreateTests(APITestCase):
+    url = "/api/absences/bulk-create/"
+
+    def test_roll_call_uses_constant_queries(self):
+        students = [create_user(f"turma{i}", "student") for i in range(30)]
+        discipline("História")
+        payload = {
+            "discipline": "História",
+            "date": "2025-03-10",
+            "entries": [{"student": s.id, "is_absent": i % 2 == 0} for i, s in enumerate(students)],
+        }
+        self.client.force_authenticate(self.professor)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(self.url, payload, format="json")
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data, {"created": 30, "errors": []})
+        self.assertEqual(Absence.objects.filter(discipline__name="História", is_absent=True).count(), 15)
+        # Disciplina e perfis em uma consulta cada, um único INSERT e a atualização
+        # dos resumos, independente do tamanho da turma
+        self.assertLessEqual(len(context.captured_queries), 8)
+
+    def test_invalid_rows_are_reported(self):
+        self.client.force_authenticate(self.professor)
+        response = self.client.post(self.url, {
+            "discipline": "História",
+            "date": "2025-03-10",
+            "entries": [
+                {"student": self.student.id},
+                {"student": self.professor.id},
+                {"student": 999999},
+                {"student": self.student.id},
+            ],
+        }, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual([e["index"] for e in response.data["errors"]], [1, 2, 3])
+
+    def test_all_rows_invalid(self):
+        self.client.force_authenticate(self.professor)
+        response = self.client.post(self.url, {
+            "discipline": "História", "date": "2025-03-10", "entries": [{"student": self.admin.id}],
+        }, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Absence.objects.exists())
+
+    def test_students_cannot_take_roll(self):
+        self.client.force_authenticate(self.student)
+        response = self.client.post(self.url, {
+            "discipline": "História", "date": "2025-03-10", "entries": [{"student": self.student.id}],
+        }, format="json")
+        self.assertEqual(response.status_code, 403)
+
+
+class ResponseCacheTests(APITestCase):
+    def get(self, user, url, params=None):
+        self.client.force_authenticate(user)
+        response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def stats(self):
+        return self.get(self.admin, "/api/cache/stats/").data
+
+    def test_repeated_poll_is_served_from_cache(self):
+        create_absence(self.student)
+        self.get(self.student, "/api/absences/")
+        with self.assertNumQueries(0):
+            self.client.get("/api/absences/")
+        self.assertEqual(self.stats(), {"hits": 1, "misses": 1})
+
+    def test_scopes_and_params_do_not_leak(self):
+        other = create_user("outro", "student")
+        create_absence(self.student, discipline="Física")
+        create_absence(other, discipline="Química")
+        self.assertEqual(len(self.get(self.student, "/api/absences/").data["results"]), 1)
+        self.assertEqual(len(self.get(other, "/api/absences/").data["results"]), 1)
+        self.assertEqual(len(self.get(self.professor, "/api/absences/").data["results"]), 2)
+        filtered = self.get(self.professor, "/api/absences/", {"discipline": "Física"})
+        self.assertEqual(len(filtered.data["results"]), 1)
+
+    def test_professor_and_admin_responses_are_kept_apart(self):
+        create_forgiveness_request(create_absence(self.student), status="APPROVED")
+        self.assertEqual(len(self.get(self.professor, "/api/forgiveness-requests/").data["results"]), 0)
+        self.assertEqual(len(self.get(self.admin, "/api/forgiveness-requests/").data["results"]), 1)
+
+    def test_saves_invalidate_affected_listings(self):
+        absence = create_absence(self.student)
+        request = create_forgiveness_request(absence)
+        self.get(self.student, "/api/forgiveness-requests/")
+        self.get(self.professor, "/api/students/")
+
+        request.status = "APPROVED"
+        request.save()
+        response = self.get(self.student, "/api/forgiveness-requests/")
+        self.assertEqual(response.data["results"][0]["status"], "APPROVED")
+
+        self.student.username = "aluno-renomeado"
+        self.student.save()
+        response = self.get(self.professor, "/api/students/")
+        self.assertIn("aluno-renomeado", [row["username"] for row in response.data])
+        response = self.get(self.student, "/api/forgiveness-requests/")
+        self.assertEqual(response.data["results"][0]["absence_details"]["student_username"], "aluno-renomeado")
+
+    def test_bulk_roll_call_invalidates_student_listing(self):
+        self.assertEqual(self.get(self.student, "/api/absences/").data["results"], [])
+        self.client.force_authenticate(self.professor)
+        self.client.post("/api/absences/bulk-create/", {
+            "discipline": "História", "date": "2025-03-10", "entries": [{"student": self.student.id}],
+        }, format="json")
+        self.assertEqual(len(self.get(self.student, "/api/absences/").data["results"]), 1)
+
+
+class ConditionalGetTests(APITestCase):
+    def get(self, user, url, **headers):
+        self.client.force_authenticate(user)
+        return self.client.get(url, headers=headers)
+
+    def test_matching_etag_returns_304_without_serializing(self):
+        create_absence(self.student)
+        first = self.get(self.student, "/api/absences/")
+        self.assertIn("ETag", first)
+        self.assertIn("Last-Modified", first)
+        with self.assertNumQueries(0):
+            second = self.get(self.student, "/api/absences/", If_None_Match=first["ETag"])
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.content, b"")
+
+    def test_edit_changes_etag(self):
+        absence = create_absence(self.student)
+        etag = self.get(self.professor, "/api/absences/")["ETag"]
+        absence.reason = "Atestado entregue"
+        absence.save()
+        response = self.get(self.professor, "/api/absences/", If_None_Match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_nested_absence_edit_changes_request_etag(self):
+        absence = create_absence(self.student)
+        create_forgiveness_request(absence)
+        etag = self.get(self.student, "/api/forgiveness-requests/")["ETag"]
+        absence.discipline = discipline("Física")
+        absence.save()
+        response = self.get(self.student, "/api/forgiveness-requests/", If_None_Match=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_differs_between_users_and_params(self):
+        create_absence(self.student)
+        student_etag = self.get(self.student, "/api/absences/")["ETag"]
+        self.assertNotEqual(self.get(self.professor, "/api/absences/")["ETag"], student_etag)
+        self.assertNotEqual(self.get(self.student, "/api/absences/?date=2025-03-10")["ETag"], student_etag)
+
+    def test_if_modified_since(self):
+        create_absence(self.student)
+        last_modified = self.get(self.student, "/api/absences/")["Last-Modified"]
+        response = self.get(self.student, "/api/absences/", If_Modified_Since=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+
+class ConditionalUpdateTests(APITestCase):
+    def patch(self, user, url, data, method="patch", **headers):
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as context, self.captureOnCommitCallbacks(execute=True):
+            response = getattr(self.client, method)(url, data, format="json", headers=headers)
+        self.writes = [q["sql"] for q in context.captured_queries if q["sql"].startswith("UPDATE")]
+        return response
+
+    def test_absence_patch_writes_only_changed_columns(self):
+        absence = create_absence(self.student)
+        url = f"/api/absences/update/{absence.id}/"
+        response = self.patch(self.professor, url, {"reason": "Atestado entregue", "is_absent": True})
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response["ETag"], '"%s"' % response.data["absence"]["updated_at"])
+        [update] = self.writes
+        self.assertIn('"reason"', update)
+        self.assertNotIn('"is_absent"', update)
+
+        # Sem mudança, nenhuma escrita
+        response = self.patch(self.professor, url, {"reason": "Atestado entregue"})
+        self.assertEqual((response.status_code, self.writes), (200, []))
+
+        # PUT continua aceito, com a mesma semântica
+        response = self.patch(self.professor, url, {"is_absent": "false", "discipline": "Física"}, method="put")
+        self.assertEqual(response.data["absence"]["discipline"], "Física")
+        self.assertFalse(AbsenceSummary.objects.get(discipline__name="Física").absences)
+        self.assertFalse(AbsenceSummary.objects.filter(discipline__name="Matemática").exists())
+
+    def test_stale_if_match_returns_412(self):
+        absence = create_absence(self.student)
+        url = f"/api/absences/update/{absence.id}/"
+        self.client.force_authenticate(self.professor)
+        etag = '"%s"' % self.client.get("/api/absences/").data["results"][0]["updated_at"]
+
+        response = self.patch(self.professor, url, {"reason": "Primeira"}, If_Match=etag)
+        self.assertEqual(response.status_code, 200)
+        response = self.patch(self.professor, url, {"reason": "Segunda"}, If_Match=etag)
+        self.assertEqual(response.status_code, 412)
+        absence.refresh_from_db()
+        self.assertEqual(absence.reason, "Primeira")
+        self.assertEqual(self.patch(self.professor, url, {"reason": "Segunda"}, If_Match="*").status_code, 200)
+
+    def test_two_professors_deciding_the_same_request(self):
+        other = create_user("professora", "professor")
+        request = create_forgiveness_request(create_absence(self.student))
+        url = f"/api/forgiveness-requests/{request.id}/update/"
+        self.client.force_authenticate(self.professor)
+        etag = '"%s"' % self.client.get("/api/forgiveness-requests/").data["results"][0]["updated_at"]
+
+        response = self.patch(self.professor, url, {"status": "APPROVED"}, If_Match=etag)
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response["ETag"], '"%s"' % response.data["updated_at"])
+        self.assertNotIn('"comments"', self.writes[0])
+        response = self.patch(other, url, {"status": "REJECTED"}, If_Match=etag)
+        self.assertEqual(response.status_code, 412)
+
+        request.refresh_from_db()
+        self.assertEqual(request.status, "APPROVED")
+        summary = AbsenceSummary.objects.get()
+        self.assertEqual((summary.forgiven, summary.pending), (1, 0))
+        self.assertEqual(Event.objects.filter(kind="forgiveness_request.status").count(), 1)
+
+    def test_stale_if_match_does_not_store_the_file(self):
+        request = create_forgiveness_request(create_absence(self.student))
+        etag = conditional.version_etag(request)
+        self.patch(self.professor, f"/api/forgiveness-requests/{request.id}/update/", {"status": "APPROVED"})
+        files = JustificationFile.objects.count()
+
+        self.client.force_authenticate(self.professor)
+        response = self.client.patch(
+            f"/api/forgiveness-requests/{request.id}/update/",
+            {"justification_file": SimpleUploadedFile("novo.pdf", b"%PDF-1.4 outro atestado")},
+            format="multipart",
+            headers={"If-Match": etag},
+        )
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(JustificationFile.objects.count(), files)
+
+    def test_missing_row_and_invalid_data(self):
+        self.assertEqual(self.patch(self.professor, "/api/absences/update/999/", {"reason": "x"}).status_code, 404)
+        absence = create_absence(self.student)
+        response = self.patch(self.professor, f"/api/absences/update/{absence.id}/", {"is_absent": "talvez"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.patch(self.student, f"/api/absences/update/{absence.id}/", {}).status_code, 403)
+
+
+class SearchTests(APITestCase):
+    url = "/api/absences/search/"
+
+    def setUp(self):
+        super().setUp()
+        self.other = create_user("outro", "student")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.consultation = create_absence(self.student, discipline="Física", reason="Consulta odontológica")
+            self.strike = create_absence(self.other, reason="Greve dos ônibus")
+            self.reviewed = create_absence(self.student, discipline="História", date=date(2025, 3, 11))
+            create_forgiveness_request(self.reviewed, comments="Atestado conferido pela coordenação")
+
+    def search(self, q, user=None, **params):
+        self.client.force_authenticate(user or self.professor)
+        response = self.client.get(self.url, {"q": q, **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return [row["id"] for row in response.data["results"]]
+
+    def test_prefixes_across_fields(self):
+        self.assertEqual(self.search("odonto"), [self.consultation.id])
+        self.assertEqual(self.search("fis"), [self.consultation.id])
+        self.assertEqual(self.search("ONIBUS"), [self.strike.id])
+        self.assertEqual(self.search("atestado coord"), [self.reviewed.id])
+        self.assertEqual(self.search("outr greve"), [self.strike.id])
+        self.assertEqual(self.search("aluno consulta"), [self.consultation.id])
+        self.assertEqual(self.search("consulta greve"), [])
+
+    def test_results_are_ranked_and_annotated(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            repeated = create_absence(self.other, reason="Consulta de retorno da consulta", date=date(2025, 3, 12))
+        self.client.force_authenticate(self.professor)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {"q": "consulta"})
+        results = response.data["results"]
+        self.assertEqual([row["id"] for row in results], [repeated.id, self.consultation.id])
+        self.assertGreater(results[0]["score"], results[1]["score"])
+        self.assertEqual(self.search("atestado")[0], self.reviewed.id)
+        self.assertEqual(response.data["results"][1]["discipline"], "Física")
+        self.assertIn("forgiveness_request_status", results[0])
+
+    def test_students_find_only_their_absences(self):
+        self.assertEqual(self.search("greve", self.other), [self.strike.id])
+        self.assertEqual(self.search("greve", self.student), [])
+        self.assertEqual(sorted(self.search("aluno", self.student)), [self.consultation.id, self.reviewed.id])
+
+    def test_index_follows_changes(self):
+        self.client.force_authenticate(self.professor)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f"/api/absences/update/{self.strike.id}/", {"reason": "Exame de sangue"}, format="json")
+            self.client.post("/api/forgiveness-requests/batch-review/", {"decisions": [
+                {"id": self.reviewed.forgivenessrequest_set.get().pk, "status": "REJECTED", "comments": "Sem assinatura"},
+            ]}, format="json")
+            self.client.post("/api/absences/bulk-create/", {
+                "discipline": "Química", "date": "2025-03-13", "entries": [{"student": self.other.id, "reason": "Doença"}],
+            }, format="json")
+            User.objects.filter(pk=self.student.pk).update(name="Beatriz")
+            self.student.refresh_from_db()
+            self.student.save(update_fields=["name"])
+            self.consultation.delete()
+
+        self.assertEqual(self.search("greve"), [])
+        self.assertEqual(self.search("sangue"), [self.strike.id])
+        self.assertEqual(self.search("atestado"), [])
+        self.assertEqual(self.search("assinatura"), [self.reviewed.id])
+        self.assertEqual(self.search("doen"), list(Absence.objects.filter(discipline__name="Química").values_list("id", flat=True)))
+        self.assertEqual(self.search("beatriz"), [self.reviewed.id])
+        self.assertEqual(self.search("odonto"), [])
+
+    def test_ranked_pages(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for day in range(1, 4):
+                create_absence(self.other, reason="Doença", date=date(2025, 4, day))
+        self.client.force_authenticate(self.professor)
+        first = self.client.get(self.url, {"q": "doença", "page_size": 2})
+        self.assertEqual(len(first.data["results"]), 2)
+        second = self.client.get(first.data["next"])
+        self.assertEqual(len(second.data["results"]), 1)
+        self.assertIsNone(second.data["next"])
+        self.assertEqual(self.client.get(self.url, {"q": "doença", "cursor": "x"}).status_code, 404)
+
+    def test_requires_terms(self):
+        self.client.force_authenticate(self.professor)
+        self.assertEqual(self.client.get(self.url, {"q": "a !"}).status_code, 400)
+        self.assertEqual(search.parse_terms('Consulta "médica" OR consulta* -x'), ["consulta", "médica", "or"])
+
+    def test_rebuild(self):
+        SearchDocument.objects.all().delete()
+        out = io.StringIO()
+        call_command("rebuild_search_index", stdout=out)
+        self.assertIn("3 documentos indexados", out.getvalue())
+        self.assertEqual(self.search("odonto"), [self.consultation.id])
+
+
+class UserImportTests(APITestCase):
+    header = "username,email,password,role,name\n"
+
+    def upload(self, content):
+        self.client.force_authenticate(self.admin)
+        return self.client.post(
+            "/api/auth/import/",
+            {"file": SimpleUploadedFile("alunos.csv", content.encode())},
+            format="multipart",
+        )
+
+    def test_valid_rows_are_created_and_invalid_rows_reported(self):
+        csv_content = self.header + (
+            "ana,ana@example.com,senha-1,,Ana\n"
+            "bia,bia@example.com,senha-2,professor,Bia\n"
+            "aluno,outro@example.com,senha-3,student,Repetido no banco\n"
+            "ana,ana2@example.com,senha-4,student,Repetida no arquivo\n"
+            "caio,nao-e-email,senha-5,student,Caio\n"
+            "duda,duda@example.com,senha-6,diretor,Duda\n"
+        )
+        with override_settings(USER_IMPORT_BATCH_SIZE=2):
+            with CaptureQueriesContext(connection) as context:
+                response = self.upload(csv_content)
+
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.data["rows"], 6)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual(
+            [(error["line"], sorted(error["errors"])) for error in response.data["errors"]],
+            [(4, ["username"]), (5, ["username"]), (6, ["email"]), (7, ["role"])],
+        )
+        ana = User.objects.get(username="ana")
+        self.assertEqual((ana.role, ana.name), ("student", "Ana"))
+        self.assertTrue(ana.check_password("senha-1"))
+        # Três lotes: duas consultas de unicidade e um INSERT por lote com linhas válidas
+        self.assertLessEqual(len([q for q in context.captured_queries if "api_user" in q["sql"]]), 10)
+
+    def test_large_files_are_sent_to_the_command(self):
+        csv_content = self.header + "".join(f"u{i},u{i}@example.com,senha,,U{i}\n" for i in range(3))
+        with override_settings(USER_IMPORT_API_MAX_ROWS=2):
+            response = self.upload(csv_content)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("import_users", str(response.data["file"]))
+        with override_settings(USER_IMPORT_API_MAX_SIZE=64):
+            response = self.upload(csv_content)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("import_users", str(response.data["file"]))
+        self.assertFalse(User.objects.filter(username="u0").exists())
+
+        with override_settings(USER_IMPORT_API_MAX_ROWS=3):
+            self.assertEqual(self.upload(csv_content).status_code, 201)
+
+    def test_missing_columns_and_all_invalid_rows_are_rejected(self):
+        response = self.upload("username,email\nana,ana@example.com\n")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("password", str(response.data["file"]))
+
+        response = self.upload(self.header + "aluno,aluno@example.com,senha,student,Aluno\n")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["created"], 0)
+
+    def test_repeated_rows_differing_in_case_are_reported(self):
+        response = self.upload(self.header + "Ana,Ana@example.com,senha-1,,Ana\nana,ANA@example.com,senha-2,,Ana\n")
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual(sorted(response.data["errors"][0]["errors"]), ["email", "username"])
+
+    def test_collisions_after_revalidation_become_row_errors(self):
+        # Outro processo cria "ana" durante o primeiro hash e "bia" durante o segundo
+        hashed = {}
+        hash_password = imports._hash
+
+        def racing_hash(algorithm, password):
+            hashed[password] = hashed.get(password, 0) + 1
+            if (password, hashed[password]) in {("ana", 1), ("bia", 2)}:
+                create_user(password, "student")
+            return hash_password(algorithm, password)
+
+        csv_content = self.header + "ana,ana@example.com,ana,,Ana\nbia,bia@example.com,bia,,Bia\ncaio,caio@example.com,caio,,Caio\n"
+        with mock.patch("api.imports._hash", racing_hash):
+            response = self.upload(csv_content)
+
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual([error["line"] for error in response.data["errors"]], [2, 3])
+        self.assertTrue(User.objects.get(username="caio").check_password("caio"))
+
+    def test_only_admins_can_import(self):
+        self.client.force_authenticate(self.professor)
+        response = self.client.post("/api/auth/import/", {}, format="multipart")
+        self.assertEqual(response.status_code, 403)
+
+    def test_command_hashes_passwords_in_process_pool(self):
+        path = f"{TEST_MEDIA_ROOT}/alunos.csv"
+        with open(path, "w") as file:
+            file.write(self.header)
+            for index in range(10):
+                file.write(f"aluno{index},aluno{index}@example.com,senha-{index},student,Aluno {index}\n")
+
+        output = io.StringIO()
+        call_command("import_users", path, workers=2, batch_size=4, stdout=output, stderr=io.StringIO())
+        self.assertIn("10 usuários criados de 10 linhas", output.getvalue())
+        self.assertTrue(User.objects.get(username="aluno7").check_password("senha-7"))
+
+
+class ArchiveTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.old = create_absence(self.student, date=date(2024, 3, 10))
+            self.approved = create_forgiveness_request(self.old, status="APPROVED")
+            self.waiting = create_absence(self.student, date=date(2024, 4, 10))
+            create_forgiveness_request(self.waiting)
+            self.recent = create_absence(self.student, date=date(2025, 3, 10))
+
+    def archive(self, **options):
+        call_command("archive_terms", stdout=io.StringIO(), **options)
+
+    def test_closed_terms_move_to_archive_tables(self):
+        with mock.patch.object(timezone, "localdate", return_value=date(2025, 4, 1)):
+            self.assertEqual(archive.archivable_terms(keep=2), ["2024-1"])
+        summaries_before = sorted(AbsenceSummary.objects.values_list("term", "absences", "forgiven", "pending"))
+
+        self.archive(term=["2024-1"])
+
+        # A falta com solicitação pendente fica até a revisão
+        self.assertEqual(set(Absence.objects.values_list("id", flat=True)), {self.waiting.id, self.recent.id})
+        archived = ArchivedAbsence.objects.get(id=self.old.id)
+        self.assertEqual((archived.term, archived.student_id), ("2024-1", self.student.id))
+        self.assertEqual(ArchivedForgivenessRequest.objects.get().id, self.approved.id)
+        self.assertEqual(ArchivedTerm.objects.get(term="2024-1").absences, 1)
+
+        # Os resumos somam as duas tabelas, também quando recalculados
+        self.assertEqual(sorted(AbsenceSummary.objects.values_list("term", "absences", "forgiven", "pending")), summaries_before)
+        call_command("rebuild_absence_summaries", stdout=io.StringIO())
+        self.assertEqual(sorted(AbsenceSummary.objects.values_list("term", "absences", "forgiven", "pending")), summaries_before)
+
+    def test_lists_default_to_hot_tables(self):
+        self.archive(term=["2024-1"])
+        self.client.force_authenticate(self.student)
+
+        response = self.client.get("/api/absences/")
+        self.assertEqual({row["id"] for row in response.data["results"]}, {self.waiting.id, self.recent.id})
+
+        response = self.client.get("/api/absences/", {"archived": "true", "include_requests": "true"})
+        self.assertEqual([row["id"] for row in response.data["results"]], [self.old.id])
+        self.assertEqual(response.data["results"][0]["forgiveness_request_status"], "APPROVED")
+
+        response = self.client.get("/api/forgiveness-requests/", {"archived": "true", "term": "2024-1"})
+        self.assertEqual([row["id"] for row in response.data["results"]], [self.approved.id])
+        self.assertEqual(self.client.get("/api/absences/", {"term": "2024"}).status_code, 400)
+
+    def test_updates_to_remaining_absences_keep_archived_counts(self):
+        self.archive(term=["2024-1"])
+        request = ForgivenessRequest.objects.get(absence=self.waiting)
+        request.status = "APPROVED"
+        with self.captureOnCommitCallbacks(execute=True):
+            request.save()
+        summary = AbsenceSummary.objects.get(term="2024-1")
+        self.assertEqual((summary.absences, summary.forgiven, summary.pending), (2, 2, 0))
+
+        # A segunda execução arquiva o que ficou para trás
+        self.archive(term=["2024-1"])
+        self.assertFalse(Absence.objects.filter(date__year=2024).exists())
+        self.assertEqual(ArchivedTerm.objects.get(term="2024-1").absences, 2)
+
+
+class ClassGroupTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = create_user("outro", "student")
+        self.client.force_authenticate(self.admin)
+        response = self.client.post("/api/class-groups/", {
+            "discipline": "Química", "term": "2025-1", "name": "A", "professor": self.professor.id,
+        }, format="json")
+        self.assertEqual(response.status_code, 201, response.data)
+        self.group_id = response.data["id"]
+
+    def test_admin_enrols_students(self):
+        url = f"/api/class-groups/{self.group_id}/students/"
+        self.assertTrue(Discipline.objects.filter(name="Química").exists())
+        self.assertEqual(self.client.post(url, {"students": [self.student.id]}, format="json").data, {"students": 1})
+        # Matricular de novo não duplica
+        self.assertEqual(self.client.post(url, {"students": [self.student.id]}, format="json").data, {"students": 1})
+        self.assertEqual(self.client.post(url, {"students": [self.professor.id]}, format="json").status_code, 400)
+
+        self.client.force_authenticate(self.professor)
+        self.assertEqual([row["id"] for row in self.client.get(url).data], [self.student.id])
+        self.assertEqual(self.client.post(url, {"students": [self.other.id]}, format="json").status_code, 403)
+
+    def test_absences_filtered_by_class_group(self):
+        self.client.post(f"/api/class-groups/{self.group_id}/students/", {"students": [self.student.id]}, format="json")
+        enrolled = create_absence(self.student, discipline="Química")
+        create_absence(self.student, discipline="Química", date=date(2025, 9, 1))
+        create_absence(self.student, discipline="Física")
+        create_absence(self.other, discipline="Química")
+
+        self.client.force_authenticate(self.professor)
+        response = self.client.get("/api/absences/", {"class_group": self.group_id})
+        self.assertEqual([row["id"] for row in response.data["results"]], [enrolled.id])
+        self.assertEqual(response.data["results"][0]["discipline"], "Química")
+        self.assertEqual(self.client.get("/api/absences/", {"class_group": 999}).data["results"], [])
+        self.assertEqual(self.client.get("/api/absences/", {"class_group": "x"}).status_code, 400)
+
+        token = CustomTokenObtainPairSerializer.get_token(self.professor).access_token
+        response = async_to_sync(self.async_client.get)(
+            "/api/async/absences/", {"class_group": self.group_id}, headers={"Authorization": f"Bearer {token}"},
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual([row["id"] for row in response.json()["results"]], [enrolled.id])
+
+    def test_unknown_discipline_is_rejected_without_creating_it(self):
+        self.client.force_authenticate(self.professor)
+        response = self.client.post("/api/absences/bulk-create/", {
+            "discipline": "Quimica", "date": "2025-03-10", "entries": [{"student": self.student.id}],
+        }, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("discipline", response.data)
+        self.assertFalse(Discipline.objects.filter(name="Quimica").exists())
+
+    def test_only_admins_register_disciplines(self):
+        self.client.force_authenticate(self.professor)
+        self.assertEqual(self.client.post("/api/disciplines/", {"name": "Biologia"}, format="json").status_code, 403)
+        self.client.force_authenticate(self.admin)
+        self.assertEqual(self.client.post("/api/disciplines/", {"name": "Biologia"}, format="json").status_code, 201)
+        self.assertEqual(self.client.post("/api/disciplines/", {"name": "Biologia"}, format="json").status_code, 400)
+        self.client.force_authenticate(self.professor)
+        response = self.client.post("/api/absences/bulk-create/", {
+            "discipline": "Biologia", "date": "2025-03-10", "entries": [{"student": self.student.id}],
+        }, format="json")
+        self.assertEqual(response.status_code, 201, response.data)
+
+    def test_groups_visible_to_members(self):
+        self.client.force_authenticate(self.student)
+        self.assertEqual(self.client.get("/api/class-groups/").data, [])
+        self.client.force_authenticate(self.professor)
+        response = self.client.get("/api/class-groups/", {"discipline": "Química"})
+        self.assertEqual([row["id"] for row in response.data], [self.group_id])
+
+
+class LoginTests(APITestCase):
+    def login(self, username, password="senha-segura-123"):
+        return self.client.post("/api/auth/login/", {"username": username, "password": password}, format="json")
+
+    def test_login_validates_once_and_returns_user_data(self):
+        with self.assertNumQueries(1):
+            response = self.login("professor")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["user_id"], self.professor.id)
+        self.assertEqual(response.data["role"], "professor")
+        self.assertEqual(response.data["email"], "professor@example.com")
+        claims = AccessToken(response.data["access"])
+        self.assertEqual((claims["role"], claims["username"]), ("professor", "professor"))
+
+    def test_wrong_password(self):
+        self.assertEqual(self.login("professor", "errada").status_code, 401)
+
+    def test_requests_are_authorized_from_token_claims(self):
+        access = self.login("professor").data["access"]
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        self.assertEqual(self.client.get("/api/students/").status_code, 200)
+        # Resposta em cache: nenhuma consulta, nem mesmo para carregar o usuário
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get("/api/students/").status_code, 200)
+
+    def test_token_role_is_enforced(self):
+        access = self.login("aluno").data["access"]
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        self.assertEqual(self.client.get("/api/students/").status_code, 403)
+
+    def test_tokens_without_role_are_rejected(self):
+        # Emitido pelo RefreshToken padrão, como os tokens anteriores às claims
+        access = str(RefreshToken.for_user(self.student).access_token)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        for url in ("/api/absences/", "/api/absence-summaries/", "/api/absences/search/?q=mat"):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 401)
+        response = async_to_sync(self.async_client.get)(
+            "/api/async/absences/", headers={"Authorization": f"Bearer {access}"},
+        )
+        self.assertEqual(response.status_code, 401)
+
+    def test_refresh_reads_role_from_database(self):
+        refresh = str(RefreshToken.for_user(self.student))  # sem claims, como os refresh tokens antigos
+        self.student.role = "professor"
+        self.student.save()
+        response = self.client.post("/api/token/refresh/", {"refresh": refresh}, format="json")
+        self.assertEqual(response.status_code, 200, response.data)
+        claims = AccessToken(response.data["access"])
+        self.assertEqual((claims["role"], claims["username"]), ("professor", "aluno"))
+
+
+@override_settings(API_THROTTLE_RATES={"login": "2/min", "login-username": "3/min", "polling": "2/min"})
+class ThrottleTests(APITestCase):
+    def login(self, username="professor", password="senha-segura-123", ip="10.0.0.1"):
+        return self.client.post(
+            "/api/auth/login/", {"username": username, "password": password}, format="json", REMOTE_ADDR=ip,
+        )
+
+    def test_login_limited_per_ip_before_checking_password(self):
+        self.assertEqual(self.login(password="errada").status_code, 401)
+        self.assertEqual(self.login().status_code, 200)
+        with mock.patch("django.contrib.auth.hashers.MD5PasswordHasher.verify") as verify:
+            with self.assertNumQueries(0):
+                response = self.login()
+        verify.assert_not_called()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "30")
+        # Outro IP, outra conta: baldes separados
+        self.assertEqual(self.login("aluno", ip="10.0.0.2").status_code, 200)
+
+    def test_login_limited_per_username_across_ips(self):
+        for ip in ("10.0.0.1", "10.0.0.2", "10.0.0.3"):
+            self.assertEqual(self.login("Professor", "errada", ip=ip).status_code, 401)
+        self.assertEqual(self.login(ip="10.0.0.4").status_code, 429)
+        self.assertEqual(self.login("aluno", ip="10.0.0.4").status_code, 200)
+
+    def test_bucket_refills_over_time(self):
+        with mock.patch("api.throttles.time.time", return_value=1000.0):
+            self.login()
+            self.login()
+            self.assertEqual(self.login().status_code, 429)
+        with mock.patch("api.throttles.time.time", return_value=1030.0):
+            self.assertEqual(self.login().status_code, 200)
+            self.assertEqual(self.login().status_code, 429)
+
+    def test_polling_lists_limited_per_user(self):
+        self.client.force_authenticate(self.student)
+        for _ in range(2):
+            self.assertEqual(self.client.get("/api/absences/").status_code, 200)
+        response = self.client.get("/api/forgiveness-requests/")
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+        # Outras rotas não são limitadas, e cada usuário tem o seu balde
+        self.assertEqual(self.client.get("/api/class-groups/").status_code, 200)
+        self.client.force_authenticate(self.professor)
+        self.assertEqual(self.client.get("/api/absences/").status_code, 200)
+
+    def test_async_lists_share_the_polling_limit(self):
+        token = CustomTokenObtainPairSerializer.get_token(self.student).access_token
+        headers = {"Authorization": f"Bearer {token}"}
+        self.client.force_authenticate(self.student)
+        self.client.get("/api/absences/")
+        self.assertEqual(async_to_sync(self.async_client.get)("/api/async/absences/", headers=headers).status_code, 200)
+        response = async_to_sync(self.async_client.get)("/api/async/forgiveness-requests/", headers=headers)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "30")
+
+    @override_settings(API_THROTTLE_RATES={})
+    def test_disabled(self):
+        for _ in range(5):
+            self.assertEqual(self.login().status_code, 200)
+
+
+class LoadSheddingTests(TestCase):
+    def test_sheds_requests_above_concurrency_limit(self):
+        responses = []
+
+        def view(request):
+            # Uma segunda requisição chega enquanto esta ainda está em andamento
+            responses.append(middleware(request))
+            return HttpResponse("ok")
+
+        middleware = LoadSheddingMiddleware(view)
+        request = APIRequestFactory().get("/api/absences/")
+        with override_settings(API_MAX_CONCURRENT_REQUESTS=1):
+            self.assertEqual(middleware(request).status_code, 200)
+        self.assertEqual(responses[0].status_code, 503)
+        self.assertEqual(responses[0]["Retry-After"], "1")
+        self.assertEqual(middleware.in_flight, 0)
+
+        # Com duas vagas a segunda requisição é atendida e a terceira, recusada
+        with override_settings(API_MAX_CONCURRENT_REQUESTS=2):
+            middleware(request)
+        self.assertEqual([response.status_code for response in responses[1:]], [503, 200])
+        self.assertEqual(middleware.in_flight, 0)
+
+
+class ExportTests(APITestCase):
+    def export(self, url, params=None):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_absences_csv_with_filters(self):
+        create_absence(self.student, discipline="Física", date=date(2025, 3, 5))
+        create_absence(self.student, discipline="Física", date=date(2025, 6, 5))
+        create_absence(self.student, discipline="Química", date=date(2025, 3, 6))
+        content = self.export("/api/exports/absences.csv", {"discipline": "Física", "date_to": "2025-03-31"})
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["student__username"], "aluno")
+        self.assertEqual(rows[0]["date"], "2025-03-05")
+
+    def test_forgiveness_requests_ndjson(self):
+        create_forgiveness_request(create_absence(self.student, discipline="Física"), status="APPROVED")
+        create_forgiveness_request(create_absence(self.student, discipline="Química"))
+        content = self.export("/api/exports/forgiveness-requests.ndjson", {"discipline": "Física"})
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([(r["absence__discipline__name"], r["status"]) for r in rows], [("Física", "APPROVED")])
+
+    def test_rows_are_read_in_bounded_batches(self):
+        for _ in range(5):
+            create_absence(self.student)
+        rows = exports.iter_rows(Absence.objects.all(), ("id",), chunk_size=2)
+        with self.assertNumQueries(3):
+            ids = [row[0] for row in rows]
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(len(ids), 5)
+
+    def test_asgi_exports_stream_batches(self):
+        for _ in range(3):
+            create_absence(self.student, discipline="Física")
+        token = CustomTokenObtainPairSerializer.get_token(self.admin).access_token
+        with mock.patch("api.exports.aiter_batches", partial(exports.aiter_batches, chunk_size=2)):
+            response = async_to_sync(self.async_client.get)(
+                "/api/exports/absences.csv", headers={"Authorization": f"Bearer {token}"}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+
+        async def collect():
+            return [chunk async for chunk in response.streaming_content]
+
+        chunks = async_to_sync(collect)()
+        # Cabeçalho e um pedaço por lote de duas linhas
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(len(list(csv.DictReader(io.StringIO(b"".join(chunks).decode())))), 3)
+
+    def test_only_admins_can_export(self):
+        self.client.force_authenticate(self.professor)
+        self.assertEqual(self.client.get("/api/exports/absences.csv").status_code, 403)
+
+    def test_unknown_format(self):
+        self.client.force_authenticate(self.admin)
+        self.assertEqual(self.client.get("/api/exports/absences.xlsx").status_code, 400)
+
+
+@override_settings(JUSTIFICATION_CHUNK_SIZE=8, JUSTIFICATION_MAX_SIZE=64)
+class JustificationUploadTests(APITestCase):
+    content = b"%PDF-1.4 atestado medico"  # 24 bytes: três partes de 8
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.student)
+
+    def start(self, content=None, **overrides):
+        payload = {"filename": "atestado.pdf", "content_type": "application/pdf", "size": len(content or self.content)}
+        payload.update(overrides)
+        return self.client.post("/api/justification-uploads/", payload, format="json")
+
+    def send(self, upload_id, start, data, total=None):
+        end = start + len(data) - 1
+        return self.client.put(
+            f"/api/justification-uploads/{upload_id}/",
+            data,
+            content_type="application/octet-stream",
+            HTTP_CONTENT_RANGE=f"bytes {start}-{end}/{total or len(self.content)}",
+        )
+
+    def upload(self, content=None):
+        content = content or self.content
+        upload_id = self.start(content).data["id"]
+        for start in range(0, len(content), 8):
+            response = self.send(upload_id, start, content[start:start + 8], total=len(content))
+        self.assertTrue(response.data["complete"], response.data)
+        return upload_id
+
+    def test_limits_are_checked_before_the_body(self):
+        self.assertEqual(self.start(size=65).status_code, 400)
+        self.assertEqual(self.start(content_type="application/zip").status_code, 400)
+
+    def test_chunks_resume_from_received_offset(self):
+        upload_id = self.start().data["id"]
+        self.assertEqual(self.send(upload_id, 0, self.content[:8]).status_code, 200)
+        response = self.send(upload_id, 16, self.content[16:])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data["received_bytes"], 8)
+        status = self.client.get(f"/api/justification-uploads/{upload_id}/").data
+        self.assertEqual((status["received_bytes"], status["complete"]), (8, False))
+        self.send(upload_id, 8, self.content[8:16])
+        self.assertTrue(self.send(upload_id, 16, self.content[16:]).data["complete"])
+
+    def test_oversized_chunk_and_wrong_signature_are_rejected(self):
+        upload_id = self.start().data["id"]
+        self.assertEqual(self.send(upload_id, 0, self.content[:16]).status_code, 400)
+        self.assertEqual(self.send(upload_id, 0, b"PK\x03\x04abcd").status_code, 400)
+
+    def test_malformed_content_length_is_rejected(self):
+        upload_id = self.start().data["id"]
+        response = self.client.put(
+            f"/api/justification-uploads/{upload_id}/",
+            self.content[:8],
+            content_type="application/octet-stream",
+            HTTP_CONTENT_RANGE=f"bytes 0-7/{len(self.content)}",
+            CONTENT_LENGTH="oito",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Content-Length", response.data)
+
+    def test_abandoned_uploads_are_purged(self):
+        abandoned, recent = self.start().data["id"], self.start().data["id"]
+        for upload_id in (abandoned, recent):
+            self.send(upload_id, 0, self.content[:8])
+        orphan = os.path.join(TEST_MEDIA_ROOT, "uploads", "apagado.part")
+        with open(orphan, "wb") as partial:
+            partial.write(b"%PDF")
+        old = timezone.now() - timedelta(days=3)
+        JustificationUpload.objects.filter(pk=abandoned).update(updated_at=old)
+        for name in (f"{abandoned}.part", "apagado.part"):
+            os.utime(os.path.join(TEST_MEDIA_ROOT, "uploads", name), (old.timestamp(), old.timestamp()))
+
+        self.assertEqual(uploads.purge_abandoned(), 1)
+        self.assertEqual([str(pk) for pk in JustificationUpload.objects.values_list("pk", flat=True)], [recent])
+        remaining = os.listdir(os.path.join(TEST_MEDIA_ROOT, "uploads"))
+        self.assertIn(f"{recent}.part", remaining)
+        self.assertNotIn(f"{abandoned}.part", remaining)
+        self.assertNotIn("apagado.part", remaining)
+
+    def test_same_content_is_stored_once(self):
+        first, second = self.upload(), self.upload()
+        legacy = SimpleUploadedFile("copia.pdf", self.content)
+        for upload_id in (first, second):
+            absence = create_absence(self.student)
+            response = self.client.post("/api/forgiveness-requests/create/", {"absence": absence.id, "upload": upload_id})
+            self.assertEqual(response.status_code, 201, response.data)
+        response = self.client.post(
+            "/api/forgiveness-requests/create/", {"absence": create_absence(self.student).id, "justification_file": legacy},
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(JustificationFile.objects.count(), 1)
+        names = set(ForgivenessRequest.objects.values_list("justification_file", flat=True))
+        self.assertEqual(names, {JustificationFile.objects.get().file.name})
+
+    def test_upload_of_another_student_cannot_be_used(self):
+        upload_id = self.upload()
+        other = create_user("outro", "student")
+        self.client.force_authenticate(other)
+        response = self.client.post(
+            "/api/forgiveness-requests/create/", {"absence": create_absence(other).id, "upload": upload_id},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(f"/api/justification-uploads/{upload_id}/").status_code, 404)
+
+    def test_upload_flow_with_jwt(self):
+        # O usuário do JWT tem o pk como texto, diferente do force_authenticate
+        self.client.force_authenticate(None)
+        token = CustomTokenObtainPairSerializer.get_token(self.student).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        upload_id = self.upload()
+        response = self.client.post(
+            "/api/forgiveness-requests/create/", {"absence": create_absence(self.student).id, "upload": upload_id},
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+
+
+class BackgroundJobTests(APITestCase):
+    def test_uploaded_file_is_processed_by_the_worker(self):
+        self.client.force_authenticate(self.student)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/forgiveness-requests/create/", {
+                "absence": create_absence(self.student).id,
+                "justification_file": SimpleUploadedFile("atestado.pdf", b"%PDF-1.4 atestado"),
+            })
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNone(response.data["justification_preview"]["processed_at"])
+
+        job = Job.objects.get()
+        self.assertEqual((job.kind, job.status), ("justification_preview", "PENDING"))
+        self.assertTrue(jobs.run_next())
+        self.assertFalse(jobs.run_next())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("DONE", 1))
+
+        listing = self.client.get("/api/forgiveness-requests/").data["results"]
+        self.assertIsNotNone(listing[0]["justification_preview"]["processed_at"])
+
+    def test_failed_job_is_retried_then_marked_failed(self):
+        calls = []
+
+        @jobs.register("test_failure")
+        def fail(**payload):
+            calls.append(payload)
+            raise RuntimeError("falhou")
+
+        try:
+            job = Job.objects.create(kind="test_failure", payload={"n": 1})
+            for attempt in range(1, jobs.MAX_ATTEMPTS + 1):
+                Job.objects.filter(pk=job.pk).update(run_after=job.created_at)
+                with self.assertLogs("api.jobs", level="ERROR"):
+                    self.assertTrue(jobs.run_next())
+                job.refresh_from_db()
+                self.assertEqual(job.attempts, attempt)
+            self.assertEqual(job.status, "FAILED")
+            self.assertIn("RuntimeError", job.last_error)
+            self.assertEqual(len(calls), jobs.MAX_ATTEMPTS)
+        finally:
+            jobs.HANDLERS.pop("test_failure")
+
+    def test_stale_running_job_is_reclaimed(self):
+        from django.utils import timezone
+
+        job = Job.objects.create(
+            kind="justification_preview", payload={"file_id": 0},
+            status="RUNNING", locked_at=timezone.now() - jobs.LOCK_TIMEOUT * 2,
+        )
+        self.assertTrue(jobs.run_next())
+        job.refresh_from_db()
+        self.assertEqual(job.status, "DONE")
+
+
+class AnnotatedAbsenceListTests(APITestCase):
+    params = {"include_requests": "true"}
+
+    def test_request_status_is_annotated_in_constant_queries(self):
+        def add_row():
+            absence = create_absence(self.student)
+            create_forgiveness_request(absence, status="REJECTED")
+            create_forgiveness_request(absence)
+
+        self.assertConstantQueries(self.student, "/api/absences/", add_row, self.params)
+
+    def test_latest_request_and_pending_flag(self):
+        without_request = create_absence(self.student)
+        decided = create_absence(self.student)
+        create_forgiveness_request(decided, status="REJECTED")
+        latest = create_forgiveness_request(decided, status="APPROVED")
+
+        self.client.force_authenticate(self.student)
+        rows = {row["id"]: row for row in self.client.get("/api/absences/", self.params).data["results"]}
+        self.assertEqual(
+            (rows[decided.id]["forgiveness_request_id"], rows[decided.id]["forgiveness_request_status"]),
+            (latest.id, "APPROVED"),
+        )
+        self.assertTrue(rows[decided.id]["has_forgiveness_request"])
+        self.assertFalse(rows[decided.id]["has_pending_request"])
+        self.assertFalse(rows[without_request.id]["has_forgiveness_request"])
+        self.assertIsNone(rows[without_request.id]["forgiveness_request_status"])
+
+    def test_new_request_refreshes_cached_annotation(self):
+        absence = create_absence(self.student)
+        self.client.force_authenticate(self.student)
+        first = self.client.get("/api/absences/", self.params)
+        self.assertFalse(first.data["results"][0]["has_pending_request"])
+        create_forgiveness_request(absence)
+        second = self.client.get("/api/absences/", self.params, headers={"If-None-Match": first["ETag"]})
+        self.assertEqual(second.status_code, 200)
+        self.assertTrue(second.data["results"][0]["has_pending_request"])
+
+    def test_plain_listing_is_unchanged(self):
+        create_absence(self.student)
+        self.client.force_authenticate(self.student)
+        row = self.client.get("/api/absences/").data["results"][0]
+        self.assertNotIn("has_forgiveness_request", row)
+
+
+class AbsenceSummaryTests(APITestCase):
+    def summary(self, student=None, discipline="Matemática", term="2025-1"):
+        return AbsenceSummary.objects.get(student=student or self.student, discipline__name=discipline, term=term)
+
+    def test_counters_follow_absences_and_request_transitions(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            create_absence(self.student, is_absent=False)
+            absence = create_absence(self.student)
+        self.assertEqual(
+            (self.summary().total_classes, self.summary().absences, self.summary().pending), (2, 1, 0)
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            request = create_forgiveness_request(absence)
+        self.assertEqual(self.summary().pending, 1)
+        request.status = "APPROVED"
+        with self.captureOnCommitCallbacks(execute=True):
+            request.save()
+        summary = self.summary()
+        self.assertEqual((summary.pending, summary.forgiven, summary.unexcused), (0, 1, 0))
+        self.assertEqual(summary.attendance_rate, 1.0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            request.delete()
+        self.assertEqual((self.summary().forgiven, self.summary().attendance_rate), (0, 0.5))
+
+    def test_moving_an_absence_updates_both_cells(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            absence = create_absence(self.student)
+        absence.discipline = discipline("Física")
+        absence.date = date(2025, 8, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            absence.save()
+        self.assertFalse(AbsenceSummary.objects.filter(discipline__name="Matemática").exists())
+        self.assertEqual(self.summary(discipline="Física", term="2025-2").absences, 1)
+
+    def test_roll_call_updates_summaries(self):
+        self.client.force_authenticate(self.professor)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/api/absences/bulk-create/", {
+                "discipline": "História", "date": "2025-03-10",
+                "entries": [{"student": self.student.id, "is_absent": True}],
+            }, format="json")
+            # Os contadores só são recalculados depois do commit
+            self.assertFalse(AbsenceSummary.objects.exists())
+        self.assertEqual(self.summary(discipline="História").absences, 1)
+
+    def test_rebuild_matches_incremental_counters(self):
+        other = create_user("outro", "student")
+        with self.captureOnCommitCallbacks(execute=True):
+            create_absence(self.student)
+            create_forgiveness_request(create_absence(other, date=date(2024, 10, 1)), status="APPROVED")
+        expected = sorted(AbsenceSummary.objects.values_list("student", "discipline", "term", "absences", "forgiven"))
+        call_command("rebuild_absence_summaries", stdout=io.StringIO())
+        self.assertEqual(
+            sorted(AbsenceSummary.objects.values_list("student", "discipline", "term", "absences", "forgiven")), expected,
+        )
+
+    def test_summaries_are_paginated(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for month in (3, 8):
+                for name in ("Matemática", "Física", "Química"):
+                    create_absence(self.student, discipline=name, date=date(2025, month, 10))
+        self.client.force_authenticate(self.professor)
+        seen, url, params = [], "/api/absence-summaries/", {"page_size": 4}
+        while url:
+            page = self.client.get(url, params).data
+            seen += [(row["term"], row["discipline"]) for row in page["results"]]
+            url, params = page["next"], None
+        self.assertEqual(seen, list(AbsenceSummary.objects.order_by("term", "id").values_list("term", "discipline__name")))
+        self.assertEqual(len(seen), 6)
+        self.assertEqual(self.client.get("/api/absence-summaries/", {"cursor": "x"}).status_code, 404)
+
+    def test_upsert_without_conflict_target(self):
+        # Como no MySQL: sem alvo do conflito, o ON DUPLICATE KEY UPDATE vale para a restrição única
+        original = connection.ops.on_conflict_suffix_sql
+
+        def on_duplicate_key_update(fields, on_conflict, update_fields, unique_fields):
+            if on_conflict is None:
+                return original(fields, on_conflict, update_fields, unique_fields)
+            self.assertEqual(list(unique_fields), [])
+            updates = ", ".join(f"{field} = excluded.{field}" for field in map(connection.ops.quote_name, update_fields))
+            return f"ON CONFLICT DO UPDATE SET {updates}"
+
+        with self.captureOnCommitCallbacks(execute=True):
+            absence = create_absence(self.student)
+        with mock.patch.object(connection.features, "supports_update_conflicts_with_target", False), \
+                mock.patch.object(connection.ops, "on_conflict_suffix_sql", on_duplicate_key_update), \
+                self.captureOnCommitCallbacks(execute=True):
+            create_absence(self.student, date=date(2025, 3, 11))
+            absence.is_absent = False
+            absence.save()
+        self.assertEqual((self.summary().total_classes, self.summary().absences), (2, 1))
+        self.assertEqual(AbsenceSummary.objects.count(), 1)
+
+    def test_students_only_read_their_summaries(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            create_absence(self.student)
+            create_absence(create_user("outro", "student"))
+        self.client.force_authenticate(self.student)
+        rows = self.client.get("/api/absence-summaries/").data["results"]
+        self.assertEqual([row["student_username"] for row in rows], ["aluno"])
+        self.client.force_authenticate(self.professor)
+        self.assertEqual(len(self.client.get("/api/absence-summaries/", {"term": "2025-1"}).data["results"]), 2)
+        self.assertEqual(self.client.get("/api/absence-summaries/", {"term": "2025"}).status_code, 400)
+
+
+class AsyncListTests(APITestCase):
+    def async_get(self, user, url, params=None):
+        headers = {}
+        if user is not None:
+            headers["Authorization"] = f"Bearer {CustomTokenObtainPairSerializer.get_token(user).access_token}"
+        return async_to_sync(self.async_client.get)(url, params or {}, headers=headers)
+
+    def sync_get(self, user, url, params=None):
+        self.client.force_authenticate(user)
+        return self.client.get(url, params or {})
+
+    def test_matches_sync_listings(self):
+        absence = create_absence(self.student)
+        create_absence(self.student, discipline="História")
+        create_forgiveness_request(absence)
+        cases = [
+            (self.student, "absences/", {}),
+            (self.student, "absences/", {"include_requests": "true", "discipline": "Matemática"}),
+            (self.professor, "forgiveness-requests/", {"status": "PENDING"}),
+            (self.admin, "students/", {}),
+        ]
+        for user, path, params in cases:
+            with self.subTest(path=path, params=params):
+                response = self.async_get(user, f"/api/async/{path}", params)
+                self.assertEqual(response.status_code, 200, response.content)
+                self.assertEqual(response.json(), self.sync_get(user, f"/api/{path}", params).json())
+
+    def test_keyset_pages(self):
+        for day in range(1, 4):
+            create_absence(self.student, date=date(2025, 3, day))
+        first = self.async_get(self.student, "/api/async/absences/", {"page_size": 2}).json()
+        self.assertEqual(len(first["results"]), 2)
+        second = self.async_get(self.student, first["next"]).json()
+        self.assertEqual(len(second["results"]), 1)
+        self.assertIsNone(second["next"])
+
+    def test_role_scoping_and_errors(self):
+        create_absence(self.professor)
+        self.assertEqual(self.async_get(self.student, "/api/async/absences/").json()["results"], [])
+        self.assertEqual(self.async_get(None, "/api/async/absences/").status_code, 401)
+        self.assertEqual(self.async_get(self.student, "/api/async/students/").status_code, 403)
+        response = self.async_get(self.student, "/api/async/absences/", {"date": "ontem"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("date", response.json())
+
+
+    @override_settings(API_THROTTLE_RATES={"polling": "100/m"})
+    def test_cache_is_not_used_on_the_event_loop(self):
+        calls = []
+
+        def on_event_loop(method):
+            def wrapper(self, key, *args, **kwargs):
+                try:
+                    asyncio.get_running_loop()
+                    calls.append(key)
+                except RuntimeError:
+                    pass
+                return method(self, key, *args, **kwargs)
+            return wrapper
+
+        with mock.patch.object(LocMemCache, "get", on_event_loop(LocMemCache.get)), \
+                mock.patch.object(LocMemCache, "set", on_event_loop(LocMemCache.set)):
+            response = self.async_get(self.student, "/api/async/absences/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(calls, [])
+
+
+class FastSerializationTests(APITestCase):
+    """As linhas montadas do .values() e o orjson geram os mesmos bytes dos serializers do DRF"""
+
+    def setUp(self):
+        super().setUp()
+        stored = JustificationFile.objects.create(
+            content_hash="a" * 64, file="justifications/a.pdf", size=10, content_type="application/pdf",
+            preview="justifications/previews/a.png", text_excerpt="Atestado\u2028médico", processed_at=timezone.now(),
+        )
+        absence = create_absence(self.student, reason="Consulta médica")
+        create_forgiveness_request(absence, stored_file=stored, justification_file=stored.file.name, comments="ok")
+        create_forgiveness_request(create_absence(self.student, discipline="História", reason=""), status="APPROVED")
+        create_absence(self.student, date=date(2024, 3, 10), is_absent=False)
+        create_forgiveness_request(create_absence(self.student, date=date(2024, 4, 10)), status="REJECTED")
+        call_command("archive_terms", term=["2024-1"], stdout=io.StringIO())
+
+    def fetch(self, user, url, params):
+        cache.clear()
+        if url.startswith("/api/async/"):
+            token = CustomTokenObtainPairSerializer.get_token(user).access_token
+            response = async_to_sync(self.async_client.get)(url, params, headers={"Authorization": f"Bearer {token}"})
+        else:
+            self.client.force_authenticate(user)
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.content
+
+    def test_rows_match_drf_serializers(self):
+        cases = [
+            (self.admin, "/api/user/", {}),
+            (self.professor, "/api/students/", {}),
+            (self.professor, "/api/absences/", {"page_size": 2}),
+            (self.student, "/api/absences/", {"include_requests": "true"}),
+            (self.student, "/api/absences/", {"archived": "true", "include_requests": "true"}),
+            (self.professor, "/api/absences/check/", {}),
+            (self.admin, "/api/forgiveness-requests/", {}),
+            (self.student, "/api/forgiveness-requests/", {"archived": "true"}),
+            (self.professor, "/api/async/absences/", {"include_requests": "true"}),
+            (self.admin, "/api/async/forgiveness-requests/", {}),
+            (self.admin, "/api/async/students/", {}),
+        ]
+        for user, url, params in cases:
+            with self.subTest(url=url, params=params):
+                fast = self.fetch(user, url, params)
+                with override_settings(API_FAST_SERIALIZATION=False):
+                    self.assertEqual(fast, self.fetch(user, url, params))
+                if "forgiveness-requests" in url and not params:
+                    self.assertIn(b"Atestado\\u2028m", fast)
+
+    def test_keyset_cursor_from_rows(self):
+        self.client.force_authenticate(self.professor)
+        first = self.client.get("/api/absences/", {"page_size": 1}).json()
+        second = self.client.get(first["next"]).json()
+        self.assertNotEqual(first["results"][0]["id"], second["results"][0]["id"])
+
+
+@override_settings(EVENTS_STREAM_TIMEOUT=0, EVENTS_STREAM_ENABLED=True)
+class EventStreamTests(APITestCase):
+    def token(self, user):
+        return str(CustomTokenObtainPairSerializer.get_token(user).access_token)
+
+    def request_ticket(self, user):
+        async def post():
+            return await self.async_client.post(
+                "/api/events/ticket/", headers={"Authorization": f"Bearer {self.token(user)}"},
+            )
+
+        return async_to_sync(post)()
+
+    def read_stream(self, params=None, headers=None):
+        async def read():
+            response = await self.async_client.get("/api/events/stream/", params or {}, headers=headers or {})
+            if not response.streaming:
+                return response, ""
+            return response, "".join([chunk.decode() async for chunk in response.streaming_content])
+
+        return async_to_sync(read)()
+
+    def stream_ids(self, body):
+        return [int(line[4:]) for line in body.splitlines() if line.startswith("id: ")]
+
+    def test_status_change_notifies_student(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            absence = create_absence(self.student)
+            forgiveness_request = create_forgiveness_request(absence)
+        with self.captureOnCommitCallbacks(execute=True):
+            forgiveness_request.comments = "Atestado válido"
+            forgiveness_request.save()  # sem mudança de status
+            forgiveness_request.status = "APPROVED"
+            forgiveness_request.save()
+
+        kinds = list(Event.objects.filter(recipient=self.student).values_list("kind", flat=True).order_by("id"))
+        self.assertEqual(kinds, ["absence.created", "forgiveness_request.status"])
+        self.assertEqual(Event.objects.last().payload["status"], "APPROVED")
+
+    def test_roll_call_notifies_each_student(self):
+        other = create_user("outro", "student")
+        self.client.force_authenticate(self.professor)
+        payload = {
+            "discipline": "Física", "date": "2025-03-10",
+            "entries": [{"student": self.student.pk}, {"student": other.pk, "is_absent": False}],
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/absences/bulk-create/", payload, format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(
+            set(Event.objects.values_list("recipient_id", "kind")),
+            {(self.student.pk, "absence.created"), (other.pk, "absence.created")},
+        )
+
+    def test_resumes_after_last_event_id(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for day in range(1, 4):
+                create_absence(self.student, date=date(2025, 3, day))
+            create_absence(self.professor)
+        first, *rest = Event.objects.filter(recipient=self.student).order_by("id")
+
+        ticket = self.request_ticket(self.student).json()["ticket"]
+        response, body = self.read_stream({"ticket": ticket}, headers={"Last-Event-ID": str(first.pk)})
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertEqual(self.stream_ids(body), [event.pk for event in rest])
+        self.assertIn('"discipline": "Matem\\u00e1tica"', body)
+
+    def test_new_connection_skips_history(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            create_absence(self.student)
+        _, body = self.read_stream(headers={"Authorization": f"Bearer {self.token(self.student)}"})
+        self.assertEqual(self.stream_ids(body), [])
+
+    def test_requires_valid_ticket(self):
+        self.assertEqual(self.read_stream()[0].status_code, 401)
+        self.assertEqual(self.read_stream({"ticket": "invalido"})[0].status_code, 401)
+        self.assertEqual(self.read_stream({"access_token": self.token(self.student)})[0].status_code, 401)
+        ticket = self.request_ticket(self.student).json()["ticket"]
+        response, _ = self.read_stream({"ticket": ticket, "last_event_id": "x"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_ticket_is_single_use(self):
+        ticket = self.request_ticket(self.student).json()["ticket"]
+        self.assertEqual(self.read_stream({"ticket": ticket})[0].status_code, 200)
+        self.assertEqual(self.read_stream({"ticket": ticket})[0].status_code, 401)
+
+    def test_only_students_receive_tickets(self):
+        for user in (self.professor, self.admin):
+            self.assertEqual(self.request_ticket(user).status_code, 403)
+        headers = {"Authorization": f"Bearer {self.token(self.professor)}"}
+        self.assertEqual(self.read_stream(headers=headers)[0].status_code, 403)
+
+    def test_disabled_outside_asgi(self):
+        self.client.force_authenticate(self.student)
+        self.assertEqual(self.client.post("/api/events/ticket/").status_code, 404)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token(self.student)}")
+        self.assertEqual(self.client.get("/api/events/stream/").status_code, 404)
+        with override_settings(EVENTS_STREAM_ENABLED=False):
+            self.assertEqual(self.request_ticket(self.student).status_code, 404)
+
+
+class BatchReviewTests(APITestCase):
+    url = "/api/forgiveness-requests/batch-review/"
+
+    def pending_requests(self, count):
+        return [create_forgiveness_request(create_absence(self.student)) for _ in range(count)]
+
+    def review(self, decisions, user=None):
+        self.client.force_authenticate(user or self.professor)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(self.url, {"decisions": decisions}, format="json")
+
+    def test_per_id_outcomes(self):
+        approve, reject = self.pending_requests(2)
+        decided = create_forgiveness_request(create_absence(self.student), status="REJECTED")
+        response = self.review([
+            {"id": approve.pk, "status": "APPROVED", "comments": "Atestado ok"},
+            {"id": reject.pk, "status": "REJECTED"},
+            {"id": decided.pk, "status": "APPROVED"},
+            {"id": approve.pk, "status": "REJECTED"},
+            {"id": 999999, "status": "APPROVED"},
+        ])
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.data["updated"], 2)
+        self.assertEqual(
+            [result["outcome"] for result in response.data["results"]],
+            ["updated", "updated", "conflict", "duplicate", "not_found"],
+        )
+
+        approve.refresh_from_db()
+        decided.refresh_from_db()
+        self.assertEqual((approve.status, approve.comments), ("APPROVED", "Atestado ok"))
+        self.assertEqual(decided.status, "REJECTED")
+
+    def test_second_review_is_a_conflict(self):
+        request, = self.pending_requests(1)
+        self.review([{"id": request.pk, "status": "APPROVED"}])
+        response = self.review([{"id": request.pk, "status": "REJECTED"}])
+        self.assertEqual(response.data["results"][0]["outcome"], "conflict")
+        self.assertEqual(response.data["results"][0]["status"], "APPROVED")
+
+    def test_refreshes_summaries_cache_and_notifies(self):
+        requests = self.pending_requests(3)
+        self.client.force_authenticate(self.student)
+        before = self.client.get("/api/forgiveness-requests/").data["results"]
+        self.assertEqual({row["status"] for row in before}, {"PENDING"})
+
+        self.review([{"id": request.pk, "status": "APPROVED"} for request in requests])
+
+        self.client.force_authenticate(self.student)
+        after = self.client.get("/api/forgiveness-requests/").data["results"]
+        self.assertEqual({row["status"] for row in after}, {"APPROVED"})
+        summary = AbsenceSummary.objects.get(student=self.student, discipline__name="Matemática", term="2025-1")
+        self.assertEqual((summary.forgiven, summary.pending), (3, 0))
+        self.assertEqual(Event.objects.filter(recipient=self.student, kind="forgiveness_request.status").count(), 3)
+
+    def test_query_count_does_not_grow_with_batch(self):
+        def count(requests):
+            self.client.force_authenticate(self.professor)
+            decisions = [{"id": request.pk, "status": "APPROVED"} for request in requests]
+            with CaptureQueriesContext(connection) as context:
+                self.client.post(self.url, {"decisions": decisions}, format="json")
+            return len(context.captured_queries)
+
+        self.assertEqual(count(self.pending_requests(2)), count(self.pending_requests(20)))
+
+    def test_students_cannot_review(self):
+        request, = self.pending_requests(1)
+        response = self.review([{"id": request.pk, "status": "APPROVED"}], user=self.student)
+        self.assertEqual(response.status_code, 403)
+
+
+class ReplicaRoutingTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.router = ReplicaRouter()
+
+    def with_replica(self):
+        return mock.patch.dict(connections.settings, {"replica": connections.settings["default"]})
+
+    def read_alias(self, scope):
+        with replica_reads(scope):
+            return self.router.db_for_read(Absence)
+
+    def test_reads_primary_without_replica(self):
+        self.assertIsNone(self.read_alias("staff"))
+
+    def test_only_list_reads_use_replica(self):
+        with self.with_replica():
+            self.assertEqual(self.read_alias("staff"), "replica")
+            self.assertIsNone(self.router.db_for_read(Absence))
+            self.assertIsNone(self.router.db_for_write(Absence))
+            self.assertFalse(self.router.allow_migrate("replica", "api"))
+
+    @override_settings(DATABASE_REPLICA_LAG=5)
+    def test_recent_write_pins_affected_scopes_to_primary(self):
+        with self.with_replica():
+            create_absence(self.student)
+            self.assertIsNone(self.read_alias(f"user:{self.student.pk}"))
+            self.assertIsNone(self.read_alias("staff"))
+            self.assertEqual(self.read_alias("user:999999"), "replica")  # aluno sem escritas
+
+
+@override_settings(METRICS_SAMPLE_RATE=1.0, METRICS_TOKEN="segredo")
+class MetricsTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        metrics.reset()
+
+    def test_server_timing_reports_queries_and_serializer(self):
+        create_absence(self.student)
+        self.client.force_authenticate(self.student)
+        response = self.client.get("/api/absences/")
+        timing = response["Server-Timing"]
+        self.assertIn("app;dur=", timing)
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="[1-9]\d* consultas"')
+        self.assertIn("serializer;dur=", timing)
+
+    def test_records_per_route_totals(self):
+        for _ in range(3):
+            create_absence(self.student)
+        self.client.force_authenticate(self.student)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get("/api/absences/")
+        totals = metrics.snapshot()["absence-list"]
+        self.assertEqual(totals["requests"], 1)
+        self.assertEqual(totals["queries"], len(context.captured_queries))
+        self.assertEqual(totals["response_bytes"], len(response.content))
+        self.assertIsNotNone(metrics.quantile(totals, 0.95))
+
+    def test_async_views_are_measured(self):
+        create_absence(self.student)
+        token = CustomTokenObtainPairSerializer.get_token(self.student).access_token
+        response = async_to_sync(self.async_client.get)(
+            "/api/async/absences/", headers={"Authorization": f"Bearer {token}"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(metrics.snapshot()["async-absence-list"]["queries"], 0)
+
+    @override_settings(METRICS_FLUSH_INTERVAL=0)
+    def test_async_flush_runs_outside_the_event_loop(self):
+        in_event_loop = []
+        flush = metrics.registry.flush
+
+        def checked_flush():
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                in_event_loop.append(False)
+            else:
+                in_event_loop.append(True)
+            flush()
+
+        token = CustomTokenObtainPairSerializer.get_token(self.student).access_token
+        with mock.patch.object(metrics.registry, "flush", checked_flush):
+            async_to_sync(self.async_client.get)("/api/async/absences/", headers={"Authorization": f"Bearer {token}"})
+        self.assertEqual(in_event_loop, [False])
+        self.assertEqual(metrics.snapshot()["async-absence-list"]["requests"], 1)
+
+    def test_prometheus_endpoint(self):
+        self.client.force_authenticate(self.student)
+        self.client.get("/api/absences/")
+        self.client.force_authenticate(None)
+
+        self.assertEqual(self.client.get("/api/metrics/").status_code, 401)
+        response = self.client.get("/api/metrics/", headers={"X-Metrics-Token": "segredo"})
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('api_request_duration_seconds_count{route="absence-list"} 1', body)
+        self.assertIn('api_db_queries_total{route="absence-list"}', body)
+
+
+class BenchmarkSuiteTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.baseline = tempfile.mktemp(suffix=".json", dir=TEST_MEDIA_ROOT)
+        call_command(
+            "generate_dataset", students=20, professors=2, admins=1, absences=400, days=30, stdout=io.StringIO(),
+        )
+
+    def benchmark(self, **options):
+        output = io.StringIO()
+        call_command(
+            "benchmark_routes", only=["absence-list", "forgiveness-request-update"], iterations=2,
+            baseline=self.baseline, stdout=output, **options,
+        )
+        return output.getvalue()
+
+    def test_dataset_is_generated_in_bulk_and_reproducible(self):
+        synthetic = User.objects.filter(username__startswith="sint-")
+        self.assertEqual(synthetic.count(), 23)
+        self.assertEqual(Absence.objects.filter(student__in=synthetic).count(), 400)
+        self.assertEqual(AbsenceSummary.objects.count(), Absence.objects.values("student", "discipline").distinct().count())
+        self.assertEqual(SearchDocument.objects.count(), 400)
+        requests = list(ForgivenessRequest.objects.order_by("absence__date", "status").values_list("absence__date", "status"))
+
+        call_command(
+            "generate_dataset", students=20, professors=2, admins=1, absences=400, days=30, stdout=io.StringIO(),
+        )
+        self.assertEqual(synthetic.count(), 23)
+        self.assertEqual(ClassGroup.objects.count(), 12)
+        self.assertEqual(
+            list(ForgivenessRequest.objects.order_by("absence__date", "status").values_list("absence__date", "status")),
+            requests,
+        )
+
+    def test_writes_are_rolled_back(self):
+        pending = ForgivenessRequest.objects.filter(status="PENDING").count()
+        self.benchmark()
+        self.assertEqual(ForgivenessRequest.objects.filter(status="PENDING").count(), pending)
+
+    def test_query_regression_fails_against_baseline(self):
+        self.assertIn("Baseline gravado", self.benchmark(save_baseline=True))
+        self.assertIn("Nenhuma regressão", self.benchmark(tolerance=1000))
+
+        with open(self.baseline) as file:
+            baseline = json.load(file)
+        baseline["results"]["absence-list"]["queries"] -= 1
+        with open(self.baseline, "w") as file:
+            json.dump(baseline, file)
+        with self.assertRaisesMessage(CommandError, "absence-list"):
+            self.benchmark(tolerance=1000)
@@ -0,0 +1,155 @@
+import hashlib
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import JsonResponse
+from rest_framework.throttling import BaseThrottle
+
+from .cache import KEY_PREFIX, state_cache
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_rate(rate):
+    """"10/min" -> (10, 60); vazio ou None desliga o limite"""
+    if not rate:
+        return None
+    count, period = rate.split("/")
+    return int(count), PERIODS[period[0]]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Balde de fichas por cliente, guardado no cache compartilhado entre os processos
+
+    O rate "N/período" de API_THROTTLE_RATES[scope] define um balde de N
+    fichas que se repõe à razão de N por período: aceita rajadas de até N
+    requisições e depois uma a cada período/N segundos. A leitura e a
+    gravação não são atômicas, então requisições simultâneas podem gastar a
+    mesma ficha; o excesso é pequeno e não justifica um lock no cache.
+    Requisições recusadas não gravam nada.
+    """
+
+    scope = None
+
+    def __init__(self):
+        self.retry_after = None
+
+    def get_client_key(self, request, view):
+        """Identifica o cliente no balde; None isenta a requisição"""
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        rate = parse_rate(settings.API_THROTTLE_RATES.get(self.scope))
+        if rate is None:
+            return True
+        client = self.get_client_key(request, view)
+        if client is None:
+            return True
+
+        capacity, period = rate
+        key = f"{KEY_PREFIX}:throttle:{self.scope}:{client}"
+        now = time.time()
+        tokens, updated = state_cache.get(key) or (capacity, now)
+        tokens = min(capacity, tokens + (now - updated) * capacity / period)
+        if tokens < 1:
+            self.retry_after = (1 - tokens) * period / capacity
+            return False
+        # Depois de um período sem requisições o balde está cheio de novo, então a chave pode expirar
+        state_cache.set(key, (tokens - 1, now), timeout=period)
+        return True
+
+    def wait(self):
+        return self.retry_after
+
+
+class LoginRateThrottle(TokenBucketThrottle):
+    """Tentativas de login por IP, verificadas antes do hash da senha"""
+
+    scope = "login"
+
+    def get_client_key(self, request, view):
+        return self.get_ident(request)
+
+
+class LoginUsernameThrottle(TokenBucketThrottle):
+    """Tentativas de login por conta, contra ataques distribuídos entre vários IPs"""
+
+    scope = "login-username"
+
+    def get_client_key(self, request, view):
+        username = request.data.get("username") if hasattr(request.data, "get") else None
+        if not isinstance(username, str) or not username:
+            return None
+        return hashlib.sha1(username.lower().encode()).hexdigest()
+
+
+class PollingRateThrottle(TokenBucketThrottle):
+    """Listagens consultadas periodicamente pelo frontend, por usuário (ou IP, sem token)
+
+    O usuário vem das claims do JWT, então a verificação não consulta o banco.
+    """
+
+    scope = "polling"
+
+    def get_client_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return f"user:{request.user.pk}"
+        return self.get_ident(request)
+
+
+class LoadSheddingMiddleware:
+    """Responde 503 quando o processo já tem API_MAX_CONCURRENT_REQUESTS requisições em andamento
+
+    As requisições além do limite esperariam na fila de threads (ou do
+    event loop) do servidor e estourariam o tempo do cliente de qualquer
+    jeito; recusá-las logo deixa o processo terminar as que já aceitou. A
+    contagem vai até a view devolver a resposta, então os streams de
+    eventos e as exportações não ocupam vaga enquanto transmitem.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enter():
+            return self.overloaded()
+        try:
+            return self.get_response(request)
+        finally:
+            self.leave()
+
+    async def __acall__(self, request):
+        if not self.enter():
+            return self.overloaded()
+        try:
+            return await self.get_response(request)
+        finally:
+            self.leave()
+
+    def enter(self):
+        limit = settings.API_MAX_CONCURRENT_REQUESTS
+        with self.lock:
+            if limit and self.in_flight >= limit:
+                return False
+            self.in_flight += 1
+            return True
+
+    def leave(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def overloaded(self):
+        response = JsonResponse({"detail": "Servidor sobrecarregado, tente novamente em instantes."}, status=503)
+        response["Retry-After"] = str(settings.API_SHED_RETRY_AFTER)
+        return response
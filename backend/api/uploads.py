@@ -0,0 +1,225 @@
+import hashlib
+import os
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .models import JustificationFile, JustificationUpload
+
+READ_SIZE = 64 * 1024
+
+SIGNATURES = {
+    "application/pdf": (b"%PDF-",),
+    "image/jpeg": (b"\xff\xd8\xff",),
+    "image/png": (b"\x89PNG\r\n\x1a\n",),
+}
+
+EXTENSIONS = {
+    "application/pdf": ".pdf",
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+}
+
+CONTENT_RANGE = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+
+
+class UploadConflict(Exception):
+    """A parte recebida não começa onde o envio parou"""
+
+    def __init__(self, received_bytes):
+        super().__init__(received_bytes)
+        self.received_bytes = received_bytes
+
+
+class ContentHasher:
+    """Hash de conteúdo calculado em blocos de tamanho fixo, enquanto os dados chegam
+
+    O resultado é o sha256 da sequência dos sha256 de cada bloco. Como o
+    tamanho do bloco é fixo, o mesmo arquivo gera o mesmo hash tanto enviado
+    em partes quanto de uma só vez, e o estado entre requisições é só a
+    lista de hashes dos blocos já recebidos.
+    """
+
+    def __init__(self, chunk_hashes=""):
+        self.chunk_hashes = chunk_hashes
+        self.block = hashlib.sha256()
+        self.block_size = 0
+
+    def update(self, data):
+        chunk_size = settings.JUSTIFICATION_CHUNK_SIZE
+        while data:
+            piece = data[: chunk_size - self.block_size]
+            data = data[len(piece):]
+            self.block.update(piece)
+            self.block_size += len(piece)
+            if self.block_size == chunk_size:
+                self.close_block()
+
+    def close_block(self):
+        if self.block_size:
+            self.chunk_hashes += self.block.hexdigest()
+            self.block = hashlib.sha256()
+            self.block_size = 0
+
+    def hexdigest(self):
+        self.close_block()
+        return hashlib.sha256(self.chunk_hashes.encode()).hexdigest()
+
+
+def validate_declared(content_type, size):
+    """Valida tipo e tamanho declarados, antes de qualquer byte do arquivo"""
+    if content_type not in settings.JUSTIFICATION_CONTENT_TYPES:
+        raise ValidationError({"content_type": "Tipo de arquivo não permitido. Envie PDF, JPEG ou PNG."})
+    if size <= 0 or size > settings.JUSTIFICATION_MAX_SIZE:
+        raise ValidationError({"size": f"O arquivo deve ter no máximo {settings.JUSTIFICATION_MAX_SIZE} bytes."})
+
+
+def validate_signature(content_type, head):
+    if not head.startswith(SIGNATURES[content_type]):
+        raise ValidationError({"content_type": "O conteúdo do arquivo não corresponde ao tipo informado."})
+
+
+def sniff_content_type(head):
+    for content_type, signatures in SIGNATURES.items():
+        if head.startswith(signatures):
+            return content_type
+    return None
+
+
+def partial_path(upload):
+    path = default_storage.path(f"uploads/{upload.pk}.part")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def parse_content_length(header):
+    """Tamanho declarado do corpo; ausente vale 0"""
+    if not header:
+        return 0
+    if not header.isdigit():
+        raise ValidationError({"Content-Length": "Cabeçalho inválido."})
+    return int(header)
+
+
+def parse_content_range(header, upload):
+    """Lê o Content-Range da parte e confere os limites sem tocar no corpo"""
+    match = CONTENT_RANGE.match(header or "")
+    if not match:
+        raise ValidationError({"Content-Range": "Cabeçalho ausente ou inválido, use 'bytes início-fim/total'."})
+    start, end, total = (int(value) for value in match.groups())
+    length = end - start + 1
+
+    if total != upload.size or end >= upload.size or length <= 0:
+        raise ValidationError({"Content-Range": "Intervalo fora do tamanho declarado do arquivo."})
+    if length > settings.JUSTIFICATION_CHUNK_SIZE:
+        raise ValidationError({"Content-Range": f"Cada parte deve ter no máximo {settings.JUSTIFICATION_CHUNK_SIZE} bytes."})
+    if end + 1 != upload.size and length != settings.JUSTIFICATION_CHUNK_SIZE:
+        raise ValidationError({"Content-Range": "Somente a última parte pode ser menor que o tamanho de parte."})
+    if start != upload.received_bytes:
+        raise UploadConflict(upload.received_bytes)
+    return start, length
+
+
+def receive_chunk(upload, stream, content_range, content_length):
+    """Grava uma parte no arquivo parcial lendo o corpo em pedaços pequenos
+
+    O upload deve estar travado (select_for_update) pela transação atual.
+    Retorna o arquivo armazenado quando esta foi a última parte.
+    """
+    start, length = parse_content_range(content_range, upload)
+    if parse_content_length(content_length) != length:
+        raise ValidationError({"Content-Length": "O tamanho do corpo não corresponde ao Content-Range."})
+
+    hasher = ContentHasher()
+    path = partial_path(upload)
+    received = 0
+    with open(path, "r+b" if start else "wb") as partial:
+        partial.seek(start)
+        partial.truncate()
+        while received < length:
+            data = stream.read(min(READ_SIZE, length - received))
+            if not data:
+                break
+            if received == 0 and start == 0:
+                validate_signature(upload.content_type, data)
+            hasher.update(data)
+            partial.write(data)
+            received += len(data)
+
+    if received != length:
+        raise ValidationError({"Content-Length": "O corpo da requisição terminou antes do esperado."})
+
+    hasher.close_block()
+    upload.chunk_hashes += hasher.chunk_hashes
+    upload.received_bytes += length
+    if upload.received_bytes == upload.size:
+        with open(path, "rb") as partial:
+            upload.stored_file = store(File(partial), upload.content_type, ContentHasher(upload.chunk_hashes).hexdigest())
+        os.remove(path)
+    upload.save(update_fields=["chunk_hashes", "received_bytes", "stored_file", "updated_at"])
+    return upload.stored_file
+
+
+def store(file, content_type, content_hash):
+    """Devolve o arquivo com esse conteúdo, gravando-o somente se ainda não existir"""
+    existing = JustificationFile.objects.filter(content_hash=content_hash).first()
+    if existing:
+        return existing
+
+    name = default_storage.save(f"justifications/{content_hash}{EXTENSIONS[content_type]}", file)
+    try:
+        with transaction.atomic():
+            return JustificationFile.objects.create(
+                content_hash=content_hash, file=name, size=file.size, content_type=content_type,
+            )
+    except IntegrityError:
+        # Outro envio do mesmo conteúdo terminou primeiro
+        default_storage.delete(name)
+        return JustificationFile.objects.get(content_hash=content_hash)
+
+
+def store_uploaded_file(uploaded_file):
+    """Valida e deduplica um arquivo enviado inteiro via multipart"""
+    head = uploaded_file.read(16)
+    uploaded_file.seek(0)
+    content_type = sniff_content_type(head)
+    if content_type is None:
+        raise ValidationError({"justification_file": "Tipo de arquivo não permitido. Envie PDF, JPEG ou PNG."})
+    validate_declared(content_type, uploaded_file.size)
+
+    hasher = ContentHasher()
+    for chunk in uploaded_file.chunks(READ_SIZE):
+        hasher.update(chunk)
+    uploaded_file.seek(0)
+    return store(uploaded_file, content_type, hasher.hexdigest())
+
+
+def purge_abandoned(older_than=None):
+    """Remove envios incompletos parados há mais que a retenção e seus arquivos .part
+
+    Arquivos .part antigos sem envio correspondente (de envios já apagados)
+    também são removidos.
+    """
+    older_than = older_than or timedelta(days=settings.JUSTIFICATION_UPLOAD_RETENTION_DAYS)
+    cutoff = timezone.now() - older_than
+    purged = JustificationUpload.objects.filter(stored_file__isnull=True, updated_at__lt=cutoff).delete()[0]
+
+    directory = default_storage.path("uploads")
+    if not os.path.isdir(directory):
+        return purged
+    active = {
+        str(pk) for pk in JustificationUpload.objects.filter(stored_file__isnull=True).values_list("pk", flat=True)
+    }
+    for entry in os.scandir(directory):
+        name, extension = os.path.splitext(entry.name)
+        if extension != ".part" or name in active:
+            continue
+        if entry.stat().st_mtime < cutoff.timestamp():
+            os.remove(entry.path)
+    return purged
@@ -1,22 +1,49 @@
 from django.urls import path
-from api import views
+from api import async_views, views
 from api.views import CustomTokenObtainPairView
 
 urlpatterns = [
     # Rotas de Autenticação
     path("auth/register/", views.UserCreateView.as_view(), name="register"),
     path("auth/login/", CustomTokenObtainPairView.as_view(), name="login"),
+    path("auth/import/", views.UserImportView.as_view(), name="user-import"),
     path("user/", views.UserListView.as_view(), name="user-list"),
     path("students/", views.StudentListView.as_view(), name="student-list"),
+    path("cache/stats/", views.CacheStatsView.as_view(), name="cache-stats"),
+    path("metrics/", views.MetricsView.as_view(), name="metrics"),
+
+    # Disciplinas e turmas
+    path("disciplines/", views.DisciplineListView.as_view(), name="discipline-list"),
+    path("class-groups/", views.ClassGroupListCreateView.as_view(), name="class-group-list"),
+    path("class-groups/<int:pk>/students/", views.ClassGroupStudentsView.as_view(), name="class-group-students"),
 
     # Rotas de Faltas
     path("absences/", views.AbsenceListView.as_view(), name="absence-list"),
     path("absences/create/", views.AbsenceCreateView.as_view(), name="absence-create"), 
+    path("absences/bulk-create/", views.AbsenceBulkCreateView.as_view(), name="absence-bulk-create"),
     path('absences/check/', views.AbsenceCheckView.as_view(), name='absence-check'), 
+    path("absences/search/", views.AbsenceSearchView.as_view(), name="absence-search"),
+    path("absence-summaries/", views.AbsenceSummaryListView.as_view(), name="absence-summary-list"),
     path("absences/update/<int:pk>/", views.AbsenceUpdateView.as_view(), name="absence-update"),
 
     # Rotas de Solicitações de Perdão
     path("forgiveness-requests/", views.ForgivenessRequestListView.as_view(), name="forgiveness-request-list"), 
     path("forgiveness-requests/create/", views.ForgivenessRequestCreateView.as_view(), name="forgiveness-request-create"), 
+    path("justification-uploads/", views.JustificationUploadCreateView.as_view(), name="justification-upload-create"),
+    path("justification-uploads/<uuid:pk>/", views.JustificationUploadDetailView.as_view(), name="justification-upload-detail"),
     path("forgiveness-requests/<int:pk>/update/", views.ForgivenessRequestUpdateView.as_view(), name="forgiveness-request-update"), 
+    path("forgiveness-requests/batch-review/", views.ForgivenessRequestBatchReviewView.as_view(), name="forgiveness-request-batch-review"),
+
+    # Listagens assíncronas, para servidores ASGI (uvicorn backend.asgi:application)
+    path("async/students/", async_views.AsyncStudentListView.as_view(), name="async-student-list"),
+    path("async/absences/", async_views.AsyncAbsenceListView.as_view(), name="async-absence-list"),
+    path("async/forgiveness-requests/", async_views.AsyncForgivenessRequestListView.as_view(), name="async-forgiveness-request-list"),
+
+    # Notificações em tempo real (Server-Sent Events)
+    path("events/ticket/", views.EventTicketView.as_view(), name="event-ticket"),
+    path("events/stream/", async_views.EventStreamView.as_view(), name="event-stream"),
+
+    # Exportações (apenas admins)
+    path("exports/absences.<str:export_format>", views.AbsenceExportView.as_view(), name="absence-export"),
+    path("exports/forgiveness-requests.<str:export_format>", views.ForgivenessRequestExportView.as_view(), name="forgiveness-request-export"),
 ]
@@ -1,31 +1,87 @@
+import io
+
 from rest_framework import generics, permissions
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
 from rest_framework import status
-from .models import User, Absence, ForgivenessRequest
-from .serializers import UserSerializer, AbsencesSerializer, ForgivenessRequestsSerializer
-from .permissions import IsAdmin, IsProfessor, IsStudent
-from rest_framework_simplejwt.views import TokenObtainPairView
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from .models import (
+    ARCHIVE_MODELS,
+    User,
+    Absence,
+    AbsenceSummary,
+    ArchivedAbsence,
+    ArchivedForgivenessRequest,
+    ClassGroup,
+    Discipline,
+    ForgivenessRequest,
+    JustificationUpload,
+)
+from .serializers import (
+    UserSerializer,
+    UserImportSerializer,
+    ClassGroupSerializer,
+    DisciplineSerializer,
+    EnrolmentSerializer,
+    AbsencesSerializer,
+    AbsenceUpdateSerializer,
+    AnnotatedAbsencesSerializer,
+    AbsenceBulkCreateSerializer,
+    AbsenceSummarySerializer,
+    CustomTokenObtainPairSerializer,
+    CustomTokenRefreshSerializer,
+    ForgivenessRequestBatchReviewSerializer,
+    JustificationUploadSerializer,
+    ForgivenessRequestsSerializer,
+)
+from .permissions import HasMetricsToken, IsAdmin, IsProfessor, IsStudent
+from .pagination import KeysetPagination, RankedPagination, SummaryPagination
+from .filters import (
+    AbsenceFilterBackend,
+    AbsenceSummaryFilterBackend,
+    ForgivenessRequestFilterBackend,
+    RequestAbsenceFilterBackend,
+    discipline_filter,
+    parse_term_param,
+    reads_archive,
+)
+from . import conditional, events, exports, imports, metrics, rows, search, uploads
+from . import cache
+from .cache import CachedListMixin
+from .conditional import ConditionalListMixin
+from .routers import ReplicaReadMixin
+from .rows import RowListMixin
+from .throttles import LoginRateThrottle, LoginUsernameThrottle, PollingRateThrottle
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework.response import Response
 from rest_framework import status
 from django.utils.timezone import now
 
+
+class QueryShapingMixin:
+    """Aplica ao queryset da view o carregamento declarado pelo serializer"""
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer_class = self.get_serializer_class()
+        if hasattr(serializer_class, "shape_queryset"):
+            queryset = serializer_class.shape_queryset(queryset)
+        return queryset
+
+
+#Login: as credenciais são validadas uma única vez e os dados do usuário vão no token
+#Os limites por IP e por conta são verificados antes do hash da senha
 class CustomTokenObtainPairView(TokenObtainPairView):
+    serializer_class = CustomTokenObtainPairSerializer
+    throttle_classes = [LoginRateThrottle, LoginUsernameThrottle]
 
-    def post(self, request, *args, **kwargs):
-        response = super().post(request, *args, **kwargs)
-        if response.status_code == 200:
-            # O usuário é recuperado a partir do serializer
-            serializer = self.get_serializer(data=request.data)
-            serializer.is_valid(raise_exception=True)
-            user = serializer.user  # Obtem o usuário autenticado
-
-            response.data.update({
-                "user_id": user.id,
-                "username": user.username,
-                "email": user.email,
-                "role": user.role,
-            })
-        return response
+#Renovação do token: o papel e os demais dados do usuário são relidos do banco
+class CustomTokenRefreshView(TokenRefreshView):
+    serializer_class = CustomTokenRefreshSerializer
 
 # View de Usuários
 
@@ -35,37 +91,175 @@ class UserCreateView(generics.CreateAPIView):
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdmin]  # Apenas o adm pode criar uma conta
 
+#Importa usuários de um CSV (matrícula de uma turma nova), com o resultado de cada linha
+class UserImportView(generics.GenericAPIView):
+    serializer_class = UserImportSerializer
+    permission_classes = [permissions.IsAuthenticated, IsAdmin]
+
+    def post(self, request, *args, **kwargs):
+        # Recusa pelo tamanho declarado antes de receber o corpo
+        declared = request.META.get("CONTENT_LENGTH") or ""
+        if declared.isdigit() and int(declared) > settings.USER_IMPORT_API_MAX_SIZE:
+            raise ValidationError({"file": "Arquivo grande demais para a API; use o comando import_users."})
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.validated_data["file"]
+        # Hashes no próprio processo: um pool criado a cada requisição custaria mais que ele economiza
+        report = imports.import_users(io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline=""), workers=1)
+        if not report.created and report.errors:
+            return Response(report.as_dict(), status=status.HTTP_400_BAD_REQUEST)
+        return Response(report.as_dict(), status=status.HTTP_201_CREATED)
+
 #Lista Usuários
-class UserListView(generics.ListAPIView):
+class UserListView(RowListMixin, QueryShapingMixin, generics.ListAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdmin]
     
-class StudentListView(generics.ListAPIView):
+class StudentListView(ReplicaReadMixin, ConditionalListMixin, CachedListMixin, RowListMixin, QueryShapingMixin, generics.ListAPIView):
     queryset = User.objects.filter(role='student')  # Filtra apenas estudantes
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdmin | IsProfessor]
+    cache_resources = (cache.STUDENTS,)
+    fingerprint_fields = ("date_joined",)
+
+#Disciplinas e turmas
+
+#Catálogo de disciplinas; só admins cadastram novas
+class DisciplineListView(generics.ListCreateAPIView):
+    queryset = Discipline.objects.order_by("name")
+    serializer_class = DisciplineSerializer
+
+    def get_permissions(self):
+        if self.request.method == "POST":
+            return [permissions.IsAuthenticated(), IsAdmin()]
+        return [permissions.IsAuthenticated()]
+
+#Turmas: admins criam e veem todas, professores veem as que lecionam e alunos as que cursam (ClassGroup.objects.visible_to)
+class ClassGroupListCreateView(QueryShapingMixin, generics.ListCreateAPIView):
+    serializer_class = ClassGroupSerializer
+
+    def get_permissions(self):
+        if self.request.method == "POST":
+            return [permissions.IsAuthenticated(), IsAdmin()]
+        return [permissions.IsAuthenticated()]
+
+    def get_queryset(self):
+        queryset = ClassGroup.objects.visible_to(self.request.user).order_by("-term", "discipline__name", "name")
+        term = parse_term_param(self.request.query_params)
+        if term:
+            queryset = queryset.filter(term=term)
+        discipline = self.request.query_params.get("discipline")
+        if discipline:
+            queryset = queryset.filter(**discipline_filter(discipline))
+        return queryset
+
+#Alunos matriculados na turma, para a chamada sem percorrer a lista de todos os alunos
+#Admins matriculam alunos enviando {"students": [ids]}
+class ClassGroupStudentsView(QueryShapingMixin, generics.ListAPIView):
+    serializer_class = UserSerializer
+
+    def get_permissions(self):
+        if self.request.method == "POST":
+            return [permissions.IsAuthenticated(), IsAdmin()]
+        return [permissions.IsAuthenticated(), (IsAdmin | IsProfessor)()]
+
+    def get_class_group(self):
+        return get_object_or_404(ClassGroup.objects.visible_to(self.request.user), pk=self.kwargs["pk"])
+
+    def get_queryset(self):
+        # Lido pelo índice único turma+aluno das matrículas
+        return User.objects.filter(enrolments__class_group=self.get_class_group()).order_by("name", "id")
+
+    def post(self, request, *args, **kwargs):
+        class_group = self.get_class_group()
+        serializer = EnrolmentSerializer(data=request.data, context={"class_group": class_group})
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response({"students": class_group.enrolments.count()}, status=status.HTTP_201_CREATED)
 
 #View de Faltas
 
 #Listagem de Faltas
-#Professores veem as faltas de todo mundo, alunos veem apenas as próprias faltas
-class AbsenceListView(generics.ListAPIView):
+#Professores veem as faltas de todo mundo, alunos veem apenas as próprias faltas (Absence.objects.visible_to)
+#Só os semestres recentes; ?archived=true lista os semestres arquivados
+class AbsenceListView(ReplicaReadMixin, ConditionalListMixin, CachedListMixin, RowListMixin, QueryShapingMixin, generics.ListAPIView):
     serializer_class = AbsencesSerializer
     permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [PollingRateThrottle]
+    cache_resources = (cache.ABSENCES,)
+    fingerprint_fields = ("created_at", "updated_at")
+    pagination_class = KeysetPagination
+    filter_backends = [AbsenceFilterBackend]  # date, date_from, date_to, discipline, student, is_absent
+
+    def includes_requests(self):
+        # ?include_requests=true traz a situação da solicitação de perdão de cada falta
+        return self.request.query_params.get("include_requests") in ("true", "1")
+
+    def get_serializer_class(self):
+        if self.includes_requests():
+            return AnnotatedAbsencesSerializer
+        return AbsencesSerializer
+
+    def get_cache_resources(self):
+        if self.includes_requests():
+            return (cache.ABSENCES, cache.REQUESTS)
+        return self.cache_resources
+
+    def get_fingerprint_fields(self):
+        if self.includes_requests():
+            return self.fingerprint_fields + ("forgivenessrequest__updated_at",)
+        return self.fingerprint_fields
+
+    def get_queryset(self):
+        model = ArchivedAbsence if reads_archive(self.request) else Absence
+        return model.objects.visible_to(self.request.user)
+
+    def paginate_queryset(self, queryset):
+        # Anota depois dos filtros e do agregado do ETag, só nas linhas da página
+        if self.includes_requests():
+            queryset = AnnotatedAbsencesSerializer.annotate(queryset)
+        return super().paginate_queryset(queryset)
+
+#Busca textual nas faltas: nome e usuário do aluno, disciplina, motivo e comentários das solicitações
+#Cada palavra de ?q= casa como prefixo; resultados do mais relevante ao menos, restritos como na listagem
+class AbsenceSearchView(ReplicaReadMixin, QueryShapingMixin, generics.ListAPIView):
+    serializer_class = AnnotatedAbsencesSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = RankedPagination
+
+    def get_queryset(self):
+        return Absence.objects.visible_to(self.request.user)
+
+    def list(self, request, *args, **kwargs):
+        terms = search.parse_terms(request.query_params.get("q", ""))
+        if not terms:
+            raise ValidationError({"q": "Informe ao menos uma palavra com duas letras ou mais."})
+        hits = self.paginate_queryset(search.search_absences(terms, request.user))
+
+        queryset = AnnotatedAbsencesSerializer.annotate(self.filter_queryset(self.get_queryset()))
+        queryset = queryset.filter(id__in=[absence_id for absence_id, _ in hits])
+        serializer_class = rows.row_serializer_for(AnnotatedAbsencesSerializer) or AnnotatedAbsencesSerializer
+        found = {row["id"]: row for row in serializer_class(queryset, many=True, context=self.get_serializer_context()).data}
+        return self.get_paginated_response([
+            {**found[absence_id], "score": score} for absence_id, score in hits if absence_id in found
+        ])
+
+#Resumo de faltas por aluno, disciplina e semestre, lido da tabela de contadores
+#Alunos veem apenas os próprios resumos; a listagem é paginada como as demais
+class AbsenceSummaryListView(ReplicaReadMixin, QueryShapingMixin, generics.ListAPIView):
+    serializer_class = AbsenceSummarySerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [AbsenceSummaryFilterBackend]  # student, discipline, term
+    pagination_class = SummaryPagination
 
     def get_queryset(self):
         user = self.request.user
-        date = self.request.query_params.get('date', None)
-        
-        queryset = Absence.objects.all()
-        
-        if date:
-            queryset = queryset.filter(date=date)
-        
-        if user.role == "student":
-            queryset = queryset.filter(student=user)
-            
+        queryset = AbsenceSummary.objects.all()
+
+        if user.role not in ("professor", "admin"):
+            queryset = queryset.filter(student_id=user.pk)
+
         return queryset
 
 #Criar as faltas
@@ -75,38 +269,42 @@ class AbsenceCreateView(generics.CreateAPIView):
 
     def perform_create(self, serializer):
         serializer.save()
-class AbsenceUpdateView(generics.UpdateAPIView):
-    queryset = Absence.objects.all()
-    serializer_class = AbsencesSerializer
-    permission_classes = [permissions.IsAuthenticated, IsProfessor | IsAdmin]
 
-    def put(self, request, pk, *args, **kwargs):
-        user = request.user
+#Registra a chamada de uma turma inteira em uma única requisição
+class AbsenceBulkCreateView(generics.GenericAPIView):
+    serializer_class = AbsenceBulkCreateSerializer
+    permission_classes = [permissions.IsAuthenticated, IsProfessor | IsAdmin]
 
-        # Verifica permissões
-        if user.role not in ["professor", "admin"]:
-            return Response({"error": "Permissão negada"}, status=status.HTTP_403_FORBIDDEN)
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        absences = serializer.save()
+        return Response(
+            {"created": len(absences), "errors": serializer.validated_data["errors"]},
+            status=status.HTTP_201_CREATED,
+        )
 
-        try:
-            absence = Absence.objects.get(id=pk)
-        except Absence.DoesNotExist:
-            return Response({"error": "Falta não encontrada."}, status=status.HTTP_404_NOT_FOUND)
+#Atualiza uma falta (PATCH, ou PUT com a mesma semântica): só as colunas enviadas que mudaram são gravadas
+#Com If-Match: "<updated_at>" (o ETag da resposta) a atualização só vale se a falta não mudou desde então; senão 412
+class AbsenceUpdateView(generics.GenericAPIView):
+    queryset = Absence.objects.all()
+    serializer_class = AbsenceUpdateSerializer
+    permission_classes = [permissions.IsAuthenticated, IsProfessor | IsAdmin]
 
-        # Obtém os dados da requisição
-        discipline = request.data.get("discipline", absence.discipline)
-        is_absent = request.data.get("is_absent", absence.is_absent)
-        reason = request.data.get("reason", absence.reason)
+    def patch(self, request, pk, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        queryset = AbsencesSerializer.shape_queryset(self.get_queryset())
+        absence, _ = conditional.update_row(request, queryset, pk, serializer.validated_data)
 
-        # Atualiza os campos necessários
-        absence.discipline = discipline
-        absence.is_absent = is_absent
-        absence.reason = reason
-        absence.save()
+        response = Response({"message": "Falta atualizada com sucesso", "absence": AbsencesSerializer(absence).data})
+        response["ETag"] = conditional.version_etag(absence)
+        return response
 
-        return Response({"message": "Falta atualizada com sucesso", "absence": AbsencesSerializer(absence).data}, status=status.HTTP_200_OK)
+    put = patch
 
 
-class AbsenceCheckView(generics.ListAPIView):
+class AbsenceCheckView(RowListMixin, QueryShapingMixin, generics.ListAPIView):
     queryset = Absence.objects.all()
     serializer_class = AbsencesSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -123,34 +321,166 @@ class ForgivenessRequestCreateView(generics.CreateAPIView):
         user = self.request.user
         serializer.save(absence=serializer.validated_data.get('absence'))  # Liga a falta a solicitação
 
+#Envio em partes do arquivo de justificativa
+#O aluno declara o arquivo, envia as partes em sequência e pode retomar de onde parou
+class JustificationUploadCreateView(generics.CreateAPIView):
+    serializer_class = JustificationUploadSerializer
+    permission_classes = [permissions.IsAuthenticated, IsStudent]
+
+    def perform_create(self, serializer):
+        serializer.save(owner_id=self.request.user.pk)
+
+
+class JustificationUploadDetailView(generics.RetrieveAPIView):
+    serializer_class = JustificationUploadSerializer
+    permission_classes = [permissions.IsAuthenticated, IsStudent]
+
+    def get_queryset(self):
+        return JustificationUpload.objects.filter(owner_id=self.request.user.pk)
+
+    def put(self, request, pk, *args, **kwargs):
+        with transaction.atomic():
+            upload = get_object_or_404(self.get_queryset().select_for_update(), pk=pk)
+            if not upload.is_complete:
+                try:
+                    uploads.receive_chunk(
+                        upload,
+                        request.stream,
+                        request.headers.get("Content-Range"),
+                        request.headers.get("Content-Length"),
+                    )
+                except uploads.UploadConflict as conflict:
+                    return Response(
+                        {"error": "A parte não começa onde o envio parou.", "received_bytes": conflict.received_bytes},
+                        status=status.HTTP_409_CONFLICT,
+                    )
+        return Response(self.get_serializer(upload).data)
+
 #Listar solicitações
-#Professores veem as pendentes e os adms veem todas
-class ForgivenessRequestListView(generics.ListAPIView):
+#Professores veem as pendentes e os adms veem todas (ForgivenessRequest.objects.visible_to)
+#?archived=true lista as solicitações dos semestres arquivados
+class ForgivenessRequestListView(ReplicaReadMixin, ConditionalListMixin, CachedListMixin, RowListMixin, QueryShapingMixin, generics.ListAPIView):
     serializer_class = ForgivenessRequestsSerializer
     permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [PollingRateThrottle]
+    cache_resources = (cache.REQUESTS,)
+    fingerprint_fields = ("created_at", "updated_at", "absence__updated_at", "stored_file__processed_at")
+    pagination_class = KeysetPagination
+    filter_backends = [ForgivenessRequestFilterBackend]
 
     def get_queryset(self):
-        user = self.request.user
-        
-        if user.role == "professor":
-            return ForgivenessRequest.objects.filter(status="PENDING")  # Mantém somente filtro por status
-            
-        elif user.role == "admin":
-            return ForgivenessRequest.objects.all()
-            
-        elif user.role == "student":
-            return ForgivenessRequest.objects.filter(absence__student=user)
-            
-        return ForgivenessRequest.objects.none()
+        model = ArchivedForgivenessRequest if reads_archive(self.request) else ForgivenessRequest
+        return model.objects.visible_to(self.request.user)
+
+#Ticket de uso único para abrir o stream de eventos (/api/events/stream/?ticket=)
+#Só os alunos recebem notificações
+class EventTicketView(generics.GenericAPIView):
+    permission_classes = [permissions.IsAuthenticated, IsStudent]
+
+    def post(self, request, *args, **kwargs):
+        if not events.stream_available(request._request):
+            raise NotFound("Notificações em tempo real desativadas.")
+        ticket = events.issue_ticket(request.user.pk)
+        return Response({"ticket": ticket, "expires_in": settings.EVENTS_TICKET_TTL}, status=status.HTTP_201_CREATED)
+
+#Contadores de acerto/erro do cache das listagens
+class CacheStatsView(generics.GenericAPIView):
+    permission_classes = [permissions.IsAuthenticated, IsAdmin]
+
+    def get(self, request, *args, **kwargs):
+        return Response(cache.get_stats())
+
+#Latência, consultas e tempo de serialização por rota, no formato do Prometheus
+class MetricsView(generics.GenericAPIView):
+    permission_classes = [HasMetricsToken | IsAdmin]
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(
+            metrics.render_prometheus(metrics.snapshot()),
+            content_type="text/plain; version=0.0.4; charset=utf-8",
+        )
 
 #Atualizar os status da solicitação
 #Apenas professores rejeitam ou aprovam uma solicitação
-class ForgivenessRequestUpdateView(generics.UpdateAPIView):
+#Como nas faltas, só o que mudou é gravado e If-Match evita que duas pessoas decidam a mesma solicitação (412)
+class ForgivenessRequestUpdateView(generics.GenericAPIView):
     queryset = ForgivenessRequest.objects.all()
     serializer_class = ForgivenessRequestsSerializer
     permission_classes = [permissions.IsAuthenticated, IsProfessor | IsAdmin]  # Admins também podem aprovar/rejeitar
 
+    def patch(self, request, pk, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data, partial=True)
+        serializer.is_valid(raise_exception=True)
+        queryset = ForgivenessRequestsSerializer.shape_queryset(self.get_queryset())
+        # O If-Match é conferido antes de gravar o arquivo enviado, para um 412 não deixar arquivo órfão
+        conditional.check_if_match(request, get_object_or_404(queryset, pk=pk))
+        changes = serializer.attach_file(dict(serializer.validated_data))
+        forgiveness_request, _ = conditional.update_row(request, queryset, pk, changes)
+
+        response = Response(self.get_serializer(forgiveness_request).data)
+        response["ETag"] = conditional.version_etag(forgiveness_request)
+        return response
+
+    put = patch
+
+#Decide várias solicitações pendentes de uma vez (fim de semestre)
+#Cada id recebe seu próprio resultado: updated, conflict (já decidida), not_found ou duplicate
+class ForgivenessRequestBatchReviewView(generics.GenericAPIView):
+    serializer_class = ForgivenessRequestBatchReviewSerializer
+    permission_classes = [permissions.IsAuthenticated, IsProfessor | IsAdmin]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = serializer.save()
+        updated = sum(1 for result in results if result["outcome"] == "updated")
+        return Response({"updated": updated, "results": results})
+
+#Exportações de fim de semestre
+#As linhas são lidas em lotes e enviadas conforme são geradas, sem montar a lista inteira na memória
+#?archived=true exporta os semestres arquivados
+class ExportView(generics.GenericAPIView):
+    permission_classes = [permissions.IsAuthenticated, IsAdmin]
+    export_columns = ()
+    export_name = ""
+
+    def perform_content_negotiation(self, request, force=False):
+        # A resposta não passa pelos renderers, então qualquer Accept é aceito
+        return super().perform_content_negotiation(request, force=True)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if reads_archive(self.request):
+            return ARCHIVE_MODELS[queryset.model].objects.all()
+        return queryset
+
+    def get(self, request, export_format, *args, **kwargs):
+        if export_format not in exports.FORMATS:
+            return Response({"error": "Formato inválido, use csv ou ndjson."}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        if isinstance(request._request, ASGIRequest):
+            # Sob ASGI o conteúdo precisa ser assíncrono, senão o Django
+            # materializa o gerador inteiro antes de enviar
+            batches = exports.aiter_batches(queryset, self.export_columns)
+            content = exports.arender(batches, self.export_columns, export_format)
+        else:
+            rows = exports.iter_rows(queryset, self.export_columns)
+            content = exports.render(rows, self.export_columns, export_format)
+        response = StreamingHttpResponse(content, content_type=exports.FORMATS[export_format])
+        response["Content-Disposition"] = f'attachment; filename="{self.export_name}.{export_format}"'
+        return response
+
+
+class AbsenceExportView(ExportView):
+    queryset = Absence.objects.all()
+    filter_backends = [AbsenceFilterBackend]
+    export_columns = exports.ABSENCE_COLUMNS
+    export_name = "faltas"
 
-    def perform_update(self, serializer):
-        serializer.save(status=self.request.data.get("status"), partial=True)
 
+class ForgivenessRequestExportView(ExportView):
+    queryset = ForgivenessRequest.objects.all()
+    filter_backends = [RequestAbsenceFilterBackend, ForgivenessRequestFilterBackend]
+    export_columns = exports.FORGIVENESS_REQUEST_COLUMNS
+    export_name = "solicitacoes"
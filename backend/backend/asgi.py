@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+# Conexões persistentes não são seguras no modo assíncrono (ver DB_CONNECTION_MODE no settings)
+os.environ.setdefault('DB_CONNECTION_MODE', 'pooled')
 
 application = get_asgi_application()
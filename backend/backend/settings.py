@@ -32,12 +32,20 @@ DEBUG = True
 ALLOWED_HOSTS = ["*"]
 
 REST_FRAMEWORK = {
+    # O usuário é montado a partir das claims do token, sem consultar o banco (api/authentication.py)
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "api.authentication.ClaimsJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    # orjson quando instalado (api/renderers.py)
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    # Proxies reversos à frente do servidor: define o IP do cliente usado nos limites (api/throttles.py)
+    "NUM_PROXIES": int(os.getenv("API_NUM_PROXIES", 0)),
 }
 
 SIMPLE_JWT = {
@@ -60,7 +68,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.metrics.MetricsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
+    "api.throttles.LoadSheddingMiddleware",
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -96,17 +106,144 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    "default": {
+# DB_CONNECTION_MODE:
+#   persistent: cada thread do servidor WSGI reaproveita a conexão por até
+#               DB_CONN_MAX_AGE segundos, testando-a antes de usar
+#   pooled:     padrão no backend/asgi.py; as conexões são fechadas ao fim de cada
+#               requisição, como o Django exige no modo assíncrono, e o reuso fica
+#               com um pool externo (ProxySQL, por exemplo) em DB_POOL_HOST/DB_POOL_PORT
+#   none:       uma conexão nova por requisição
+
+DB_CONNECTION_MODE = os.getenv("DB_CONNECTION_MODE", "persistent")
+
+
+def database(host, port):
+    config = {
         "ENGINE": "django.db.backends.mysql",
         "NAME": os.getenv("DB_NAME"),
         "USER": os.getenv("DB_USER"),
         "PASSWORD": os.getenv("DB_PWD"),
-        "HOST": os.getenv("DB_HOST"),
-        "PORT": os.getenv("DB_PORT"),
+        "HOST": host,
+        "PORT": port,
+        "CONN_MAX_AGE": 0,
+        "CONN_HEALTH_CHECKS": False,
     }
+    if DB_CONNECTION_MODE == "persistent":
+        config["CONN_MAX_AGE"] = int(os.getenv("DB_CONN_MAX_AGE", 60))  # segundos
+        config["CONN_HEALTH_CHECKS"] = True
+    elif DB_CONNECTION_MODE == "pooled":
+        config["HOST"] = os.getenv("DB_POOL_HOST", host)
+        config["PORT"] = os.getenv("DB_POOL_PORT", port)
+    return config
+
+
+DATABASES = {
+    "default": database(os.getenv("DB_HOST"), os.getenv("DB_PORT")),
+}
+
+# Réplica de leitura opcional, usada pelas listagens (api/routers.py)
+if os.getenv("DB_REPLICA_HOST"):
+    DATABASES["replica"] = database(os.getenv("DB_REPLICA_HOST"), os.getenv("DB_REPLICA_PORT", os.getenv("DB_PORT")))
+    DATABASES["replica"]["TEST"] = {"MIRROR": "default"}
+
+DATABASE_ROUTERS = ["api.routers.ReplicaRouter"]
+
+# Segundos após uma escrita em que as listagens afetadas voltam a ler do banco
+# principal, cobrindo o atraso de replicação
+DATABASE_REPLICA_LAG = int(os.getenv("DB_REPLICA_LAG", 5)) if "replica" in DATABASES else 0
+
+
+# Cache
+# O backend em arquivo é compartilhado entre os processos do servidor, então a
+# invalidação feita por um worker vale para todos. Acima de MAX_ENTRIES ele apaga
+# entradas ao acaso, por isso as respostas cacheadas ("default") ficam separadas
+# do estado que não pode sumir ("state": versões das listagens, pinos do banco
+# principal, throttles, tickets do stream e métricas). O estado só é descartado
+# se passar do seu próprio limite, bem acima do número de usuários ativos
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "django.core.cache.backends.filebased.FileBasedCache")
+
+CACHES = {
+    "default": {
+        "BACKEND": CACHE_BACKEND,
+        "LOCATION": os.getenv("CACHE_LOCATION", str(BASE_DIR / ".cache")),
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("CACHE_MAX_ENTRIES", 20000))},
+    },
+    "state": {
+        "BACKEND": CACHE_BACKEND,
+        "LOCATION": os.getenv("CACHE_STATE_LOCATION", str(BASE_DIR / ".cache-state")),
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("CACHE_STATE_MAX_ENTRIES", 100000))},
+    },
+}
+
+API_CACHE_TIMEOUT = int(os.getenv("API_CACHE_TIMEOUT", 300))  # segundos
+
+
+# Serialização das listagens (api/rows.py, api/renderers.py)
+# Ligado: linhas montadas direto do .values() e JSON gerado pelo orjson;
+# desligado: serializers e renderer do DRF, com a mesma saída
+
+API_FAST_SERIALIZATION = os.getenv("API_FAST_SERIALIZATION", "true").lower() in ("true", "1")
+
+
+# Limites de requisições (api/throttles.py)
+# Balde de fichas no cache compartilhado: "N/período" aceita rajadas de N requisições
+# e repõe N por período; vazio desliga o limite. As recusas levam 429 com Retry-After
+
+API_THROTTLE_RATES = {
+    "login": os.getenv("THROTTLE_LOGIN_RATE", "10/min"),  # por IP
+    "login-username": os.getenv("THROTTLE_LOGIN_USERNAME_RATE", "5/min"),  # por conta
+    "polling": os.getenv("THROTTLE_POLLING_RATE", "120/min"),  # por usuário, nas listagens de faltas e solicitações
 }
 
+# Requisições simultâneas por processo a partir das quais as novas recebem 503; 0 desliga
+API_MAX_CONCURRENT_REQUESTS = int(os.getenv("API_MAX_CONCURRENT_REQUESTS", 64))
+API_SHED_RETRY_AFTER = 1  # segundos
+
+
+# Arquivos de justificativa
+# Os limites são verificados antes de ler o corpo da requisição
+
+JUSTIFICATION_MAX_SIZE = int(os.getenv("JUSTIFICATION_MAX_SIZE", 10 * 1024 * 1024))  # bytes
+JUSTIFICATION_CHUNK_SIZE = 1024 * 1024  # bytes, fixo para que o hash de conteúdo seja determinístico
+JUSTIFICATION_CONTENT_TYPES = ["application/pdf", "image/jpeg", "image/png"]
+JUSTIFICATION_UPLOAD_RETENTION_DAYS = 2  # envios em partes parados há mais tempo são apagados pelo process_jobs
+
+
+# Notificações (api/events.py)
+# Cada conexão consulta o log de eventos a cada EVENTS_POLL_INTERVAL segundos
+# O stream fica desligado até o backend rodar em um servidor ASGI (EVENTS_STREAM_ENABLED=true)
+
+EVENTS_STREAM_ENABLED = os.getenv("EVENTS_STREAM_ENABLED", "false").lower() in ("true", "1")
+EVENTS_TICKET_TTL = 30  # segundos para abrir o stream com o ticket
+EVENTS_POLL_INTERVAL = float(os.getenv("EVENTS_POLL_INTERVAL", 1.0))  # segundos
+EVENTS_KEEPALIVE = 15  # segundos sem eventos até enviar um comentário de keep-alive
+EVENTS_STREAM_TIMEOUT = int(os.getenv("EVENTS_STREAM_TIMEOUT", 300))  # segundos até o cliente reconectar
+EVENTS_RETENTION_DAYS = 7
+
+
+# Arquivo dos semestres encerrados (api/archive.py, manage.py archive_terms)
+
+ARCHIVE_KEEP_TERMS = int(os.getenv("ARCHIVE_KEEP_TERMS", 2))  # semestres mais recentes mantidos nas tabelas principais
+
+
+# Métricas por rota (api/metrics.py), expostas em /api/metrics/
+
+METRICS_SAMPLE_RATE = float(os.getenv("METRICS_SAMPLE_RATE", 0.1))  # fração das requisições instrumentadas
+METRICS_FLUSH_INTERVAL = 10  # segundos entre as gravações dos contadores de cada processo no cache
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")  # enviado pelo Prometheus no cabeçalho X-Metrics-Token
+
+
+# Importação de usuários em lote (api/imports.py)
+# O hash de cada senha custa centenas de milissegundos, então o comando import_users o calcula em
+# USER_IMPORT_WORKERS processos; a importação pela API calcula no próprio processo, então aceita
+# só arquivos pequenos e os maiores devem ir pelo comando
+
+USER_IMPORT_BATCH_SIZE = 1000  # linhas validadas e inseridas por vez
+USER_IMPORT_WORKERS = int(os.getenv("USER_IMPORT_WORKERS", os.cpu_count() or 1))
+USER_IMPORT_API_MAX_ROWS = int(os.getenv("USER_IMPORT_API_MAX_ROWS", 500))
+USER_IMPORT_API_MAX_SIZE = int(os.getenv("USER_IMPORT_API_MAX_SIZE", 256 * 1024))  # bytes
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
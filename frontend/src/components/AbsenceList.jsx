@@ -2,6 +2,7 @@ import { useEffect, useState } from "react";
 import api from "../api";
 import { getAuthToken, getUserRole } from "../utils/authHelpers";
 import Header from "./Header";
+import useEventStream from "../utils/useEventStream";
 
 function classNames(...classes) {
   return classes.filter(Boolean).join(" ");
@@ -14,10 +15,49 @@ function AbsenceList() {
   const token = getAuthToken();
   const userRole = getUserRole();
   const [searchTerm, setSearchTerm] = useState("");
+  const [query, setQuery] = useState("");
 
   const [selectedDate, setSelectedDate] = useState(new Date().toISOString().split('T')[0]);
   const [showAll, setShowAll] = useState(false);
-  
+  const [nextPage, setNextPage] = useState(null);
+  const [reloadKey, setReloadKey] = useState(0);
+  const [disciplines, setDisciplines] = useState([]);
+
+  // Notificações do backend: novas faltas recarregam a primeira página e
+  // decisões sobre as solicitações atualizam a linha correspondente
+  useEventStream({
+    "absence.created": () => setReloadKey((key) => key + 1),
+    "forgiveness_request.status": (event) => {
+      setAbsences((prev) =>
+        prev.map((absence) =>
+          absence.id === event.absence
+            ? {
+                ...absence,
+                forgiveness_request_id: event.id,
+                forgiveness_request_status: event.status,
+                has_pending_request: event.status === "PENDING",
+              }
+            : absence
+        )
+      );
+    },
+  });
+
+  // O backend só aceita disciplinas cadastradas: a edição sugere os nomes do catálogo
+  useEffect(() => {
+    if (userRole !== "admin" && userRole !== "professor") return;
+    api
+      .get("/api/disciplines/")
+      .then((response) => setDisciplines(response.data.map((discipline) => discipline.name)))
+      .catch(() => setDisciplines([]));
+  }, [userRole]);
+
+  // Espera o usuário parar de digitar antes de consultar a busca do backend
+  useEffect(() => {
+    const timer = setTimeout(() => setQuery(searchTerm.trim()), 300);
+    return () => clearTimeout(timer);
+  }, [searchTerm]);
+
   useEffect(() => {
     const fetchAbsences = async () => {
         setLoading(true);
@@ -26,27 +66,23 @@ function AbsenceList() {
         let token = getAuthToken(); // Token inicial
 
         try {
-          const params = showAll ? {} : { date: selectedDate };
-          const [absencesResponse, forgivenessResponse] = await Promise.all([
-            api.get("/api/absences/", { params, headers: { Authorization: `Bearer ${token}` } }),
-            api.get("/api/forgiveness-requests/", { headers: { Authorization: `Bearer ${token}` } }),
-          ]);
+          const params = showAll ? { include_requests: true } : { date: selectedDate, include_requests: true };
+          // Com um termo de busca, o índice de texto do backend procura em aluno, disciplina,
+          // motivo e comentários; a situação da solicitação de perdão já vem anotada em cada falta
+          const absencesResponse = query
+            ? await api.get("/api/absences/search/", { params: { q: query }, headers: { Authorization: `Bearer ${token}` } })
+            : await api.get("/api/absences/", { params, headers: { Authorization: `Bearer ${token}` } });
         
-            const forgivenessRequestsMap = {};
-            forgivenessResponse.data.forEach(request => {
-                forgivenessRequestsMap[request.absence] = true;
-            });
-        
-            const updatedAbsences = absencesResponse.data.map(absence => ({
+            const updatedAbsences = absencesResponse.data.results.map(absence => ({
                 ...absence,
                 has_justification: absence.has_justification || false,
-                has_forgiveness_request: forgivenessRequestsMap[absence.id] || false,
             }));
 
             console.log("Absences recebidas:", updatedAbsences);
 
 
             setAbsences(updatedAbsences);
+            setNextPage(absencesResponse.data.next);
         } catch (err) {
             console.error("Erro na requisição:", err);
             if (err.response?.data) {
@@ -58,10 +94,12 @@ function AbsenceList() {
                     token = await refreshToken();
                     if (token) {
                         const retryResponse = await api.get("/api/absences/", {
+                            params: { include_requests: true },
                             headers: { Authorization: `Bearer ${token}` },
                         });
 
-                        setAbsences(retryResponse.data);
+                        setAbsences(retryResponse.data.results);
+                        setNextPage(retryResponse.data.next);
                     } else {
                         throw new Error("Erro ao atualizar token");
                     }
@@ -83,9 +121,18 @@ function AbsenceList() {
         setError("Usuário não autenticado. Faça login novamente.");
         setLoading(false);
     }
-}, [selectedDate, showAll]);
+}, [selectedDate, showAll, reloadKey, query]);
 
   
+const loadMoreAbsences = async () => {
+  try {
+    const response = await api.get(nextPage);
+    setAbsences(prevAbsences => [...prevAbsences, ...response.data.results]);
+    setNextPage(response.data.next);
+  } catch (err) {
+    setError("Erro ao carregar as faltas.");
+  }
+};
 
 const handleFileUpload = async (absenceId, file) => {
   if (!file) {
@@ -154,11 +201,8 @@ const handleFileUpload = async (absenceId, file) => {
   };
   
   
-  const filteredAbsences = absences.filter((absence) =>
-    absence.student_username.toLowerCase().includes(searchTerm.toLowerCase())
-  );
-
-  if (loading) return <p className="text-center">Carregando...</p>;
+  // Durante a busca a tabela continua na tela, para o campo de pesquisa não perder o foco
+  if (loading && !searchTerm) return <p className="text-center">Carregando...</p>;
   if (error) return <p className="text-center text-red-500">{error}</p>;
 
   const navigation = [
@@ -207,11 +251,17 @@ const handleFileUpload = async (absenceId, file) => {
       <div className="p-6">
         <h1 className="text-3xl font-bold text-center mb-6">Controle de Faltas</h1>
 
+        <datalist id="discipline-options">
+          {disciplines.map((name) => (
+            <option key={name} value={name} />
+          ))}
+        </datalist>
+
         {/* 🔍 Input de busca */}
           <div className="flex flex-col md:flex-row gap-6 mb-6">
             <input
               type="text"
-              placeholder="Pesquisar aluno..."
+              placeholder="Pesquisar aluno, disciplina ou motivo..."
               className="px-4 py-2 border rounded-lg shadow focus:ring-2 focus:ring-blue-500 flex-1"
               value={searchTerm}
               onChange={(e) => setSearchTerm(e.target.value)}
@@ -247,7 +297,7 @@ const handleFileUpload = async (absenceId, file) => {
             </tr>
           </thead>
           <tbody>
-            {filteredAbsences.map((absence) => (
+            {absences.map((absence) => (
                 <tr key={absence.id} className="border-b hover:bg-gray-100">
                 <td className="border p-3">{absence.student_username}</td>
 
@@ -273,6 +323,7 @@ const handleFileUpload = async (absenceId, file) => {
                     {userRole === "admin" || userRole === "professor" ? (
                     <input
                         type="text"
+                        list="discipline-options"
                         className="border p-1 w-full"
                         defaultValue={absence.discipline}
                         onBlur={(e) =>
@@ -312,6 +363,17 @@ const handleFileUpload = async (absenceId, file) => {
             </tbody>
 
         </table>
+
+        {nextPage && (
+          <div className="flex justify-center mt-6">
+            <button
+              onClick={loadMoreAbsences}
+              className="px-4 py-2 bg-blue-500 text-white rounded-lg hover:bg-blue-600"
+            >
+              Carregar mais
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
@@ -2,12 +2,15 @@ import { useEffect, useState } from "react";
 import api from "../api";
 import { getAuthToken, getUserRole } from "../utils/authHelpers";
 import Header from "../components/Header";
+import useEventStream from "../utils/useEventStream";
 
 function Requests() {
   const [requests, setRequests] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [showPendingOnly, setShowPendingOnly] = useState(false);
+  const [nextPage, setNextPage] = useState(null);
+  const [selectedIds, setSelectedIds] = useState([]);
   const token = getAuthToken();
   const userRole = getUserRole();
 
@@ -23,7 +26,8 @@ function Requests() {
           headers: { Authorization: `Bearer ${token}` },
           params,
         });
-        setRequests(response.data);
+        setRequests(response.data.results);
+        setNextPage(response.data.next);
       } catch (err) {
         console.error("Erro ao carregar solicitações:", err);
         if (err.response?.status === 401) {
@@ -33,7 +37,8 @@ function Requests() {
               const retryResponse = await api.get("/api/forgiveness-requests/", {
                 headers: { Authorization: `Bearer ${token}` },
               });
-              setRequests(retryResponse.data);
+              setRequests(retryResponse.data.results);
+              setNextPage(retryResponse.data.next);
             } else {
               throw new Error("Erro ao atualizar token");
             }
@@ -57,6 +62,25 @@ function Requests() {
     }
   }, [token, showPendingOnly]);
 
+  // Para os alunos, aprovações e rejeições chegam pelo stream de eventos, sem recarregar a lista
+  useEventStream({
+    "forgiveness_request.status": (event) => {
+      setRequests((prev) =>
+        prev.map((req) => (req.id === event.id ? { ...req, status: event.status, comments: event.comments } : req))
+      );
+    },
+  });
+
+  const loadMoreRequests = async () => {
+    try {
+      const response = await api.get(nextPage);
+      setRequests((prev) => [...prev, ...response.data.results]);
+      setNextPage(response.data.next);
+    } catch (err) {
+      setError("Erro ao carregar as solicitações.");
+    }
+  };
+
   const handleCommentChange = async (id, newComment, request) => {
     try {
       if (!request) {
@@ -100,10 +124,12 @@ function Requests() {
   
       console.log("Payload enviado:", payload);
   
-      await api.put(`/api/forgiveness-requests/${id}/update/`, payload, {
+      // If-Match: a decisão só vale se ninguém alterou a solicitação desde que ela foi carregada
+      const response = await api.patch(`/api/forgiveness-requests/${id}/update/`, payload, {
         headers: {
           "Content-Type": "application/json",
           Authorization: `Bearer ${token}`,
+          "If-Match": `"${request.updated_at}"`,
         },
       });
   
@@ -112,17 +138,42 @@ function Requests() {
       // Atualize o estado local
       setRequests((prev) =>
         prev.map((req) =>
-          req.id === id ? { ...req, status: newStatus } : req
+          req.id === id ? { ...req, status: newStatus, updated_at: response.data.updated_at } : req
         )
       );
     } catch (error) {
+      if (error.response?.status === 412) {
+        setError("A solicitação já foi alterada por outra pessoa. Recarregue a página.");
+        return;
+      }
       console.error("Erro ao atualizar o status:", error);
     }
   };
 
   
   
-  
+  // Decide todas as solicitações selecionadas em uma única requisição
+  const handleBatchDecision = async (newStatus) => {
+    try {
+      const decisions = selectedIds.map((id) => ({ id, status: newStatus }));
+      const response = await api.post("/api/forgiveness-requests/batch-review/", { decisions });
+
+      // "updated" recebe o novo status; "conflict" traz o status decidido por outra pessoa
+      const statuses = Object.fromEntries(
+        response.data.results.filter((result) => result.status).map((result) => [result.id, result.status])
+      );
+      setRequests((prev) =>
+        prev.map((req) => (statuses[req.id] ? { ...req, status: statuses[req.id] } : req))
+      );
+      setSelectedIds([]);
+    } catch (error) {
+      console.error("Erro ao decidir as solicitações:", error);
+    }
+  };
+
+  const toggleSelected = (id) => {
+    setSelectedIds((prev) => (prev.includes(id) ? prev.filter((item) => item !== id) : [...prev, id]));
+  };
 
 const downloadFile = (filePath) => {
     if (!filePath) {
@@ -158,6 +209,24 @@ const downloadFile = (filePath) => {
           Solicitações de Perdão {userRole === "student" && "do Aluno"}
         </h1>
 
+        {(userRole === "professor" || userRole === "admin") && selectedIds.length > 0 && (
+          <div className="mb-6 flex gap-4 items-center">
+            <span>{selectedIds.length} selecionada(s)</span>
+            <button
+              onClick={() => handleBatchDecision("APPROVED")}
+              className="px-4 py-2 rounded-lg bg-green-600 text-white"
+            >
+              Aprovar selecionadas
+            </button>
+            <button
+              onClick={() => handleBatchDecision("REJECTED")}
+              className="px-4 py-2 rounded-lg bg-red-600 text-white"
+            >
+              Rejeitar selecionadas
+            </button>
+          </div>
+        )}
+
         {(userRole === "admin") && (
           <div className="mb-6 flex justify-between items-center">
             <button
@@ -178,6 +247,7 @@ const downloadFile = (filePath) => {
             <tr className="bg-black text-white">
               {(userRole === "professor" || userRole === "admin") && (
                 <>
+                  <th className="border p-3"></th>
                   <th className="border p-3">Disciplina</th>
                   <th className="border p-3">Data</th>
                   <th className="border p-3">Justificativa</th>
@@ -201,6 +271,14 @@ const downloadFile = (filePath) => {
               <tr key={request.id} className="border-b hover:bg-gray-100">
                 {(userRole === "professor" || userRole === "admin") && (
                   <>
+                    <td className="border p-3">
+                      <input
+                        type="checkbox"
+                        disabled={request.status !== "PENDING"}
+                        checked={selectedIds.includes(request.id)}
+                        onChange={() => toggleSelected(request.id)}
+                      />
+                    </td>
                     <td className="border p-3">{request.absence_details.discipline}</td>
                     <td className="border p-3">{new Date(request.created_at).toLocaleString("pt-BR")}</td>
                     <td className="border p-3">
@@ -270,6 +348,17 @@ const downloadFile = (filePath) => {
             ))}
           </tbody>
         </table>
+
+        {nextPage && (
+          <div className="flex justify-center mt-6">
+            <button
+              onClick={loadMoreRequests}
+              className="px-4 py-2 bg-blue-500 text-white rounded-lg hover:bg-blue-600"
+            >
+              Carregar mais
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
@@ -0,0 +1,61 @@
+import { useEffect, useRef } from "react";
+import api from "../api";
+import { getAuthToken, getUserRole } from "./authHelpers";
+
+const EVENT_KINDS = ["absence.created", "forgiveness_request.status"];
+const RECONNECT_DELAY = 5000;
+
+// Recebe as notificações do backend (/api/events/stream/) em vez de recarregar as listas.
+// handlers: { "forgiveness_request.status": (evento) => ..., "absence.created": (evento) => ... }
+// Só os alunos recebem eventos. O stream é aberto com um ticket de uso único, e não com o token,
+// que ficaria nos logs; sem servidor ASGI o backend recusa o ticket (404) e as listas seguem sem o stream.
+export default function useEventStream(handlers) {
+  const handlersRef = useRef(handlers);
+  handlersRef.current = handlers;
+
+  useEffect(() => {
+    if (typeof EventSource === "undefined" || getUserRole() !== "student") return undefined;
+
+    let source = null;
+    let lastEventId = null;
+    let timer = null;
+    let closed = false;
+
+    const connect = async () => {
+      if (!getAuthToken()) return;
+
+      let ticket;
+      try {
+        ticket = (await api.post("/api/events/ticket/")).data.ticket;
+      } catch (err) {
+        if (err.response?.status !== 404 && !closed) timer = setTimeout(connect, RECONNECT_DELAY);
+        return;
+      }
+      if (closed) return;
+
+      const url = new URL("/api/events/stream/", import.meta.env.VITE_API_URL || window.location.origin);
+      url.searchParams.set("ticket", ticket);
+      if (lastEventId) url.searchParams.set("last_event_id", lastEventId);
+
+      source = new EventSource(url);
+      EVENT_KINDS.forEach((kind) => {
+        source.addEventListener(kind, (event) => {
+          lastEventId = event.lastEventId;
+          handlersRef.current[kind]?.(JSON.parse(event.data));
+        });
+      });
+      source.onerror = () => {
+        // O ticket já foi usado, então a reconexão automática do navegador falharia: abre de novo com outro ticket
+        source.close();
+        timer = setTimeout(connect, RECONNECT_DELAY);
+      };
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(timer);
+      source?.close();
+    };
+  }, []);
+}